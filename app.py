@@ -1,24 +1,109 @@
 import os
-import random
 import json
+import base64
 import time
+import itertools
+import numpy as np
 from datetime import datetime
 from threading import Lock
-from functools import wraps
-from flask import Flask, render_template, jsonify, request, send_from_directory, session, redirect, url_for
+from collections import deque
+from flask import Flask, g, jsonify, request, session
 from flask_socketio import SocketIO, emit
 from werkzeug.security import generate_password_hash, check_password_hash
+from state_store import StateStore
+from storage import SnapshotStorage, JournalStorage, SqliteStorage, migrate_json_to_sqlite
+from state_feed import StateFeed
+from sim_engine import FloorSimulation, progress_rate, NOMINAL_RPM, REPAIR_THRESHOLD
+from telemetry_history import TelemetryHistory
+from order_ingest import OrderIngest, QueueFull
+from scheduler import DeadlineScheduler
+from predictive import MaintenanceModel
+from inventory import InventoryEngine
+from what_if import run_many, make_pool, validate as validate_scenario, MAX_SCENARIOS
+from notification_log import NotificationLog
+from report_log import ReportLog
+from rooms import rooms_for
+from bus import Bus
+from ledger import Ledger, DIMENSIONS, TIME_DIMENSIONS
+from metrics import REGISTRY, SIZE_BUCKETS
+from assets import AssetCache
+from web import WebFront, login_required
+import offload
+from offload import blocking
 
 # --- CONFIGURATION ---
 current_dir = os.path.abspath(os.path.dirname(__file__))
 app = Flask(__name__, template_folder=current_dir, static_folder=current_dir)
-app.config['SECRET_KEY'] = 'hackathon_super_secret'
+app.config['SECRET_KEY'] = os.environ.get('FACTORY_SECRET_KEY', 'hackathon_super_secret') # shared by every process of a cluster
 
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 thread = None
 thread_lock = Lock()
-
-DATA_FILE = os.path.join(current_dir, 'master_manufacturing_data.json')
+client_orders_lock = Lock()
+
+ASYNC_MODE = os.environ.get('FACTORY_ASYNC_MODE', 'threading')   # 'threading' (python app.py) or 'gevent' (serve.py)
+ROLE = os.environ.get('FACTORY_ROLE', 'standalone')              # 'standalone', or 'owner' of a cluster (cluster.py)
+BUS_ADDRESS = os.environ.get('FACTORY_BUS', '127.0.0.1:5600')       # message broker the owner publishes to
+BLOCKING_WORKERS = int(os.environ.get('FACTORY_BLOCKING_WORKERS', 8)) # native threads for SQLite, fsync and hashing in gevent mode
+DATA_FILE = os.environ.get('FACTORY_DATA_FILE', os.path.join(current_dir, 'master_manufacturing_data.json'))
+FLUSH_INTERVAL = float(os.environ.get('FACTORY_FLUSH_INTERVAL', 2.0)) # seconds between write-behind flushes
+FLUSH_BATCH = int(os.environ.get('FACTORY_FLUSH_BATCH', 50))         # pending mutations that force an early flush
+DURABILITY = os.environ.get('FACTORY_DURABILITY', 'snapshot')        # 'snapshot', 'journal' or 'sqlite'
+DB_FILE = os.environ.get('FACTORY_DB_FILE', os.path.join(current_dir, 'factory.db'))
+REPORT_DB = os.environ.get('FACTORY_REPORT_DB', os.path.join(current_dir, 'reports.db')) # full, searchable report history
+LEDGER_DB = os.environ.get('FACTORY_LEDGER_DB', os.path.join(current_dir, 'ledger.db')) # cost/revenue postings and rollups
+COMPACT_RATIO = float(os.environ.get('FACTORY_COMPACT_RATIO', 1.0))  # compact once the journal is this fraction of the snapshot's size
+MACHINES = int(os.environ.get('FACTORY_MACHINES', 1))                # simulated machines on the floor
+CLIENT_ORDER_LIMIT = int(os.environ.get('FACTORY_CLIENT_ORDER_LIMIT', 1000)) # storefront orders kept on the board
+INGEST_WINDOW = float(os.environ.get('FACTORY_INGEST_WINDOW', 0.25))  # seconds between storefront batch flushes
+INGEST_BATCH = int(os.environ.get('FACTORY_INGEST_BATCH', 500))      # storefront orders per batch
+INGEST_MAX_DEPTH = int(os.environ.get('FACTORY_INGEST_MAX_DEPTH', 100000)) # queued orders before 503
+INGEST_LEAD_DAYS = float(os.environ.get('FACTORY_INGEST_LEAD_DAYS', 7))   # deadline for storefront orders that don't give one
+NOTIFY_CAPACITY = int(os.environ.get('FACTORY_NOTIFY_CAPACITY', 1000)) # notifications kept for polling clients
+TICK_INTERVAL = float(os.environ.get('FACTORY_TICK_INTERVAL', 1.0))  # seconds between simulation ticks
+PREDICT_WARN_S = float(os.environ.get('FACTORY_PREDICT_WARN', 120))  # alert when a machine is this close to auto-repair
+ANOMALY_SCORE = float(os.environ.get('FACTORY_ANOMALY_SCORE', 4.0))  # std deviations from the EWMA that count as anomalous
+RESTOCK_LEAD_HOURS = float(os.environ.get('FACTORY_RESTOCK_LEAD_HOURS', 24)) # hours a restock takes to arrive
+RESTOCK_SAFETY_HOURS = float(os.environ.get('FACTORY_RESTOCK_SAFETY_HOURS', 12)) # extra cover on top of the lead time
+WHATIF_WORKERS = int(os.environ.get('FACTORY_WHATIF_WORKERS', os.cpu_count() or 1)) # processes for what-if runs
+STATIC_MAX_AGE = int(os.environ.get('FACTORY_STATIC_MAX_AGE', 300)) # seconds browsers reuse css/js before revalidating
+METRICS_ENABLED = os.environ.get('FACTORY_METRICS', '1') != '0'      # instrumentation + /metrics
+METRICS_ALLOW = set(os.environ.get('FACTORY_METRICS_ALLOW', '127.0.0.1,::1').split(',')) # clients allowed to scrape
+EMIT_SAMPLE = max(1, int(os.environ.get('FACTORY_EMIT_SAMPLE', 20)))  # re-encode 1 in N emitted events to size them
+
+REGISTRY.enabled = METRICS_ENABLED
+offload.configure(ASYNC_MODE, BLOCKING_WORKERS)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE)
+bus = Bus(BUS_ADDRESS) if ROLE == 'owner' else None
+
+def open_storage():
+    if DURABILITY == 'snapshot': return SnapshotStorage(DATA_FILE, batch_size=FLUSH_BATCH)
+    if DURABILITY == 'journal': return JournalStorage(DATA_FILE, compact_ratio=COMPACT_RATIO)
+    if DURABILITY == 'sqlite':
+        backend = SqliteStorage(DB_FILE, batch_size=FLUSH_BATCH)
+        if backend.is_empty() and os.path.exists(DATA_FILE):
+            print(f"STATE STORE: migrating {DATA_FILE} -> {DB_FILE} {migrate_json_to_sqlite(DATA_FILE, DB_FILE)}")
+        return backend
+    raise ValueError(f"Unknown durability mode: {DURABILITY}")
+
+store = StateStore(open_storage(), flush_interval=FLUSH_INTERVAL, offload=blocking)
+store.start()
+
+# The store keeps the latest reports for live views; every report ever filed goes to the log
+report_log = ReportLog(REPORT_DB)
+if not len(report_log): report_log.append(*reversed(store.reports))
+
+# Every cost and revenue posting goes to the ledger; the store keeps the running totals
+ledger = Ledger(LEDGER_DB)
+if not len(ledger):
+    for kind in ('cost', 'revenue'):
+        if store.financials.get(kind): ledger.post(kind, store.financials[kind], memo="Opening balance", ts=0) # dated to the epoch, not today
+
+# --- INVENTORY ---
+# Orders draw their bill of materials per unit made and every SKU burns its burnRate;
+# reorder points come from one vectorized pass over all SKUs (inventory.py)
+inventory = InventoryEngine(lead_hours=RESTOCK_LEAD_HOURS, safety_hours=RESTOCK_SAFETY_HOURS)
+inventory.load(store.inventory, store.get('bom'))
+store.subscribe(inventory.on_record)
 
 # --- GLOBAL FACTORY STATE ---
 simulation_state = {
@@ -31,20 +116,163 @@ simulation_state = {
     "yield_count": 1450,
     "status": "RUNNING",
     "is_locked": False, 
-    "active_orders": [],   
-    "client_orders": [],   
-    "reports": [], 
-    "notifications": []
+    "client_orders": deque(maxlen=CLIENT_ORDER_LIMIT)
 }
 
-# --- HELPERS ---
-def load_data():
-    if not os.path.exists(DATA_FILE): return {}
-    with open(DATA_FILE, 'r') as f: return json.load(f)
+# --- FACTORY FLOOR ---
+# Machine state lives in NumPy arrays; simulation_state mirrors machine 0 for the HUD
+floor = FloorSimulation(MACHINES, target_rpm=simulation_state["target_rpm"], current_rpm=simulation_state["current_rpm"],
+                        temp=simulation_state["temp"], health=simulation_state["health"], efficiency=simulation_state["efficiency"])
+floor.yield_count[0] = simulation_state["yield_count"]
+
+def sync_primary():
+    simulation_state.update(floor.machine(0))
+
+# --- TELEMETRY HISTORY ---
+history = TelemetryHistory()
+
+def record_history():
+    history.record(time.time(), {
+        "rpm": float(floor.current_rpm.mean()),
+        "temp": float(floor.temp.mean()),
+        "health": float(floor.health.mean()),
+        "efficiency": float(floor.efficiency.mean()),
+        "yield": int(floor.yield_count.sum()),
+        "stock": inventory.total_stock()
+    })
+
+# --- PREDICTIVE MAINTENANCE ---
+# Replaces the old random "demand surge" tips: alerts fire once when a forecast crosses its threshold
+maintenance = MaintenanceModel(floor.size)
+alerted = {'failure': np.zeros(floor.size, dtype=bool), 'anomaly': np.zeros(floor.size, dtype=bool), 'restock': set()}
+
+def machine_list(idx):
+    return f"{', '.join(str(i) for i in idx[:10])}{' ...' if len(idx) > 10 else ''}"
+
+def update_forecasts():
+    maintenance.update(floor.current_rpm, floor.temp, floor.health, dt=TICK_INTERVAL)
+    now = datetime.now().strftime("%H:%M:%S")
+
+    soon = maintenance.at_risk(PREDICT_WARN_S)
+    new = np.flatnonzero(soon & ~alerted['failure'])
+    alerted['failure'] = soon
+    if new.size:
+        if floor.size == 1:
+            m = maintenance.machine(0)
+            msg = f"MAINTENANCE FORECAST: Health reaches {REPAIR_THRESHOLD}% in ~{m['ttf_s']}s ({m['health_per_min']}%/min). Action: Schedule repair."
+        else:
+            msg = f"MAINTENANCE FORECAST: {new.size} machine(s) reach {REPAIR_THRESHOLD}% health within {int(PREDICT_WARN_S)}s. Machines: {machine_list(new)}"
+        notify({"from": "CORTEX_AI", "type": "PREDICTION", "message": msg, "timestamp": now}, 'Operator')
+
+    odd = maintenance.anomalous(ANOMALY_SCORE)
+    new = np.flatnonzero(odd & ~alerted['anomaly'])
+    alerted['anomaly'] = odd
+    if new.size:
+        where = "" if floor.size == 1 else f" Machines: {machine_list(new)}"
+        notify({"from": "CORTEX_AI", "type": "ANOMALY", "timestamp": now,
+                "message": f"ANOMALY DETECTED: Temperature/RPM outside normal range.{where}"}, 'Operator')
+
+    low = inventory.restock_names()
+    new = low - alerted['restock']
+    alerted['restock'] = low
+    if not new: return
+    items = inventory.needed(names=new)
+    if len(items) > 3:
+        notify({"from": "CORTEX_AI", "type": "PREDICTION", "timestamp": now,
+                "message": f"RESTOCK: {len(items)} SKUs reached their reorder point. Lowest: {', '.join(f['name'] for f in items[:5])}"}, 'Operator')
+        return
+    for f in items:
+        notify({"from": "CORTEX_AI", "type": "PREDICTION", "timestamp": now,
+                "message": f"RESTOCK {f['name']}: ~{f['hours_left']}h of stock left at {f['burn_per_hour']}/h (reorder point {f['reorder_point']}). Suggested: Order {f['suggested_qty']}."}, 'Operator')
+
+def forecast_summary():
+    primary = maintenance.machine(0)
+    return {
+        'ttf_s': primary['ttf_s'],
+        'health_per_min': primary['health_per_min'],
+        'anomaly': primary['anomaly'],
+        'at_risk': int(alerted['failure'].sum()),
+        'restock': [{'name': f['name'], 'hours_left': f['hours_left'], 'suggested_qty': f['suggested_qty']} for f in inventory.needed(limit=10)],
+        'restock_count': len(alerted['restock']),
+    }
+
+# --- STATE FEEDS ---
+# Clients get a full snapshot on connect, then only what changed per tick
+system_feed = StateFeed('system', keys={'client_orders': 'id', 'inventory': 'name'})
+order_feed = StateFeed('orders', keys={'orders': 'id'})
+FEEDS = {feed.name: feed for feed in (system_feed, order_feed)}
+order_feed.update({'orders': store.orders})
+dirty_orders = {} # order ids changed since the last order delta, in first-change order (new orders go last)
+
+def track_order_change(rec):
+    # Store listener (runs under store.lock): the order delta diffs only these ids
+    if rec['op'] == 'order.add': dirty_orders[rec['order']['id']] = None
+    elif rec['op'] == 'order.progress': dirty_orders.update(dict.fromkeys(rec['progress']))
+    elif rec['op'].startswith('order.'): dirty_orders[rec['id']] = None
+
+store.subscribe(track_order_change)
+
+# --- METRICS ---
+TICK_SECONDS = REGISTRY.histogram('factory_tick_seconds', 'Work done per simulation tick')
+TICK_PHASE_SECONDS = REGISTRY.histogram('factory_tick_phase_seconds', 'Time per tick phase', ('phase',))
+TICK_LAG_SECONDS = REGISTRY.histogram('factory_tick_lag_seconds', 'How late a tick started against its fixed-rate schedule')
+TICK_OVERRUNS = REGISTRY.counter('factory_tick_overruns_total', 'Ticks skipped because the previous one overran its slot')
+HTTP_SECONDS = REGISTRY.histogram('factory_http_request_seconds', 'HTTP request latency', ('route', 'method', 'status'))
+EMIT_BYTES = REGISTRY.histogram('factory_emit_bytes', f'Serialized size of emitted Socket.IO events (1 in {EMIT_SAMPLE} sampled)', ('event', 'topic'), buckets=SIZE_BUCKETS)
+emit_count = itertools.count()
+REGISTRY.gauge('factory_ingest_queue_depth', 'Storefront orders waiting to be committed', fn=lambda: ingest.stats()['queue_depth'])
+REGISTRY.gauge('factory_orders', 'Production orders held in memory', fn=lambda: len(store.book))
+
+@app.before_request
+def start_timer():
+    if REGISTRY.enabled: g.request_start = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    if REGISTRY.enabled and 'request_start' in g:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_SECONDS.observe(time.perf_counter() - g.request_start, route=route, method=request.method, status=response.status_code)
+    return response
+
+# --- SOCKET ROOMS ---
+# Sockets join one room per topic their role may receive (rooms.py, web.py)
+def publish(event, payload, topic, roles=None):
+    if bus is not None: bus.publish('emit', {'event': event, 'payload': payload, 'topic': topic, 'roles': roles})
+    rooms = rooms_for(topic, roles)
+    if not rooms: return
+    socketio.emit(event, payload, to=rooms)
+    if REGISTRY.enabled and next(emit_count) % EMIT_SAMPLE == 0: # Socket.IO encodes inside the server; sizing every event would encode it twice
+        EMIT_BYTES.observe(len(json.dumps(payload, default=str)), event=event, topic=topic)
+
+# --- NOTIFICATIONS ---
+# Bounded log with sequence numbers; sockets get each entry pushed, HTTP clients poll with a cursor
+notifications = NotificationLog(NOTIFY_CAPACITY)
+
+def notify(payload, to):
+    entry = notifications.post(payload, to)
+    publish('new_notification', entry, 'notifications', roles=[to])
+    return entry
+
+# --- SCHEDULER ---
+# EDF plan over production and storefront orders, kept in step with every order mutation
+scheduler = DeadlineScheduler()
 
-def save_data(data):
-    with open(DATA_FILE, 'w') as f: json.dump(data, f, indent=2)
+def production_rate():
+    # Progress (percent per tick) an in-progress order makes on the primary machine
+    return progress_rate(simulation_state["current_rpm"], simulation_state["temp"], simulation_state["status"] == "RUNNING")
 
+def on_order_change(rec):
+    if rec['op'] == 'order.remove': scheduler.remove(rec['id'])
+    elif rec['op'] == 'order.add': scheduler.track_order(rec['order'])
+    elif rec['op'] in ('order.update', 'order.progress'):
+        for oid in ([rec['id']] if rec['op'] == 'order.update' else rec['progress']):
+            order = store.find_order(oid)
+            if order is not None: scheduler.track_order(order) # a record for a missing order changes nothing
+
+for existing in store.book: scheduler.track_order(existing)
+store.subscribe(on_order_change)
+
+# --- HELPERS ---
 def add_report(content, type="INFO", author="System AI"):
     entry = {
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -52,135 +280,100 @@ def add_report(content, type="INFO", author="System AI"):
         "content": content,
         "author": author
     }
-    simulation_state['reports'].insert(0, entry)
-    if len(simulation_state['reports']) > 50: simulation_state['reports'].pop()
-    
-    full_data = load_data()
-    if 'production_hub' in full_data:
-        full_data['production_hub']['reports'] = simulation_state['reports']
-        save_data(full_data)
+    store.add_report(entry)
+    blocking(report_log.append, entry)
     return entry
 
-# --- SECURITY DECORATOR ---
-def login_required(role=None):
-    def wrapper(fn):
-        @wraps(fn)
-        def decorated_view(*args, **kwargs):
-            if 'user_id' not in session:
-                return redirect(url_for('login'))
-            if role and session.get('role') != role:
-                return "Access Denied: You do not have permission to view this page.", 403
-            return fn(*args, **kwargs)
-        return decorated_view
-    return wrapper
-
-# Load initial state
-initial_data = load_data()
-if 'production_hub' in initial_data:
-    simulation_state['active_orders'] = initial_data['production_hub'].get('orders', [])
-    simulation_state['reports'] = initial_data['production_hub'].get('reports', [])
+def post_entry(kind, amount, order=None, memo=None):
+    store.post(kind, amount)
+    if order is None: return blocking(ledger.post, kind, amount, memo=memo)
+    return blocking(ledger.post, kind, amount, order=order['id'], product=order.get('product'), customer=order.get('customer'), memo=memo)
 
 # --- BACKGROUND ENGINE ---
-def background_thread():
-    last_prediction_yield = 0
-    while True:
-        socketio.sleep(1) 
-        
-        if simulation_state["is_locked"]:
-            emit_telemetry(locked=True)
-            continue 
-
-        if simulation_state["status"] == "RUNNING":
-            current_yield = simulation_state["yield_count"]
-            if current_yield - last_prediction_yield >= 50:
-                last_prediction_yield = current_yield
-                
-                # FIXED: AI Prediction now suggests diverse materials
-                materials = ["Steel Sheets", "Copper Wire", "Lubricant", "Microchips"]
-                suggested = random.choice(materials)
-                
-                notif_payload = {
-                    "from": "CORTEX_AI",
-                    "type": "PREDICTION",
-                    "message": f"DEMAND SURGE PREDICTED. Suggested: Restock {suggested}. Action: Order Now.",
-                    "timestamp": datetime.now().strftime("%H:%M:%S")
-                }
-                simulation_state['notifications'].append(notif_payload)
-                socketio.emit('new_notification', notif_payload) # Emits to Operator
-
-        if simulation_state["status"] == "STOPPED":
-            simulation_state["target_rpm"] = 0
-            if simulation_state["current_rpm"] > 0:
-                decay = max(10, simulation_state["current_rpm"] * 0.15) 
-                simulation_state["current_rpm"] -= decay
-                if simulation_state["current_rpm"] < 1: simulation_state["current_rpm"] = 0
-            
-            if simulation_state["temp"] > 0:
-                simulation_state["temp"] -= 2.0
-                if simulation_state["temp"] < 0: simulation_state["temp"] = 0
-            simulation_state["efficiency"] = 0
-        else:
-            target = simulation_state["target_rpm"]
-            current = simulation_state["current_rpm"]
-            if current < target: simulation_state["current_rpm"] += random.randint(20, 50)
-            elif current > target: simulation_state["current_rpm"] -= random.randint(20, 50)
-            simulation_state["current_rpm"] = max(0, simulation_state["current_rpm"] + random.randint(-5, 5))
-            
-            if simulation_state["current_rpm"] > 100:
-                deviation = abs(simulation_state["current_rpm"] - 1200)
-                base_temp = 60 + (deviation / 30) + simulation_state["temp_offset"]
-                simulation_state["temp"] = round(base_temp + random.uniform(-0.5, 0.5), 1)
-            else:
-                if simulation_state["temp"] > 20: simulation_state["temp"] -= 0.5
-
-            eff_loss = 0
-            if abs(simulation_state["current_rpm"] - 1200) > 100: eff_loss += 5
-            if simulation_state["temp"] > 80: eff_loss += 10
-            simulation_state["efficiency"] = max(50, 100 - eff_loss - (100 - simulation_state["health"]) * 0.2)
-
-            if simulation_state["efficiency"] > 80:
-                simulation_state["yield_count"] += random.randint(1, 3)
-
-            stress = 0
-            if simulation_state["current_rpm"] > 1800: stress += 0.2
-            if simulation_state["temp"] > 85: stress += 0.3
-            if simulation_state["current_rpm"] > 0: stress += 0.05 
-            simulation_state["health"] -= stress
-            if simulation_state["health"] < 0: simulation_state["health"] = 0
-
-            if simulation_state["health"] < 80:
-                simulation_state["health"] = 100.0
-                simulation_state["temp_offset"] = 0.0 
-                simulation_state["target_rpm"] = 1200 
-                msg = "CRITICAL HEALTH DETECTED. AI Auto-Repair Executed."
-                add_report(msg, "MAINTENANCE")
-                socketio.emit('maintenance_alert', {
-                    "message": "AI AUTO-REPAIR COMPLETED. System Stabilized.",
-                    "timestamp": datetime.now().strftime("%H:%M:%S")
-                })
-
-        updated_orders = False
-        if simulation_state["status"] == "RUNNING":
-            for order in simulation_state['active_orders']:
-                if order.get('status') == 'In Progress' and not order.get('paused', False):
-                    progress_speed = (simulation_state["current_rpm"] / 1200) * 8 
-                    if simulation_state["temp"] > 90: progress_speed *= 0.5
-                    current_prog = order.get('progress', 0)
-                    if current_prog < 100:
-                        order['progress'] = min(100, int(current_prog + progress_speed))
-                        updated_orders = True
-        
-        if updated_orders:
-            socketio.emit('order_update', simulation_state['active_orders'])
+def tick():
+    # One step of factory time: floor physics, order progress, alerts and feed deltas
+    if simulation_state["is_locked"]:
+        with TICK_PHASE_SECONDS.time(phase='emit'): emit_telemetry(locked=True)
+        return
 
+    with TICK_PHASE_SECONDS.time(phase='simulation'): simulate()
+    with TICK_PHASE_SECONDS.time(phase='orders'): updated_orders = advance_orders()
+    with TICK_PHASE_SECONDS.time(phase='emit'):
+        if updated_orders: publish_orders()
         emit_telemetry(locked=False)
 
+def simulate():
+    repaired = floor.step()
+    sync_primary()
+    record_history()
+    update_forecasts()
+    if repaired.size:
+        msg = "CRITICAL HEALTH DETECTED. AI Auto-Repair Executed."
+        if floor.size > 1: msg += f" Machines: {', '.join(str(i) for i in repaired[:10])}{' ...' if repaired.size > 10 else ''}"
+        add_report(msg, "MAINTENANCE")
+        publish('maintenance_alert', {
+            "message": "AI AUTO-REPAIR COMPLETED. System Stabilized.",
+            "timestamp": datetime.now().strftime("%H:%M:%S")
+        }, 'maintenance')
+
+def advance_orders():
+    updated_orders = False
+    progress_speed = production_rate()
+    scheduler.set_rate(progress_speed / TICK_INTERVAL) # percent per tick -> per second
+    made, progress = [], {}
+    if simulation_state["status"] == "RUNNING":
+        with store.lock:
+            for order in store.book.active():
+                current_prog = order.get('progress', 0)
+                if current_prog < 100:
+                    new_prog = min(100, int(current_prog + progress_speed))
+                    progress[order['id']] = new_prog
+                    made.append((order.get('product'), order.get('quantity', 0) * (new_prog - current_prog) / 100))
+                    updated_orders = True
+            store.progress_orders(progress)
+    consume_materials(made)
+    return updated_orders
+
+def consume_materials(made):
+    # Units made this tick draw their BOM; the floor's activity drives each SKU's burnRate
+    activity = float(floor.running.mean() * floor.current_rpm.mean() / NOMINAL_RPM)
+    store.consume_stock(inventory.consume(made, activity, TICK_INTERVAL))
+
+def background_thread():
+    # Fixed-rate schedule: sleep until the next slot rather than a flat interval after the work,
+    # so time spent ticking doesn't stretch the period. Slots missed entirely are skipped.
+    next_tick = time.monotonic() + TICK_INTERVAL
+    while True:
+        socketio.sleep(max(0.0, next_tick - time.monotonic()))
+        TICK_LAG_SECONDS.observe(max(0.0, time.monotonic() - next_tick))
+        with TICK_SECONDS.time(): tick()
+        next_tick += TICK_INTERVAL
+        behind = time.monotonic() - next_tick
+        if behind > 0:
+            missed = int(behind // TICK_INTERVAL) + 1
+            TICK_OVERRUNS.inc(missed)
+            next_tick += missed * TICK_INTERVAL
+
 def emit_telemetry(locked):
-    data = load_data()
-    inventory = data.get('inventory', [])
-    financials = data.get('financials', {'revenue':0, 'cost':0}) 
+    delta = system_feed.update(system_state(locked))
+    if delta: publish('feed_delta', delta, 'system')
+
+def publish_orders(full=False):
+    # full=True re-diffs every order (after a reset replaced the whole book)
+    with store.lock:
+        if full:
+            delta = order_feed.update({'orders': store.orders})
+        else:
+            changed = [store.book.get(oid) for oid in dirty_orders if oid in store.book]
+            delta = order_feed.patch('orders', changed, [oid for oid in dirty_orders if oid not in store.book])
+        dirty_orders.clear()
+    if delta: publish('feed_delta', delta, 'orders')
+
+def client_orders_snapshot():
+    with client_orders_lock: return list(simulation_state['client_orders'])
 
-    socketio.emit('system_update', {
+def system_state(locked):
+    return {
         'rpm': int(simulation_state["current_rpm"]),
         'temp': round(simulation_state["temp"], 1),
         'health': int(simulation_state["health"]),
@@ -188,10 +381,14 @@ def emit_telemetry(locked):
         'yield': simulation_state["yield_count"],
         'status': simulation_state["status"],
         'locked': locked,
-        'client_orders': simulation_state['client_orders'], 
-        'inventory': inventory,
-        'financials': financials 
-    })
+        'client_orders': client_orders_snapshot(),
+        'inventory': store.inventory,
+        'financials': store.financials,
+        'ledger': ledger.summary(),
+        'floor': floor.aggregate(),
+        'schedule': scheduler.summary(),
+        'forecast': forecast_summary()
+    }
 
 # --- AUTH ROUTES ---
 @app.route('/api/auth/register', methods=['POST'])
@@ -200,15 +397,11 @@ def register():
     email = data.get('email')
     password = data.get('password')
     role = data.get('role')
-    full_data = load_data()
-    users = full_data.get('users', [])
-    if any(u['email'] == email for u in users):
+    if store.find_user(email):
         return jsonify({"status": "error", "message": "User already exists"}), 400
-    hashed_pw = generate_password_hash(password)
+    hashed_pw = blocking(generate_password_hash, password)
     new_user = {"email": email, "password": hashed_pw, "role": role}
-    if 'users' not in full_data: full_data['users'] = []
-    full_data['users'].append(new_user)
-    save_data(full_data)
+    store.add_user(new_user)
     return jsonify({"status": "success", "message": "Registration successful"})
 
 @app.route('/api/auth/login', methods=['POST'])
@@ -216,40 +409,23 @@ def auth_login():
     data = request.json
     email = data.get('email')
     password = data.get('password')
-    full_data = load_data()
-    users = full_data.get('users', [])
-    user = next((u for u in users if u['email'] == email), None)
-    if user and check_password_hash(user['password'], password):
+    user = store.find_user(email)
+    if user and blocking(check_password_hash, user['password'], password):
         session['user_id'] = user['email']
         session['role'] = user['role']
         return jsonify({"status": "success", "role": user['role']})
     return jsonify({"status": "error", "message": "Invalid credentials"}), 401
 
-@app.route('/logout')
-def logout():
-    session.clear()
-    return redirect(url_for('login'))
-
 # --- ROUTES ---
-@app.route('/')
-def home(): return render_template('index.html')
-
-@app.route('/login.html')
-def login(): return render_template('login.html')
-
-@app.route('/operator')
-@login_required(role='Operator')
-def operator(): return render_template('dashboard.html') 
+# Pages and static files come compressed from memory with ETags (assets.py); the role pages are in web.py
+assets = AssetCache(current_dir, max_age=STATIC_MAX_AGE)
+assets.warm()
 
 @app.route('/manager-dashboard')
 @login_required(role='Manager')
 def manager(): 
-    data = load_data()
-    return render_template('manager.html', production=data.get('production_hub', {}), logistics=data.get('logistics_and_sustainability', {}))
-
-@app.route('/analyst')
-@login_required(role='Analyst')
-def analyst(): return render_template('analyst.html')
+    return assets.respond(assets.page('manager.html', store.version, private=True, production=store.get('production_hub', {}),
+                                      logistics=store.get('logistics_and_sustainability', {})))
 
 # --- API ENDPOINTS ---
 @app.route('/api/system/lock', methods=['POST'])
@@ -261,15 +437,11 @@ def system_lock():
 @app.route('/api/create_order', methods=['POST'])
 def create_order():
     data = request.json
-    new_id = f"#ORD-{random.randint(1000, 9999)}"
+    new_id = store.next_order_id()
     product = data.get('product', "Hydraulic Valve")
     qty = int(data.get('quantity', 100))
     deadline = data.get('deadline') # Receive deadline
     estimated_cost = qty * 15 
-    full_data = load_data()
-    if 'financials' not in full_data: full_data['financials'] = {'revenue': 0, 'cost': 0}
-    full_data['financials']['cost'] += estimated_cost
-    save_data(full_data)
     p_label, p_color = calculate_ai_priority(deadline)
     new_order = { 
 "id": new_id, 
@@ -282,27 +454,25 @@ def create_order():
         "status": "Pending", 
         "paused": False,
         "start_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")                }
-    simulation_state['active_orders'].append(new_order)
-    full_data['production_hub']['orders'] = simulation_state['active_orders']
-    save_data(full_data)
+    if data.get('customer'): new_order['customer'] = data['customer']
+    store.add_order(new_order)
+    post_entry('cost', estimated_cost, new_order, memo="Production cost")
     notif_payload = {
         "from": "MANAGER",
         "type": "ORDER",
         "message": f"New Work Order Received: {new_id} ({product} x{qty})",
         "timestamp": datetime.now().strftime("%H:%M:%S")
     }
-    simulation_state['notifications'].append(notif_payload) 
-    socketio.emit('new_notification', notif_payload)        
+    notify(notif_payload, 'Operator')
     add_report(f"PRODUCTION ORDER: {new_id} ({product} x{qty}) created. Cost: ${estimated_cost}", "INFO")
-    socketio.emit('order_update', simulation_state['active_orders'])
-    return jsonify({"status": "success"})
+    publish_orders()
+    return jsonify({"status": "success", "order_id": new_id})
 
 # Add this helper to app.py
 def calculate_ai_priority(deadline_str):
-    """Centralized Priority Engine for 2026 System Time"""
+    """Centralized Priority Engine (days left until the deadline, real clock)"""
     try:
-        # System time is Jan 17, 2026
-        today = datetime.strptime("2026-01-17", "%Y-%m-%d") 
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
         deadline = datetime.strptime(deadline_str, "%Y-%m-%d")
         diff_days = (deadline - today).days
 
@@ -317,58 +487,69 @@ def calculate_ai_priority(deadline_str):
     except:
         return ("NORMAL", "#94a3b8")
 
-# Update your shop_order route to include this priority
-@app.route('/api/shop/order', methods=['POST'])
-# --- Updated shop_order route in app.py ---
+# --- e-DUKAAN INGESTION ---
+# Storefront orders are queued and committed in batches; managers get one
+# 'new_client_orders' event per flush window instead of one per order
+def commit_client_orders(batch):
+    board = simulation_state['client_orders']
+    with client_orders_lock:
+        for entry in reversed(batch):
+            if len(board) == board.maxlen: scheduler.remove(board[-1]['id']) # about to fall off the board
+            board.appendleft(entry)
+            scheduler.track(entry['id'], entry['deadline'], kind='client')
+    publish('new_client_orders', batch, 'client_orders')
+
+ingest = OrderIngest(commit_client_orders, calculate_ai_priority, flush_window=INGEST_WINDOW, batch_size=INGEST_BATCH,
+                     max_depth=INGEST_MAX_DEPTH, lead_days=INGEST_LEAD_DAYS,
+                     next_id=store.get('production_hub').get('client_order_seq', 10000), reserve=store.reserve_client_ids)
+ingest.start()
+
 @app.route('/api/shop/order', methods=['POST'])
 def shop_order():
+    try:
+        accepted, rejected = ingest.submit([request.json])
+    except QueueFull as e:
+        return jsonify({"status": "error", "message": str(e)}), 503
+    if rejected: return jsonify({"status": "error", "message": rejected[0][1]}), 400
+    return jsonify({"status": "success", "order_id": accepted[0][1]})
+
+@app.route('/api/shop/orders', methods=['POST'])
+def shop_orders_bulk():
     data = request.json
-    deadline = data.get('deadline', '2026-01-25')
-    p_label, p_color = calculate_ai_priority(deadline)
-    
-    # 1. GENERATE THE ID FIRST
-    new_id = f"SLS-{random.randint(10000, 99999)}"
-    
-    # 2. NOW CREATE THE ORDER ENTRY
-    order_entry = {
-        "id": new_id,
-        "customer": data.get('customer_name'), # This matches your index.html update
-        "product": data.get('product'),
-        "qty": int(data.get('quantity')),
-        "amt": int(data.get('total')),
-        "deadline": deadline,
-        "priority": p_label,
-        "priority_color": p_color,
-        "status": "New",
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    
-    simulation_state['client_orders'].insert(0, order_entry)
-    socketio.emit('new_client_order', order_entry)
-    return jsonify({"status": "success", "order_id": new_id})
-    simulation_state['client_orders'].insert(0, order_entry)
-    socketio.emit('new_client_order', order_entry)
-    return jsonify({"status": "success", "order_id": new_id})
+    orders = data.get('orders') if isinstance(data, dict) else data
+    if not isinstance(orders, list): return jsonify({"status": "error", "message": "Expected a list of orders"}), 400
+    try:
+        accepted, rejected = ingest.submit(orders)
+    except QueueFull as e:
+        return jsonify({"status": "error", "message": str(e)}), 503
+    return jsonify({
+        "status": "success",
+        "accepted": len(accepted),
+        "order_ids": [oid for _, oid in accepted],
+        "rejected": [{"index": i, "message": reason} for i, reason in rejected],
+        "queue_depth": ingest.stats()["queue_depth"]
+    })
+
+@app.route('/api/shop/ingest/stats', methods=['GET'])
+def shop_ingest_stats(): return jsonify(ingest.stats())
+
 @app.route('/api/order/control', methods=['POST'])
 def order_control():
     data = request.json
     order_id = data.get('id')
     action = data.get('action') 
-    target = next((o for o in simulation_state['active_orders'] if o['id'] == order_id), None)
+    target = store.find_order(order_id)
     if not target: return jsonify({"status": "error"})
     if action == 'delete':
-        simulation_state['active_orders'].remove(target)
+        store.remove_order(target)
         add_report(f"Order {order_id} removed.", "WARN")
     elif action == 'pause':
-        target['paused'] = True
+        store.update_order(target, paused=True)
         add_report(f"DEFECT FLAG: {order_id} Paused.", "QA")
     elif action == 'resume':
-        target['paused'] = False
+        store.update_order(target, paused=False)
         add_report(f"RESUMED: {order_id}.", "INFO")
-    full_data = load_data()
-    full_data['production_hub']['orders'] = simulation_state['active_orders']
-    save_data(full_data)
-    socketio.emit('order_update', simulation_state['active_orders'])
+    publish_orders()
     return jsonify({"status": "success"})
 
 @app.route('/api/workflow/move', methods=['POST'])
@@ -377,78 +558,215 @@ def move_workflow():
     order_id = data.get('id')
     new_status = data.get('status')
     
-    target = next((o for o in simulation_state['active_orders'] if o['id'] == order_id), None)
+    target = store.find_order(order_id)
     if not target: return jsonify({"status": "error"})
     
-    target['status'] = new_status
+    store.update_order(target, status=new_status)
     
     if new_status == "Completed":
         revenue_gain = target['quantity'] * 50
-        full_data = load_data()
-        if 'financials' not in full_data: full_data['financials'] = {'revenue': 0, 'cost': 0}
-        full_data['financials']['revenue'] += revenue_gain
+        post_entry('revenue', revenue_gain, target, memo="Order completed")
         
-        # FIXED: Inventory & Yield reflect in Manager when Operator completes task
-        raw_material = next((i for i in full_data.get('inventory', []) if i['name'] == 'Steel Sheets'), None)
-        if raw_material:
-            raw_material['stock'] = max(0, raw_material['stock'] - (target['quantity'] // 2))
-        
-        simulation_state["yield_count"] += target['quantity'] # Increase total yield count
-        save_data(full_data)
-        add_report(f"OPERATOR: Completed {order_id}. Revenue generated: ${revenue_gain}", "SUCCESS")
+        # Materials are drawn as the order progresses; completing early draws the rest
+        remaining = target['quantity'] * (100 - min(100, target.get('progress', 0))) / 100
+        if remaining: store.consume_stock(inventory.consume([(target.get('product'), remaining)], dt=0))
 
-    full_data = load_data()
-    full_data['production_hub']['orders'] = simulation_state['active_orders']
-    save_data(full_data)
+        floor.yield_count[0] += target['quantity'] # Increase total yield count
+        sync_primary()
+        add_report(f"OPERATOR: Completed {order_id}. Revenue generated: ${revenue_gain}", "SUCCESS")
 
-    socketio.emit('order_update', simulation_state['active_orders'])
+    publish_orders()
     emit_telemetry(locked=simulation_state['is_locked']) # Force sync with Manager UI
     return jsonify({"status": "success"})
 
-@app.route('/api/get_notifications', methods=['GET'])
-def get_notifs(): return jsonify(simulation_state['notifications'])
-
 @app.route('/api/send_report', methods=['POST'])
 def receive_report():
     data = request.json or {}
     content = data.get('content', "Manual Shift Report: Systems Nominal.")
     entry = add_report(content, "OPERATOR", "Operator Node")
-    socketio.emit('report_update', simulation_state['reports'])
-    socketio.emit('new_notification', {"from": "OPERATOR", "message": "New Shift Report Filed", "type": "REPORT"})
+    publish('report_update', store.reports, 'reports')
+    notify({"from": "OPERATOR", "message": "New Shift Report Filed", "type": "REPORT",
+            "timestamp": datetime.now().strftime("%H:%M:%S")}, 'Manager')
     return jsonify({"status": "success", "message": "Report filed."})
 
-@app.route('/api/reports', methods=['GET'])
-def get_reports(): return jsonify(simulation_state['reports'])
-
 @app.route('/api/analyst/history', methods=['GET'])
 def get_analyst_history():
-    base_yield = simulation_state["yield_count"]
+    resolution = request.args.get('resolution', 'hour')
+    fields = request.args.get('fields')
+    limit = min(5000, max(1, request.args.get('limit', 300 if resolution == 'raw' else 7, type=int)))
+    try:
+        result = history.query(resolution, start=request.args.get('start', type=float), end=request.args.get('end', type=float),
+                               fields=fields.split(',') if fields else None, limit=limit)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    # Chart-ready keys: units produced and stock on hand per point
+    series = result["series"]
+    label_fmt = "%a %H:%M" if resolution == 'hour' else "%H:%M:%S" if resolution == 'raw' else "%H:%M"
+    result["labels"] = [datetime.fromtimestamp(t).strftime(label_fmt) for t in result["t"]]
+    if "yield" in series: # per point, never the running total
+        result["production"] = [int(v) for v in (series["yield"]["increase"] if resolution != 'raw' else result["increase"]["yield"])]
+    if "stock" in series:
+        result["inventory"] = [int(v) for v in (series["stock"]["mean"] if resolution != 'raw' else series["stock"])]
+    return jsonify(result)
+
+@app.route('/api/analyst/chart/<field>', methods=['GET'])
+def get_analyst_chart(field):
+    resolution = request.args.get('resolution', 'minute')
+    limit = min(5000, max(1, request.args.get('limit', 60, type=int)))
+    try:
+        result = history.query(resolution, start=request.args.get('start', type=float), end=request.args.get('end', type=float),
+                               fields=[field], limit=limit)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    values = result["series"][field]
+    return jsonify({
+        "field": field,
+        "resolution": resolution,
+        "t": result["t"],
+        "values": values if resolution == 'raw' else values["mean"],
+        "min": None if resolution == 'raw' else values["min"],
+        "max": None if resolution == 'raw' else values["max"]
+    })
+
+@app.route('/api/maintenance/forecast', methods=['GET'])
+def get_maintenance_forecast():
+    machine = request.args.get('machine', type=int)
+    if machine is not None and not 0 <= machine < floor.size:
+        return jsonify({"status": "error", "message": f"Machine {machine} does not exist"}), 400
+    limit = min(1000, max(1, request.args.get('limit', 10, type=int)))
     return jsonify({
-        "production": [base_yield - (x*100) for x in range(7)],
-        "inventory": [4500, 4600, 4200, 4800, 4700, 4900, 5000],
-        "labels": ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+        "threshold": REPAIR_THRESHOLD,
+        "warn_s": PREDICT_WARN_S,
+        "at_risk": int(maintenance.at_risk(PREDICT_WARN_S).sum()),
+        "anomalous": int(maintenance.anomalous(ANOMALY_SCORE).sum()),
+        "machines": [maintenance.machine(machine)] if machine is not None else maintenance.soonest(limit),
+        "restock": inventory.needed(limit=limit)
+    })
+
+@app.route('/api/inventory/forecast', methods=['GET'])
+def get_inventory_forecast():
+    # SKUs by days of cover, least first; ?restock=1 keeps only those at their reorder point
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(1000, max(1, request.args.get('limit', 100, type=int)))
+    restock_only = request.args.get('restock', '').lower() in ('1', 'true', 'yes')
+    return jsonify(inventory.projections(offset, limit, restock_only))
+
+@app.route('/api/inventory/restock', methods=['POST'])
+def restock_inventory():
+    # A delivery arrived: {"name": <SKU>, "quantity": <units>}
+    data = request.json or {}
+    name = data.get('name')
+    if store.find_stock(name) is None: return jsonify({"status": "error", "message": f"Unknown SKU: {name}"}), 404
+    try:
+        qty = int(data.get('quantity'))
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "Quantity must be a number"}), 400
+    if qty <= 0: return jsonify({"status": "error", "message": "Quantity must be 1 or more"}), 400
+    item = store.adjust_stock(name, qty)
+    add_report(f"RESTOCK: {name} +{qty} (now {item['stock']})", "INFO")
+    return jsonify({"status": "success", "item": dict(item)})
+
+# --- LEDGER ---
+@app.route('/api/ledger/summary', methods=['GET'])
+def get_ledger_summary():
+    limit = min(1000, max(1, request.args.get('limit', 10, type=int)))
+    return jsonify({**ledger.summary(limit), "accounts": ledger.balances()})
+
+@app.route('/api/ledger/rollup/<dim>', methods=['GET'])
+def get_ledger_rollup(dim):
+    # Time dimensions take ?start=&end= (key prefixes, e.g. 2026-10-01); the others ?key= or ?sort=
+    if dim not in DIMENSIONS: return jsonify({"status": "error", "message": f"Unknown dimension: {dim}"}), 400
+    limit = min(5000, max(1, request.args.get('limit', 100, type=int)))
+    if dim in TIME_DIMENSIONS:
+        return jsonify({"dim": dim, "buckets": ledger.range(dim, request.args.get('start'), request.args.get('end'), limit)})
+    if dim == 'total' or 'key' in request.args:
+        key = request.args.get('key', '')
+        bucket = ledger.get(dim, key)
+        return jsonify({"dim": dim, "buckets": [dict(bucket, key=key)] if bucket else []})
+    sort = request.args.get('sort', 'revenue')
+    if sort not in ('revenue', 'cost', 'margin', 'entries'): return jsonify({"status": "error", "message": f"Cannot sort by {sort}"}), 400
+    return jsonify({"dim": dim, "buckets": ledger.breakdown(dim, limit, sort)})
+
+@app.route('/api/ledger/entries', methods=['GET'])
+def get_ledger_entries():
+    limit = min(1000, max(1, request.args.get('limit', 100, type=int)))
+    filters = {k: request.args.get(k) for k in ('order', 'product', 'customer', 'kind')}
+    page, next_cursor = blocking(ledger.entries, limit, before=request.args.get('before', type=int), **filters)
+    return jsonify({"entries": page, "next": next_cursor})
+
+# --- WHAT-IF SIMULATION ---
+what_if_pool = None
+what_if_lock = Lock()
+
+def what_if_scenario(spec):
+    # Anything the caller leaves out starts from the live floor and order book
+    primary = floor.machine(0)
+    scenario = dict(spec)
+    scenario.setdefault('machines', floor.size)
+    scenario['start'] = {**primary, **(spec.get('start') or {})}
+    scenario.setdefault('start_time', time.time())
+    if 'orders' not in scenario:
+        with store.lock: scenario['orders'] = [dict(o) for o in store.book if o.get('status') not in ('Completed', 'QA Check')]
+    return scenario
+
+@app.route('/api/simulate/what_if', methods=['POST'])
+def simulate_what_if():
+    global what_if_pool
+    data = request.json or {}
+    specs = data.get('scenarios') or [data]
+    if len(specs) > MAX_SCENARIOS: return jsonify({"status": "error", "message": f"At most {MAX_SCENARIOS} scenarios per request"}), 400
+    scenarios = [what_if_scenario(spec) for spec in specs]
+    try:
+        for scenario in scenarios: validate_scenario(scenario) # before any of them runs
+    except (ValueError, TypeError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    with what_if_lock:
+        if what_if_pool is None and len(scenarios) > 1: what_if_pool = make_pool(WHATIF_WORKERS)
+    try:
+        # A single run computes in-line (off the event loop); batches wait on the process pool
+        results = run_many(scenarios, pool=what_if_pool) if len(scenarios) > 1 else blocking(run_many, scenarios)
+    except (ValueError, TypeError, IndexError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "results": results})
+
+@app.route('/api/floor/machines', methods=['GET'])
+def get_floor_machines():
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(1000, max(1, request.args.get('limit', 100, type=int)))
+    sel = slice(offset, min(floor.size, offset + limit))
+    return jsonify({
+        "total": floor.size,
+        "offset": offset,
+        "rpm": floor.current_rpm[sel].astype(int).tolist(),
+        "target_rpm": floor.target_rpm[sel].astype(int).tolist(),
+        "temp": floor.temp[sel].round(1).tolist(),
+        "health": floor.health[sel].round(1).tolist(),
+        "efficiency": floor.efficiency[sel].astype(int).tolist(),
+        "yield": floor.yield_count[sel].tolist(),
+        "running": floor.running[sel].tolist(),
+        "aggregate": floor.aggregate()
     })
 
 @app.route('/api/analytics/snapshot', methods=['GET'])
 def get_analytics_snapshot():
-    data = load_data()
     return jsonify({
-        "orders": simulation_state['active_orders'],
-        "inventory": data.get('logistics_and_sustainability', {}).get('inventory', []),
-        "reports": simulation_state['reports']
+        "orders": store.orders,
+        "inventory": store.get('logistics_and_sustainability', {}).get('inventory', []),
+        "reports": store.reports
     })
 
 @app.route('/api/system/reset', methods=['POST'])
 def reset_system():
     global simulation_state
-    existing_users = load_data().get('users', []) 
-    simulation_state["active_orders"] = []
-    simulation_state["client_orders"] = []
-    simulation_state["reports"] = []
-    simulation_state["yield_count"] = 0
-    simulation_state["efficiency"] = 100
+    existing_users = store.users
+    with client_orders_lock: simulation_state["client_orders"].clear()
+    scheduler.clear()
+    floor.yield_count[:] = 0
+    floor.efficiency[:] = 100
+    sync_primary()
     clean_data = {
-        "production_hub": { "orders": [], "efficiency_history": [], "yield_total": 0, "reports": [] },
+        "production_hub": { "orders": [], "efficiency_history": [], "yield_total": 0, "reports": [],
+                            "order_seq": store.book.next_seq, "client_order_seq": ingest.reserved }, # ids stay unique across resets
         "inventory": [
             {"name": "Steel Sheets", "stock": 2000, "max": 2000, "burnRate": 15},
             {"name": "Copper Wire", "stock": 2000, "max": 2000, "burnRate": 5},
@@ -466,15 +784,18 @@ def reset_system():
         "users": existing_users 
     }
     try:
-        with open(DATA_FILE, 'w') as f: json.dump(clean_data, f, indent=4)
-        socketio.emit('order_update', [])
-        socketio.emit('report_update', [])
+        blocking(store.reset, clean_data)
+        blocking(ledger.reverse_all, "System reset")
+        inventory.load(store.inventory, store.get('bom'))
+        alerted['restock'] = set()
+        publish_orders(full=True)
+        publish('report_update', [], 'reports')
         return jsonify({"status": "success", "message": "Factory System Reset Complete"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
-@socketio.on('ai_command')
-def handle_ai(data):
+def run_ai_command(data):
+    # Returns the acknowledgement for the sender, if there is one
     cmd = data.get('cmd', '').lower()
     if data.get('notification_to_operator'):
         msg = data.get('message', 'Alert from Manager')
@@ -483,48 +804,62 @@ def handle_ai(data):
             "message": msg,
             "timestamp": datetime.now().strftime("%H:%M:%S")
         }
-        simulation_state['notifications'].append(notif)
-        socketio.emit('new_notification', notif) # Emits to Operator HUD
-        return
+        notify(notif, 'Operator') # Operator HUD only
+        return None
     if simulation_state['is_locked'] and ("speed" in cmd or "temp" in cmd or "start" in cmd or "stop" in cmd):
-        emit('ai_ack', {'response': "LOCKED: Controls Disabled.", 'cmd': cmd})
-        return
-    if "start" in cmd: simulation_state["status"] = "RUNNING"
-    if "stop" in cmd: simulation_state["status"] = "STOPPED"
-    if "repair" in cmd or "stabilize" in cmd: 
-        simulation_state["health"] = 100
-        simulation_state["temp_offset"] = 0
-    if "increase speed" in cmd: simulation_state["target_rpm"] += 100
-    if "decrease speed" in cmd: simulation_state["target_rpm"] -= 100
-    if "increase temp" in cmd: simulation_state["temp_offset"] += 5
-    if "decrease temp" in cmd: simulation_state["temp_offset"] -= 5
+        return {'response': "LOCKED: Controls Disabled.", 'cmd': cmd}
+    try:
+        floor.command(cmd, data.get('machine'))
+    except (IndexError, ValueError) as e:
+        return {'response': f"ERROR: {e}", 'cmd': cmd}
+    sync_primary()
     response = f"Executed: {cmd}"
-    emit('ai_ack', {'response': response, 'cmd': cmd})
+    return {'response': response, 'cmd': cmd}
 
-@socketio.on('connect')
-def connect():
+@socketio.on('ai_command')
+def handle_ai(data):
+    ack = run_ai_command(data)
+    if ack: emit('ai_ack', ack)
+
+def start_engine():
+    # Starts the tick loop once: at server start (serve.py) or on the first socket connection
     global thread
     with thread_lock:
         if thread is None: thread = socketio.start_background_task(background_thread)
-    data = load_data()
-    inventory = data.get('inventory', [])
-    emit('system_update', {
-        'rpm': int(simulation_state["current_rpm"]),
-        'temp': simulation_state["temp"],
-        'status': simulation_state["status"],
-        'health': simulation_state['health'],
-        'efficiency': simulation_state['efficiency'],
-        'yield': simulation_state['yield_count'],
-        'locked': simulation_state["is_locked"],
-        'client_orders': simulation_state['client_orders'],
-        'inventory': inventory
-    })
-    emit('order_update', simulation_state['active_orders'])
-    emit('report_update', simulation_state['reports'])
 
-@app.route('/<path:filename>')
-def serve_static(filename):
-    return send_from_directory(current_dir, filename)
+def on_connect():
+    start_engine()
+    emit_telemetry(locked=simulation_state["is_locked"])
+    publish_orders()
+
+# --- WEB FRONT ---
+# Pages, static files, read-only APIs and the socket handlers, shared with cluster workers (web.py)
+web = WebFront(app, socketio, FEEDS, notifications, report_log, lambda: store.reports, scheduler, assets,
+               metrics_allow=METRICS_ALLOW, on_connect=on_connect)
+
+# --- CLUSTER ---
+# As the owner of a cluster this process alone runs the simulation and mutates
+# state. Every publish() is mirrored on the bus 'emit' channel for the web
+# workers' sockets, and workers send what they can't serve from their replicas
+# here: HTTP requests (replayed through this app), socket commands, and the
+# state snapshot they start from.
+HOP_HEADERS = {'Content-Length', 'Transfer-Encoding', 'Connection'}
+
+def serve_forwarded(req):
+    client = app.test_client(use_cookies=False)
+    resp = client.open(req['path'], method=req['method'], query_string=req['query'], headers=req['headers'],
+                       data=base64.b64decode(req['body']), environ_base={'REMOTE_ADDR': req['remote_addr']})
+    return {'status': resp.status_code, 'headers': [(k, v) for k, v in resp.headers if k not in HOP_HEADERS],
+            'body': base64.b64encode(resp.get_data()).decode()}
+
+def replica_state(_):
+    entries, _, _ = notifications.since(0, limit=NOTIFY_CAPACITY)
+    return {'feeds': {name: feed.snapshot() for name, feed in FEEDS.items()}, 'notifications': entries, 'reports': store.reports}
+
+if bus is not None:
+    bus.serve('owner.http', serve_forwarded)
+    bus.serve('owner.command', run_ai_command)
+    bus.serve('owner.state', replica_state)
 
 if __name__ == '__main__':
     print("SYSTEM ONLINE: http://127.0.0.1:5000/login.html")
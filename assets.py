@@ -0,0 +1,134 @@
+import os
+import gzip
+import hashlib
+import mimetypes
+import time
+from flask import Response, current_app, request, render_template
+from jinja2 import nodes
+from werkzeug.utils import safe_join
+from metrics import REGISTRY
+
+try:
+    import brotli # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+# --- STATIC ASSETS ---
+# Pages, stylesheets and scripts are read and compressed once (gzip, plus brotli
+# when installed) and kept in memory with a strong ETag per encoding. A request
+# costs a dict lookup and, at most once per `check_interval`, a stat() to notice
+# the file changed. A client that already has the file gets a bodyless 304.
+# Rendered templates are cached the same way. The cache key is the template
+# file plus a caller-supplied version of its inputs. That version only counts
+# when the template actually references its context, so a page that ignores its
+# context stays cached until the file changes.
+
+COMPRESSIBLE = {'.html', '.css', '.js', '.svg', '.txt'}
+PUBLIC = {'.html', '.css', '.js', '.svg', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.ico', '.woff', '.woff2'} # the only files served by path; data, databases and code never are
+MIN_COMPRESS = 512 # bytes; smaller bodies go out as they are
+PER_REQUEST = {'request', 'session', 'g', 'get_flashed_messages'} # template globals that differ per request
+
+RESPONSES = REGISTRY.counter('factory_static_responses_total', 'Cached asset and page responses', ('status', 'encoding'))
+
+
+class Asset:
+    __slots__ = ('bodies', 'etag', 'mimetype', 'cache_control')
+
+    def __init__(self, body, mimetype, cache_control):
+        self.mimetype, self.cache_control = mimetype, cache_control
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.bodies = {'identity': body}
+        if len(body) >= MIN_COMPRESS:
+            self.bodies['gzip'] = gzip.compress(body, 9, mtime=0)
+            if brotli is not None: self.bodies['br'] = brotli.compress(body, quality=11)
+
+    def tag(self, encoding):
+        # Strong validators must differ between representations
+        return f'"{self.etag}"' if encoding == 'identity' else f'"{self.etag}-{encoding}"'
+
+
+class AssetCache:
+    def __init__(self, root, max_age=300, check_interval=1.0):
+        self.root = root
+        self.max_age = max_age                # seconds browsers may reuse css/js without asking
+        self.check_interval = check_interval  # seconds between stat() calls per file
+        # Plain dict writes: two requests racing on a change at worst build the same asset twice
+        self._files = {}  # path -> (mtime_ns, size, checked_at, asset)
+        self._pages = {}  # template name -> (key, asset)
+        self._used = {}   # template name -> (mtime_ns, context names it references)
+
+    def warm(self):
+        """Build every compressible top-level file now rather than on its first request."""
+        for name in sorted(os.listdir(self.root)):
+            if os.path.splitext(name)[1] in COMPRESSIBLE: self.file(name)
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    # --- FILES ---
+    def file(self, filename):
+        """The cached asset for a file under root, or None when it isn't a compressible file."""
+        if os.path.splitext(filename)[1] not in COMPRESSIBLE: return None
+        path = safe_join(self.root, filename)
+        if path is None: return None
+        now = time.monotonic()
+        entry = self._files.get(path)
+        if entry is not None and now - entry[2] < self.check_interval: return entry[3]
+        stat = self._stat(path)
+        if stat is None:
+            self._files.pop(path, None)
+            return None
+        if entry is not None and entry[:2] == stat:
+            self._files[path] = (*stat, now, entry[3])
+            return entry[3]
+        with open(path, 'rb') as f: body = f.read()
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        cache_control = 'no-cache' if filename.endswith('.html') else f'public, max-age={self.max_age}'
+        asset = Asset(body, mimetype, cache_control)
+        self._files[path] = (*stat, now, asset)
+        return asset
+
+    # --- TEMPLATES ---
+    def _references(self, name, mtime):
+        # Every name the template reads (globals like `session` included), re-parsed only when the file changes
+        used = self._used.get(name)
+        if used is None or used[0] != mtime:
+            env = current_app.jinja_env
+            source = env.loader.get_source(env, name)[0]
+            names = {n.name for n in env.parse(source).find_all(nodes.Name) if n.ctx == 'load'}
+            used = self._used[name] = (mtime, frozenset(names))
+        return used[1]
+
+    def page(self, name, version=None, private=False, **context):
+        """render_template(name, **context), cached until the template or (when it uses them) its inputs change.
+
+        `version` must change whenever the context values would."""
+        stat = self._stat(safe_join(self.root, name))
+        used = self._references(name, stat)
+        key = (stat, version if used & context.keys() else None)
+        if used & PER_REQUEST: key = None # never reused
+        cached = self._pages.get(name)
+        if cached is not None and cached[0] == key: return cached[1]
+        asset = Asset(render_template(name, **context).encode(), 'text/html', 'private, no-cache' if private else 'no-cache')
+        if key is not None: self._pages[name] = (key, asset)
+        return asset
+
+    # --- RESPONSES ---
+    def respond(self, asset):
+        """The best encoding the client accepts, or 304 when its If-None-Match already names it."""
+        accepted = request.accept_encodings
+        encoding = next((e for e in ('br', 'gzip') if e in asset.bodies and accepted[e]), 'identity')
+        headers = {'ETag': asset.tag(encoding), 'Cache-Control': asset.cache_control, 'Vary': 'Accept-Encoding'}
+        match = request.headers.get('If-None-Match')
+        if match:
+            tags = {t.strip().removeprefix('W/') for t in match.split(',')}
+            if '*' in tags or tags & {asset.tag(e) for e in asset.bodies}:
+                RESPONSES.inc(status=304, encoding=encoding)
+                return Response(status=304, headers=headers)
+        if encoding != 'identity': headers['Content-Encoding'] = encoding
+        RESPONSES.inc(status=200, encoding=encoding)
+        return Response(asset.bodies[encoding], mimetype=asset.mimetype, headers=headers)
@@ -0,0 +1,293 @@
+"""Socket capacity benchmark for the production server (serve.py).
+
+Starts serve.py in a subprocess on a local port with scratch state files, then
+opens --idle anonymous Socket.IO connections (heartbeats only) and --active
+Operator connections that get every tick's feed deltas and send a 'subscribe'
+round trip every --interval seconds. Tick lag and tick duration come from the
+server's /metrics histograms, scraped before and after each phase, so the
+steady-state figures can be compared with an unloaded server.
+
+    python benchmarks/bench_async.py [--idle 5000] [--active 500] [--duration 30]
+        [--mode gevent|threading] [--max-lag 0.25]
+
+Exits with status 1 when a connection fails or drops, or when the loaded p99
+tick lag exceeds --max-lag. Client sockets speak Engine.IO v4 over a raw
+websocket, one greenlet each.
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import socket
+import struct
+import shutil
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+from http.cookies import SimpleCookie
+
+import gevent
+import gevent.event
+from gevent.lock import BoundedSemaphore
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER = {"email": "bench@factory.local", "password": "bench", "role": "Operator"}
+HISTOGRAMS = ('factory_tick_lag_seconds', 'factory_tick_seconds')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, port, mode):
+    shutil.copy(os.path.join(ROOT, 'master_manufacturing_data.json'), os.path.join(workdir, 'state.json'))
+    env = dict(os.environ, FACTORY_ASYNC_MODE=mode, FACTORY_HOST='127.0.0.1', FACTORY_PORT=str(port),
+               FACTORY_DATA_FILE=os.path.join(workdir, 'state.json'), FACTORY_DB_FILE=os.path.join(workdir, 'factory.db'),
+               FACTORY_REPORT_DB=os.path.join(workdir, 'reports.db'), FACTORY_LEDGER_DB=os.path.join(workdir, 'ledger.db'))
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'serve.py')], env=env, cwd=workdir,
+                              stdout=subprocess.DEVNULL, stderr=open(os.path.join(workdir, 'server.log'), 'w'))
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1): return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+def http(port, path, body=None, cookie=None):
+    req = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=json.dumps(body).encode() if body is not None else None,
+                                 headers={'Content-Type': 'application/json', **({'Cookie': cookie} if cookie else {})})
+    with urllib.request.urlopen(req, timeout=30) as resp: return resp.read().decode(), resp.headers
+
+
+def login(port):
+    http(port, '/api/auth/register', USER)
+    _, headers = http(port, '/api/auth/login', USER)
+    jar = SimpleCookie()
+    for value in headers.get_all('Set-Cookie') or []: jar.load(value)
+    return '; '.join(f"{k}={m.value}" for k, m in jar.items())
+
+
+def scrape(port):
+    text, _ = http(port, '/metrics')
+    out = {}
+    for line in text.splitlines():
+        if line.startswith('#'): continue
+        name, _, value = line.rpartition(' ')
+        for h in HISTOGRAMS:
+            if name.startswith(h + '_bucket{'):
+                le = name.split('le="')[1].rstrip('"}')
+                out.setdefault(h, {}).setdefault('buckets', []).append((float('inf') if le == '+Inf' else float(le), float(value)))
+            elif name in (h + '_sum', h + '_count'):
+                out.setdefault(h, {})[name[len(h) + 1:]] = float(value)
+    return out
+
+
+def histogram_stats(before, after, name):
+    # Quantiles from bucket deltas are upper bounds (the bucket edge)
+    a, b = after.get(name, {}), before.get(name, {})
+    count = a.get('count', 0) - b.get('count', 0)
+    if not count: return {"count": 0}
+    base = dict(b.get('buckets', []))
+    cumulative = [(le, n - base.get(le, 0)) for le, n in a['buckets']]
+    out = {"count": int(count), "mean_ms": round((a['sum'] - b.get('sum', 0)) / count * 1000, 2)}
+    for q in (50, 95, 99):
+        edge = next(le for le, n in cumulative if n >= q / 100 * count)
+        out[f"p{q}_ms"] = '>' + str(cumulative[-2][0] * 1000) if edge == float('inf') else edge * 1000
+    return out
+
+
+class Stats:
+    def __init__(self):
+        self.connected = 0
+        self.failed = 0
+        self.dropped = 0
+        self.deltas = 0
+        self.rtt = []
+        self.gaps = []
+        self.recording = False
+
+
+class WebSocket:
+    """Just enough of a websocket client for Engine.IO text frames."""
+
+    def __init__(self, port, path, cookie=None):
+        self.sock = socket.create_connection(('127.0.0.1', port), timeout=30)
+        self.sock.settimeout(None)
+        self.buf = bytearray()
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.sock.sendall((f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                           f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n"
+                           + (f"Cookie: {cookie}\r\n" if cookie else "") + "\r\n").encode())
+        while b'\r\n\r\n' not in self.buf: self._fill()
+        end = self.buf.index(b'\r\n\r\n') + 4
+        status = bytes(self.buf[:end]).split(b'\r\n', 1)[0]
+        del self.buf[:end]
+        if b' 101 ' not in status: raise ConnectionError(status.decode(errors='replace'))
+
+    def _fill(self):
+        chunk = self.sock.recv(65536)
+        if not chunk: raise ConnectionError("closed by server")
+        self.buf += chunk
+
+    def _read(self, n):
+        while len(self.buf) < n: self._fill()
+        out = bytes(self.buf[:n])
+        del self.buf[:n]
+        return out
+
+    def receive(self):
+        while True:
+            b1, b2 = self._read(2)
+            n = b2 & 0x7f
+            if n == 126: n = struct.unpack('!H', self._read(2))[0]
+            elif n == 127: n = struct.unpack('!Q', self._read(8))[0]
+            payload = self._read(n)
+            op = b1 & 0x0f
+            if op == 8: raise ConnectionError("closed by server")
+            if op == 9: self._send(0xA, payload)
+            elif op == 1: return payload.decode()
+
+    def _send(self, op, data):
+        mask = os.urandom(4)
+        n = len(data)
+        header = bytes([0x80 | op]) + (bytes([0x80 | n]) if n < 126 else bytes([0x80 | 126]) + struct.pack('!H', n) if n < 65536
+                                       else bytes([0x80 | 127]) + struct.pack('!Q', n))
+        self.sock.sendall(header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(data)))
+
+    def send(self, text):
+        self._send(0x1, text.encode())
+
+    def close(self):
+        self.sock.close()
+
+
+def client(port, cookie, active, interval, stats, stop, gate):
+    try:
+        with gate: ws = WebSocket(port, "/socket.io/?EIO=4&transport=websocket", cookie)
+    except OSError:
+        stats.failed += 1
+        return
+    state = {'sent': None, 'last': None}
+
+    def subscriber():
+        # Round trips from active sockets, spread across the interval
+        gevent.sleep(interval * random.random())
+        while not stop.is_set():
+            state['sent'] = time.monotonic()
+            ws.send('42["subscribe",{"topics":["system","orders","notifications","maintenance"]}]')
+            gevent.sleep(interval)
+
+    sender = None
+    try:
+        while not stop.is_set():
+            msg = ws.receive()
+            now = time.monotonic()
+            if msg == '2': ws.send('3')
+            elif msg.startswith('0{'): ws.send('40')
+            elif msg.startswith('40') and sender is None:
+                stats.connected += 1
+                sender = gevent.spawn(subscriber) if active else False
+            elif msg.startswith('42["feed_delta"'):
+                if stats.recording:
+                    stats.deltas += 1
+                    if state['last'] is not None: stats.gaps.append(now - state['last'])
+                state['last'] = now
+            elif msg.startswith('42["subscribed"') and state['sent'] is not None:
+                if stats.recording: stats.rtt.append(now - state['sent'])
+                state['sent'] = None
+    except OSError:
+        if not stop.is_set(): stats.dropped += 1
+    finally:
+        if sender: sender.kill()
+        ws.close()
+
+
+def rss_kb(pid):
+    with open(f"/proc/{pid}/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmRSS'))
+
+
+def pct(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 1) if values else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--idle', type=int, default=5000)
+    parser.add_argument('--active', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30, help='seconds measured with every socket connected')
+    parser.add_argument('--warmup', type=float, default=10, help='seconds measured before the sockets connect')
+    parser.add_argument('--interval', type=float, default=5, help='seconds between round trips per active socket')
+    parser.add_argument('--ramp', type=int, default=100, help='connections opened concurrently')
+    parser.add_argument('--mode', default='gevent', choices=('gevent', 'threading'))
+    parser.add_argument('--max-lag', type=float, default=0.25, help='loaded p99 tick lag (s) above which the run fails')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='factory-async-')
+    port = free_port()
+    server = start_server(workdir, port, args.mode)
+    stop = gevent.event.Event()
+    stats = Stats()
+    greenlets = []
+    gate = BoundedSemaphore(args.ramp)
+    try:
+        cookie = login(port)
+        # One socket starts the tick; measure it unloaded first
+        greenlets.append(gevent.spawn(client, port, cookie, False, args.interval, stats, stop, gate))
+        gevent.sleep(2)
+        before, rss_before = scrape(port), rss_kb(server.pid)
+        gevent.sleep(args.warmup)
+        unloaded = scrape(port)
+
+        started = time.monotonic()
+        for i in range(args.idle + args.active):
+            active = i >= args.idle
+            greenlets.append(gevent.spawn(client, port, cookie if active else None, active, args.interval, stats, stop, gate))
+        while stats.connected + stats.failed < args.idle + args.active + 1 and time.monotonic() - started < 300: gevent.sleep(0.5)
+        ramp_s = time.monotonic() - started
+        ramped = scrape(port)
+
+        stats.recording = True
+        gevent.sleep(args.duration)
+        stats.recording = False
+        loaded, rss_after = scrape(port), rss_kb(server.pid)
+    finally:
+        stop.set()
+        server.terminate()
+        gevent.joinall(greenlets, timeout=10)
+        server.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    lag = histogram_stats(ramped, loaded, 'factory_tick_lag_seconds')
+    print(f"mode {args.mode}: {stats.connected} sockets connected ({args.idle} idle + {args.active} active + 1) in {ramp_s:.1f}s, "
+          f"{stats.failed} failed, {stats.dropped} dropped")
+    print(f"server RSS {rss_before // 1024} MB -> {rss_after // 1024} MB "
+          f"(~{(rss_after - rss_before) / max(1, stats.connected):.0f} KB per socket)")
+    print(f"{'phase':>10} | {'ticks':>6} | {'lag p50':>8} | {'lag p95':>8} | {'lag p99':>8} | {'tick mean':>9} | {'tick p99':>8}  (ms)")
+    for label, a, b in (('unloaded', before, unloaded), ('ramp', unloaded, ramped), ('loaded', ramped, loaded)):
+        l, t = histogram_stats(a, b, 'factory_tick_lag_seconds'), histogram_stats(a, b, 'factory_tick_seconds')
+        print(f"{label:>10} | {l['count']:>6} | {l.get('p50_ms', '-'):>8} | {l.get('p95_ms', '-'):>8} | {l.get('p99_ms', '-'):>8} | "
+              f"{t.get('mean_ms', '-'):>9} | {t.get('p99_ms', '-'):>8}")
+    print(f"active sockets: {stats.deltas / args.duration:.0f} feed deltas/s received, gap between deltas p50 {pct(stats.gaps, 50)} "
+          f"p99 {pct(stats.gaps, 99)} ms, subscribe round trip p50 {pct(stats.rtt, 50)} p95 {pct(stats.rtt, 95)} p99 {pct(stats.rtt, 99)} ms")
+
+    p99 = lag.get('p99_ms')
+    ok = (not stats.failed and not stats.dropped and lag['count'] and isinstance(p99, float) and p99 <= args.max_lag * 1000)
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
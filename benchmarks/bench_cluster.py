@@ -0,0 +1,120 @@
+"""HTTP throughput of the clustered server (cluster.py) against one process.
+
+For each entry of --workers, starts cluster.py (0 = plain serve.py) with scratch
+state files, logs in, then runs --concurrency keep-alive clients for --duration
+seconds. Each client cycles through three reads:
+
+    local      GET /api/get_notifications?since=<cursor>  (worker's notification replica)
+    schedule   GET /api/schedule                          (worker's schedule replica)
+    forwarded  GET /api/maintenance/forecast              (owner, over the bus)
+
+and the run reports requests/s and latency for each, plus the owner's tick lag.
+Replica reads scale with the cores the workers get; forwarded ones are bounded
+by the owner. On a machine with fewer cores than workers + owner + this client,
+neither can scale: there the cluster only adds the bus hop and process switches.
+
+    python benchmarks/bench_cluster.py [--workers 0,1,2,4] [--concurrency 64] [--duration 15]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import http.client
+
+from bench_async import ROOT, free_port, login, scrape, histogram_stats, pct
+import gevent
+import gevent.event
+
+PATHS = {'local': '/api/get_notifications?since={cursor}', 'schedule': '/api/schedule', 'forwarded': '/api/maintenance/forecast'}
+
+
+def start_cluster(workdir, port, workers):
+    shutil.copy(os.path.join(ROOT, 'master_manufacturing_data.json'), os.path.join(workdir, 'state.json'))
+    env = dict(os.environ, FACTORY_HOST='127.0.0.1', FACTORY_PORT=str(port),
+               FACTORY_DATA_FILE=os.path.join(workdir, 'state.json'), FACTORY_DB_FILE=os.path.join(workdir, 'factory.db'),
+               FACTORY_REPORT_DB=os.path.join(workdir, 'reports.db'), FACTORY_LEDGER_DB=os.path.join(workdir, 'ledger.db'))
+    cmd = [os.path.join(ROOT, 'serve.py')] if not workers else \
+        [os.path.join(ROOT, 'cluster.py'), '--workers', str(workers), '--host', '127.0.0.1', '--port', str(port), '--bus-port', str(free_port())]
+    server = subprocess.Popen([sys.executable, *cmd], env=env, cwd=workdir,
+                              stdout=subprocess.DEVNULL, stderr=open(os.path.join(workdir, 'server.log'), 'w'))
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/get_notifications?since=0')
+            if conn.getresponse().status == 200: return server
+        except OSError:
+            pass
+        time.sleep(0.5)
+    server.kill()
+    raise RuntimeError("cluster did not start")
+
+
+def client(port, cookie, stop, latencies, errors):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    cursor, kinds = 0, list(PATHS)
+    i = 0
+    while not stop.is_set():
+        kind = kinds[i % len(kinds)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('GET', PATHS[kind].format(cursor=cursor), headers={'Cookie': cookie})
+            resp = conn.getresponse()
+            body = resp.read()
+        except (OSError, http.client.HTTPException):
+            errors[kind] += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            continue
+        if resp.status != 200:
+            errors[kind] += 1
+            continue
+        latencies[kind].append(time.perf_counter() - start)
+        if kind == 'local': cursor = json.loads(body)['cursor']
+
+
+def run(workers, concurrency, duration):
+    workdir = tempfile.mkdtemp(prefix='factory-cluster-')
+    port = free_port()
+    server = start_cluster(workdir, port, workers)
+    stop = gevent.event.Event()
+    latencies, errors = {k: [] for k in PATHS}, {k: 0 for k in PATHS}
+    try:
+        cookie = login(port)
+        owner_port = port + 1 if workers else port
+        before = scrape(owner_port)
+        greenlets = [gevent.spawn(client, port, cookie, stop, latencies, errors) for _ in range(concurrency)]
+        gevent.sleep(duration)
+        stop.set()
+        gevent.joinall(greenlets, timeout=30)
+        lag = histogram_stats(before, scrape(owner_port), 'factory_tick_lag_seconds')
+    finally:
+        server.terminate()
+        server.wait(timeout=20)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return latencies, errors, lag
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', default='0,1,2,4', help='comma-separated worker counts (0 = single process)')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=15)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU(s); {args.concurrency} keep-alive clients for {args.duration:.0f}s per run")
+    print(f"{'workers':>8} | {'kind':>9} | {'req/s':>7} | {'p50':>6} | {'p99':>7} | {'errors':>6} | {'tick lag p99':>12}  (ms)")
+    for workers in (int(w) for w in args.workers.split(',')):
+        latencies, errors, lag = run(workers, args.concurrency, args.duration)
+        for kind in PATHS:
+            print(f"{workers or 'single':>8} | {kind:>9} | {len(latencies[kind]) / args.duration:>7.0f} | {pct(latencies[kind], 50):>6} | "
+                  f"{pct(latencies[kind], 99):>7} | {errors[kind]:>6} | {lag.get('p99_ms', '-'):>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Per-mutation write cost vs. order-history size.
+
+Compares the old behaviour (rewrite the whole document with indent=2 on every
+mutation) with the journal and SQLite storage backends of StateStore. The
+flushes the background flusher would run (batch writes, fsyncs, journal
+compactions) are run inline as the backend asks for them, so the figures are
+amortized over everything a mutation causes. The journal compacts once it
+reaches --compact-ratio x the snapshot (FACTORY_COMPACT_RATIO), so it runs
+for --cycles whole compaction cycles at each size, however many mutations
+that takes; the other backends run --mutations.
+
+    python benchmarks/bench_journal.py [--sizes 1000,10000,100000] [--mutations 5000] [--cycles 3] [--compact-ratio 1.0]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from state_store import StateStore
+from storage import JournalStorage, SqliteStorage, migrate_json_to_sqlite
+
+
+def make_doc(n_orders):
+    orders = [{"id": f"#ORD-{i:06d}", "product": "Hydraulic Valve", "quantity": 100, "deadline": None,
+               "priority": "NORMAL", "priority_color": "#94a3b8", "progress": 100, "status": "Completed",
+               "paused": False, "start_time": "2026-01-17 01:30:03"} for i in range(n_orders)]
+    return {"production_hub": {"orders": orders, "reports": []}, "inventory": [],
+            "financials": {"revenue": 0, "cost": 0}, "users": []}
+
+
+def mutate(store, i):
+    store.add_report({"timestamp": "2026-01-17 01:30:03", "type": "INFO", "content": f"bench {i}", "author": "bench"})
+    store.post('revenue', 50)
+
+
+def bench_legacy(path, mutations):
+    # What save_data() used to do after every mutation
+    with open(path) as f: doc = json.load(f)
+    start = time.perf_counter()
+    for i in range(mutations):
+        doc['financials']['revenue'] += 50
+        with open(path, 'w') as f: json.dump(doc, f, indent=2)
+    return (time.perf_counter() - start) / mutations
+
+
+def bench_store(backend, mutations=None, done=None):
+    # Runs `mutations` mutations, or until done() says so (checked after each inline flush)
+    store = StateStore(backend)
+    start, i = time.perf_counter(), 0
+    while (i < mutations) if mutations is not None else not done():
+        mutate(store, i)
+        i += 1
+        if store._wake.is_set():
+            # The flusher's early wake-up, done inline
+            store._wake.clear()
+            store.flush()
+    store.flush()
+    return (time.perf_counter() - start) / (i * 2), i
+
+
+def bench_journal(path, cycles, compact_ratio):
+    backend = JournalStorage(path, compact_ratio=compact_ratio)
+    compact, compactions = backend.compact, [0]
+    def counted(store):
+        compactions[0] += 1
+        compact(store)
+    backend.compact = counted
+    elapsed, mutations = bench_store(backend, done=lambda: compactions[0] >= cycles)
+    backend.journal.close()
+    return elapsed, mutations
+
+
+def bench_sqlite(path, mutations):
+    db_path = path + '.db'
+    migrate_json_to_sqlite(path, db_path)
+    backend = SqliteStorage(db_path)
+    return bench_store(backend, mutations)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,50000,100000')
+    parser.add_argument('--mutations', type=int, default=5000, help='each is two records (a report and a posting)')
+    parser.add_argument('--cycles', type=int, default=3, help='journal compactions to run through per size')
+    parser.add_argument('--compact-ratio', type=float, default=1.0, help='journal size / snapshot size that triggers a compaction (FACTORY_COMPACT_RATIO)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='factory-bench-')
+    try:
+        print(f"rewrite and sqlite: {args.mutations * 2} records; journal: {args.cycles} compaction cycles (ratio {args.compact_ratio})")
+        print(f"{'orders':>8} | {'rewrite/mutation':>18} | {'journal/mutation':>18} | {'journal records':>15} | {'sqlite/mutation':>18}")
+        for n in [int(x) for x in args.sizes.split(',')]:
+            path = os.path.join(workdir, f'state-{n}.json')
+            with open(path, 'w') as f: json.dump(make_doc(n), f)
+            legacy = bench_legacy(path, max(5, args.mutations // 500))
+            journal, journal_mutations = bench_journal(path, args.cycles, args.compact_ratio)
+            sqlite = bench_sqlite(path, args.mutations)
+            print(f"{n:>8} | {legacy * 1e6:>15.0f} us | {journal * 1e6:>15.1f} us | {journal_mutations * 2:>15} | {sqlite * 1e6:>15.1f} us")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
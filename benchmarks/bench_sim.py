@@ -0,0 +1,74 @@
+"""Tick time of the vectorized floor simulation vs. the original per-dict loop.
+
+    python benchmarks/bench_sim.py [--sizes 10,1000,100000] [--ticks 20]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sim_engine import FloorSimulation
+
+
+def legacy_machine():
+    return {"target_rpm": 1200, "current_rpm": 1200, "temp": 65.0, "temp_offset": 0.0, "health": 100.0,
+            "efficiency": 95.0, "yield_count": 0, "status": "RUNNING"}
+
+
+def legacy_step(s):
+    # Physics of the original background_thread(), one machine dict at a time
+    if s["status"] == "STOPPED":
+        s["target_rpm"] = 0
+        if s["current_rpm"] > 0:
+            s["current_rpm"] -= max(10, s["current_rpm"] * 0.15)
+            if s["current_rpm"] < 1: s["current_rpm"] = 0
+        if s["temp"] > 0:
+            s["temp"] = max(0, s["temp"] - 2.0)
+        s["efficiency"] = 0
+        return
+    if s["current_rpm"] < s["target_rpm"]: s["current_rpm"] += random.randint(20, 50)
+    elif s["current_rpm"] > s["target_rpm"]: s["current_rpm"] -= random.randint(20, 50)
+    s["current_rpm"] = max(0, s["current_rpm"] + random.randint(-5, 5))
+    if s["current_rpm"] > 100:
+        base_temp = 60 + (abs(s["current_rpm"] - 1200) / 30) + s["temp_offset"]
+        s["temp"] = round(base_temp + random.uniform(-0.5, 0.5), 1)
+    elif s["temp"] > 20: s["temp"] -= 0.5
+    eff_loss = 0
+    if abs(s["current_rpm"] - 1200) > 100: eff_loss += 5
+    if s["temp"] > 80: eff_loss += 10
+    s["efficiency"] = max(50, 100 - eff_loss - (100 - s["health"]) * 0.2)
+    if s["efficiency"] > 80: s["yield_count"] += random.randint(1, 3)
+    stress = 0
+    if s["current_rpm"] > 1800: stress += 0.2
+    if s["temp"] > 85: stress += 0.3
+    if s["current_rpm"] > 0: stress += 0.05
+    s["health"] = max(0, s["health"] - stress)
+    if s["health"] < 80:
+        s["health"], s["temp_offset"], s["target_rpm"] = 100.0, 0.0, 1200
+
+
+def timed(fn, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks): fn()
+    return (time.perf_counter() - start) / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10,1000,100000')
+    parser.add_argument('--ticks', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'machines':>9} | {'per-dict tick':>14} | {'vectorized tick':>16} | {'speedup':>8}")
+    for n in [int(x) for x in args.sizes.split(',')]:
+        machines = [legacy_machine() for _ in range(n)]
+        legacy = timed(lambda: [legacy_step(m) for m in machines], args.ticks)
+        floor = FloorSimulation(n, seed=1)
+        vectorized = timed(floor.step, args.ticks)
+        print(f"{n:>9} | {legacy * 1e3:>11.3f} ms | {vectorized * 1e3:>13.3f} ms | {legacy / vectorized:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Shift-change page-load burst against the production server (serve.py).
+
+Starts serve.py with scratch state files, logs an Operator in, then has
+--clients keep-alive clients each load the operator dashboard and its
+same-origin assets (login page, dashboard, feed.js, style.css, script.js) for
+--duration seconds. This runs twice:
+
+    cold        no validators, as after a cleared cache (gzip accepted)
+    revalidate  If-None-Match with the ETags from the first load, as on a reload
+
+and reports page loads/s, latency per request and bytes on the wire per load.
+
+    python benchmarks/bench_static.py [--clients 50] [--duration 10]
+"""
+import time
+import shutil
+import argparse
+import tempfile
+import http.client
+
+from bench_async import free_port, start_server, login, pct
+import gevent
+import gevent.event
+
+PAGE = ('/login.html', '/operator', '/feed.js', '/style.css', '/script.js')
+
+
+def client(port, cookie, revalidate, stop, stats):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    etags = {}
+    while not stop.is_set():
+        size = 0
+        for path in PAGE:
+            headers = {'Cookie': cookie, 'Accept-Encoding': 'gzip'}
+            if revalidate and path in etags: headers['If-None-Match'] = etags[path]
+            start = time.perf_counter()
+            conn.request('GET', path, headers=headers)
+            resp = conn.getresponse()
+            size += len(resp.read())
+            stats['latency'].append(time.perf_counter() - start)
+            stats['status'][resp.status] = stats['status'].get(resp.status, 0) + 1
+            if resp.getheader('ETag'): etags[path] = resp.getheader('ETag')
+        stats['loads'] += 1
+        stats['bytes'] += size
+
+
+def run(port, cookie, clients, duration, revalidate):
+    stop = gevent.event.Event()
+    stats = {'latency': [], 'status': {}, 'loads': 0, 'bytes': 0}
+    greenlets = [gevent.spawn(client, port, cookie, revalidate, stop, stats) for _ in range(clients)]
+    gevent.sleep(duration)
+    stop.set()
+    gevent.joinall(greenlets, timeout=30)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='factory-static-')
+    port = free_port()
+    server = start_server(workdir, port, 'gevent')
+    try:
+        cookie = login(port)
+        results = [(label, run(port, cookie, args.clients, args.duration, revalidate))
+                   for label, revalidate in (('cold', False), ('revalidate', True))]
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{args.clients} clients, {len(PAGE)} requests per page load, {args.duration:.0f}s per phase")
+    print(f"{'phase':>10} | {'loads/s':>7} | {'req p50':>7} | {'req p99':>7} | {'KB/load':>7} | statuses")
+    for label, s in results:
+        print(f"{label:>10} | {s['loads'] / args.duration:>7.0f} | {pct(s['latency'], 50):>7} | {pct(s['latency'], 99):>7} | "
+              f"{s['bytes'] / max(1, s['loads']) / 1024:>7.1f} | {dict(sorted(s['status'].items()))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""In-process load test for the HTTP routes and the Socket.IO tick.
+
+Drives a weighted mix of requests through Flask's test client while N dashboard
+sockets (Flask-SocketIO's test client) are connected and the factory tick runs
+at a fixed rate, then reports throughput, p50/p95/p99 latency per route, tick
+duration and bytes pushed to each socket per second. Nothing touches the
+network; state files live in a temp directory.
+
+    python benchmarks/load_test.py [--requests 2000] [--threads 4] [--sockets 20]
+        [--mix create_order=2,shop_order=5,workflow_move=2,login=1] [--tick-hz 1]
+        [--save-baseline benchmarks/baseline.json] [--baseline benchmarks/baseline.json]
+
+With --baseline the run is compared against a saved one and exits with status 1
+when a latency, throughput or bytes figure is worse by more than --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STATUSES = ["Pending", "In Progress", "QA Check", "Completed"]
+PRODUCTS = ["Hydraulic Valve", "Piston Ring", "Circuit Board", "Sensor Unit"]
+USER = {"email": "loadtest@factory.local", "password": "loadtest", "role": "Operator"}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def boot(workdir):
+    # app reads its config at import time, so point it at scratch files first
+    shutil.copy(os.path.join(ROOT, 'master_manufacturing_data.json'), os.path.join(workdir, 'state.json'))
+    os.environ['FACTORY_DATA_FILE'] = os.path.join(workdir, 'state.json')
+    os.environ['FACTORY_DB_FILE'] = os.path.join(workdir, 'factory.db')
+    os.environ['FACTORY_REPORT_DB'] = os.path.join(workdir, 'reports.db')
+    os.environ['FACTORY_LEDGER_DB'] = os.path.join(workdir, 'ledger.db')
+    import app
+    app.thread = 'load-test' # the harness drives the tick itself
+    return app
+
+
+class Workload:
+    def __init__(self, seed):
+        self.order_ids = []
+        self.lock = threading.Lock()
+        self.seed = seed
+
+    def create_order(self, client, rng):
+        deadline = time.strftime("%Y-%m-%d", time.localtime(time.time() + rng.randint(0, 10) * 86400))
+        res = client.post('/api/create_order', json={"product": rng.choice(PRODUCTS), "quantity": rng.randint(10, 200), "deadline": deadline})
+        with self.lock: self.order_ids.append(res.get_json()['order_id'])
+        return res
+
+    def shop_order(self, client, rng):
+        return client.post('/api/shop/order', json={"customer_name": f"Buyer {rng.randint(1, 999)}", "product": rng.choice(PRODUCTS),
+                                                    "quantity": rng.randint(1, 20), "unit_price": 250})
+
+    def workflow_move(self, client, rng):
+        with self.lock: order_id = rng.choice(self.order_ids)
+        return client.post('/api/workflow/move', json={"id": order_id, "status": rng.choice(STATUSES)})
+
+    def login(self, client, rng):
+        return client.post('/api/auth/login', json={"email": USER['email'], "password": USER['password']})
+
+
+def percentiles(samples):
+    if not samples: return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+    return {"p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3), "max_ms": round(max(samples) * 1000, 3)}
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix='factory-load-')
+    try:
+        app = boot(workdir)
+        mix = parse_mix(args.mix)
+        work = Workload(args.seed)
+        unknown = [name for name in mix if not hasattr(work, name)]
+        if unknown: raise SystemExit(f"Unknown operations in --mix: {', '.join(unknown)}")
+
+        setup = app.app.test_client()
+        if not app.store.find_user(USER['email']): setup.post('/api/auth/register', json=USER)
+        setup.post('/api/auth/login', json=USER)
+        rng = random.Random(args.seed)
+        for _ in range(args.orders): work.create_order(setup, rng)
+
+        sockets = [app.socketio.test_client(app.app, flask_test_client=setup) for _ in range(args.sockets)]
+        for sock in sockets: sock.get_received() # drop the initial snapshots
+
+        tick_times, stop = [], threading.Event()
+        def ticker():
+            while not stop.is_set():
+                start = time.perf_counter()
+                app.tick()
+                took = time.perf_counter() - start
+                tick_times.append(took)
+                stop.wait(max(0.0, 1.0 / args.tick_hz - took))
+
+        latencies = {name: [] for name in mix}
+        errors = {name: 0 for name in mix}
+        counter, counter_lock = iter(range(args.requests)), threading.Lock()
+        def worker(idx):
+            client, wrng = app.app.test_client(), random.Random(args.seed + idx + 1)
+            client.post('/api/auth/login', json=USER)
+            names, weights = list(mix), list(mix.values())
+            while True:
+                with counter_lock:
+                    if next(counter, None) is None: return
+                name = wrng.choices(names, weights)[0]
+                start = time.perf_counter()
+                res = getattr(work, name)(client, wrng)
+                latencies[name].append(time.perf_counter() - start)
+                if res.status_code >= 400: errors[name] += 1
+
+        tick_thread = threading.Thread(target=ticker, daemon=True)
+        started = time.perf_counter()
+        tick_thread.start()
+        with ThreadPoolExecutor(args.threads) as pool: list(pool.map(worker, range(args.threads)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        tick_thread.join()
+        app.ingest.flush()
+
+        received = sum(len(json.dumps([p['name'], p['args']], default=str)) for sock in sockets for p in sock.get_received())
+        for sock in sockets: sock.disconnect()
+        app.store.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    routes = {name: {"count": len(lat), "errors": errors[name], "throughput_rps": round(len(lat) / elapsed, 2), **percentiles(lat)}
+              for name, lat in latencies.items()}
+    every = [x for lat in latencies.values() for x in lat]
+    return {
+        "config": {k: getattr(args, k) for k in ('requests', 'threads', 'sockets', 'orders', 'mix', 'tick_hz', 'seed')},
+        "elapsed_s": round(elapsed, 3),
+        "total": {"count": len(every), "errors": sum(errors.values()), "throughput_rps": round(len(every) / elapsed, 2), **percentiles(every)},
+        "routes": routes,
+        "tick": {"count": len(tick_times), **percentiles(tick_times)},
+        "socket": {"clients": args.sockets, "bytes_per_client_per_sec": round(received / max(1, args.sockets) / elapsed, 1)},
+    }
+
+
+def report(result):
+    print(f"{'route':>14} | {'count':>6} | {'err':>4} | {'req/s':>9} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    for name, r in {**result['routes'], 'TOTAL': result['total']}.items():
+        if not r['count']: continue
+        print(f"{name:>14} | {r['count']:>6} | {r['errors']:>4} | {r['throughput_rps']:>9.1f} | {r['p50_ms']:>8.2f} | {r['p95_ms']:>8.2f} | {r['p99_ms']:>8.2f}")
+    t = result['tick']
+    if t['count']: print(f"tick: {t['count']} ticks, p50 {t['p50_ms']:.2f} ms, p95 {t['p95_ms']:.2f} ms, max {t['max_ms']:.2f} ms")
+    s = result['socket']
+    print(f"sockets: {s['clients']} clients, {s['bytes_per_client_per_sec']:.0f} bytes/client/s")
+
+
+def compare(result, baseline, tolerance):
+    """Figures that got worse than the baseline by more than `tolerance`."""
+    regressions = []
+    def check(label, current, base, higher_is_worse=True):
+        if current is None or not base: return
+        change = (current - base) / base
+        if (change if higher_is_worse else -change) > tolerance:
+            regressions.append(f"{label}: {base} -> {current} ({change:+.0%})")
+    if baseline.get('config') != result['config']: print("WARNING: baseline was recorded with a different configuration")
+    for name, r in result['routes'].items():
+        base = baseline.get('routes', {}).get(name, {})
+        check(f"{name} p95_ms", r['p95_ms'], base.get('p95_ms'))
+        check(f"{name} throughput_rps", r['throughput_rps'], base.get('throughput_rps'), higher_is_worse=False)
+    check("total throughput_rps", result['total']['throughput_rps'], baseline.get('total', {}).get('throughput_rps'), higher_is_worse=False)
+    check("tick p95_ms", result['tick']['p95_ms'], baseline.get('tick', {}).get('p95_ms'))
+    check("socket bytes_per_client_per_sec", result['socket']['bytes_per_client_per_sec'],
+          baseline.get('socket', {}).get('bytes_per_client_per_sec'))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--sockets', type=int, default=20)
+    parser.add_argument('--orders', type=int, default=200, help='orders created before the run (workflow_move targets)')
+    parser.add_argument('--mix', default='create_order=2,shop_order=5,workflow_move=2,login=1')
+    parser.add_argument('--tick-hz', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--save-baseline')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative change; p95 on a shared machine is noisy')
+    args = parser.parse_args()
+
+    result = run(args)
+    report(result)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f: json.dump(result, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f: regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions: print(f"REGRESSION {line}")
+        if regressions: sys.exit(1)
+        print("no regressions against baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+import sys
+import json
+import uuid
+import socket
+import argparse
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# --- MESSAGE BUS ---
+# Publish/subscribe between the processes of a cluster, over one TCP connection
+# per process. Frames are single lines:
+#   SUB <channel>            subscribe this connection
+#   PUB <channel> <json>     publish; the broker relays it to every subscriber
+#   MSG <channel> <json>     delivery
+# The broker never parses payloads, it only fans lines out. `Broker` is the
+# stand-in broker (python bus.py --port 5600, or Broker(port=0).start() inside a
+# test); `Bus` is the client, with request/reply on top: each client has a
+# private reply channel and requests carry an id.
+
+
+class BusError(Exception):
+    pass
+
+
+class _Connection:
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+        self.reader = sock.makefile('rb')
+
+    def send(self, line):
+        with self.lock: self.sock.sendall(line)
+
+    def lines(self):
+        for line in self.reader: yield line
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class Broker:
+    def __init__(self, host='127.0.0.1', port=5600):
+        self.host, self.port = host, port
+        self.lock = threading.Lock()
+        self.subscribers = {} # channel -> set of connections
+        self._server = None
+
+    def start(self):
+        self._server = socket.create_server((self.host, self.port), reuse_port=False)
+        self.port = self._server.getsockname()[1]
+        threading.Thread(target=self._accept, name='bus-broker', daemon=True).start()
+        return self
+
+    @property
+    def address(self): return f"{self.host}:{self.port}"
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(_Connection(sock),), name='bus-broker-conn', daemon=True).start()
+
+    def _serve(self, conn):
+        channels = set()
+        try:
+            for line in conn.lines():
+                verb, _, rest = line.partition(b' ')
+                if verb == b'PUB':
+                    channel = rest.partition(b' ')[0]
+                    with self.lock: targets = list(self.subscribers.get(channel, ()))
+                    out = b'MSG ' + rest
+                    for target in targets:
+                        try:
+                            target.send(out)
+                        except OSError:
+                            pass # its own reader thread cleans it up
+                elif verb == b'SUB':
+                    channel = rest.strip()
+                    channels.add(channel)
+                    with self.lock: self.subscribers.setdefault(channel, set()).add(conn)
+        except OSError:
+            pass
+        finally:
+            with self.lock:
+                for channel in channels: self.subscribers.get(channel, set()).discard(conn)
+            conn.close()
+
+    def close(self):
+        if self._server is not None: self._server.close()
+
+
+class Bus:
+    def __init__(self, address, workers=8):
+        host, _, port = address.rpartition(':')
+        sock = socket.create_connection((host or '127.0.0.1', int(port)), timeout=10)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.conn = _Connection(sock)
+        self.lock = threading.Lock()
+        self.handlers = {}  # channel -> [fn(msg)]
+        self.pending = {}   # request id -> [event, reply]
+        self.inbox = f"reply.{uuid.uuid4().hex}"
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bus-handler')
+        self._ids = itertools.count(1)
+        self.closed = threading.Event()
+        self.subscribe(self.inbox, self._on_reply)
+        threading.Thread(target=self._read, name='bus-reader', daemon=True).start()
+
+    # --- PUB/SUB ---
+    def publish(self, channel, msg):
+        self.conn.send(b'PUB %s %s\n' % (channel.encode(), json.dumps(msg, separators=(',', ':'), default=str).encode()))
+
+    def subscribe(self, channel, fn):
+        # fn(msg) runs on the reader thread, in delivery order; keep it short
+        with self.lock:
+            first = channel not in self.handlers
+            self.handlers.setdefault(channel, []).append(fn)
+        if first: self.conn.send(b'SUB %s\n' % channel.encode())
+
+    def _read(self):
+        try:
+            for line in self.conn.lines():
+                _, channel, payload = line.split(b' ', 2)
+                msg = json.loads(payload)
+                for fn in self.handlers.get(channel.decode(), ()):
+                    try:
+                        fn(msg)
+                    except Exception as e:
+                        print(f"BUS: handler for {channel.decode()} failed ({e})")
+        except OSError:
+            pass
+        finally:
+            self.closed.set()
+            for slot in list(self.pending.values()): slot[0].set()
+
+    # --- REQUEST/REPLY ---
+    def request(self, channel, body, timeout=10.0):
+        """Send `body` to whoever serves `channel` and wait for the reply body."""
+        if self.closed.is_set(): raise BusError("bus connection closed")
+        rid = next(self._ids)
+        slot = self.pending[rid] = [threading.Event(), None]
+        try:
+            self.publish(channel, {'id': rid, 'reply_to': self.inbox, 'body': body})
+            if not slot[0].wait(timeout): raise BusError(f"no reply on {channel} within {timeout}s")
+        finally:
+            self.pending.pop(rid, None)
+        reply = slot[1]
+        if reply is None: raise BusError("bus connection closed")
+        if 'error' in reply: raise BusError(reply['error'])
+        return reply['body']
+
+    def _on_reply(self, msg):
+        slot = self.pending.get(msg['id'])
+        if slot is not None:
+            slot[1] = msg
+            slot[0].set()
+
+    def serve(self, channel, fn):
+        """Answer requests on `channel` with fn(body), on the handler pool."""
+        def handle(msg):
+            try:
+                reply = {'id': msg['id'], 'body': fn(msg['body'])}
+            except Exception as e:
+                reply = {'id': msg['id'], 'error': f"{type(e).__name__}: {e}"}
+            self.publish(msg['reply_to'], reply)
+        self.subscribe(channel, lambda msg: self.pool.submit(handle, msg))
+
+    def close(self):
+        self.conn.close()
+        self.pool.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stand-in message broker for cluster mode")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5600)
+    args = parser.parse_args()
+    broker = Broker(args.host, args.port).start()
+    print(f"BUS: broker listening on {broker.address}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        broker.close()
+        sys.exit(0)
@@ -0,0 +1,57 @@
+import os
+import sys
+import signal
+import argparse
+import subprocess
+from bus import Broker
+
+# --- CLUSTER LAUNCHER ---
+# One owner process runs the simulation and owns every state mutation; N web
+# workers serve HTTP and Socket.IO from replicas fed over the message bus and
+# forward the rest to the owner. All workers listen on --port (SO_REUSEPORT),
+# the owner on --port + 1 (direct access, its own /metrics).
+#   python cluster.py --workers 4 --port 5000
+# The stand-in broker runs inside this launcher unless --bus points at one.
+# Pages connect over websockets only, so each socket stays on the worker that
+# accepted it without sticky load balancing.
+
+
+def spawn(role, env, **extra):
+    return subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py')],
+                            env={**env, 'FACTORY_ROLE': role, **{k: str(v) for k, v in extra.items()}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the factory as one owner and N web workers")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default=os.environ.get('FACTORY_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('FACTORY_PORT', 5000)))
+    parser.add_argument('--bus', default=None, help="host:port of an external broker (default: run one here)")
+    parser.add_argument('--bus-port', type=int, default=5600)
+    args = parser.parse_args()
+
+    broker = None
+    if args.bus is None:
+        broker = Broker('127.0.0.1', args.bus_port).start()
+        args.bus = broker.address
+    env = dict(os.environ, FACTORY_BUS=args.bus, FACTORY_ASYNC_MODE='gevent')
+    procs = [spawn('owner', env, FACTORY_HOST='127.0.0.1', FACTORY_PORT=args.port + 1)]
+    procs += [spawn('worker', env, FACTORY_HOST=args.host, FACTORY_PORT=args.port, FACTORY_REUSE_PORT=1)
+              for _ in range(args.workers)]
+    print(f"CLUSTER: bus {args.bus}, owner :{args.port + 1}, {args.workers} workers on :{args.port}")
+
+    def stop(*_):
+        for p in procs: p.terminate()
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        # Any process exiting takes the cluster down: workers can't serve without the owner
+        os.wait()
+    except KeyboardInterrupt:
+        pass
+    stop()
+    for p in procs: p.wait()
+    if broker is not None: broker.close()
+
+
+if __name__ == '__main__':
+    main()
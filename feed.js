@@ -0,0 +1,68 @@
+// --- VERSIONED STATE FEED CLIENT ---
+// Keeps the last snapshot of each server feed, applies per-tick deltas and asks
+// the server to resync when a version is missed. Handlers always receive the
+// full reconstructed state, so pages render exactly as they did with full pushes.
+// `topics` narrows the server-side subscription to what the page renders.
+function createFeed(socket, topics) {
+    const feeds = {};
+    const handlers = {};
+
+    if (topics) socket.on('connect', () => socket.emit('subscribe', { topics }));
+
+    function current(name) {
+        const f = feeds[name];
+        const state = Object.assign({}, f.scalars);
+        Object.keys(f.keys).forEach(coll => { state[coll] = f.order[coll].map(k => f.rows[coll][k]); });
+        return state;
+    }
+
+    function render(name) {
+        const state = current(name);
+        (handlers[name] || []).forEach(fn => fn(state));
+    }
+
+    socket.on('feed_snapshot', (msg) => {
+        const f = { v: msg.v, keys: msg.keys, scalars: {}, rows: {}, order: {}, resyncing: false };
+        Object.keys(msg.state).forEach(k => { if (!(k in msg.keys)) f.scalars[k] = msg.state[k]; });
+        Object.keys(msg.keys).forEach(coll => {
+            const key = msg.keys[coll];
+            f.rows[coll] = {};
+            f.order[coll] = (msg.state[coll] || []).map(row => { f.rows[coll][row[key]] = row; return row[key]; });
+        });
+        feeds[msg.feed] = f;
+        render(msg.feed);
+    });
+
+    socket.on('feed_delta', (d) => {
+        const f = feeds[d.feed];
+        if (!f || d.v <= f.v) return; // snapshot still on its way, or already applied
+        if (d.base !== f.v) {
+            if (!f.resyncing) { f.resyncing = true; socket.emit('resync', { feed: d.feed, v: f.v }); }
+            return;
+        }
+        Object.assign(f.scalars, d.set || {});
+        (d.unset || []).forEach(k => { delete f.scalars[k]; });
+        // Without an explicit order, new rows go last and removed rows drop out
+        const order = d.order || {};
+        Object.entries(d.upsert || {}).forEach(([coll, rows]) => rows.forEach(row => {
+            const k = row[f.keys[coll]];
+            if (!(k in f.rows[coll]) && !(coll in order)) f.order[coll].push(k);
+            f.rows[coll][k] = row;
+        }));
+        Object.entries(d.remove || {}).forEach(([coll, keys]) => {
+            keys.forEach(k => { delete f.rows[coll][k]; });
+            if (!(coll in order)) f.order[coll] = f.order[coll].filter(k => k in f.rows[coll]);
+        });
+        Object.entries(order).forEach(([coll, keys]) => { f.order[coll] = keys; });
+        f.v = d.v;
+        f.resyncing = false;
+        render(d.feed);
+    });
+
+    return {
+        on(name, fn) {
+            (handlers[name] = handlers[name] || []).push(fn);
+            if (feeds[name]) fn(current(name));
+        }
+    };
+}
@@ -0,0 +1,171 @@
+import math
+import threading
+import numpy as np
+
+# --- INVENTORY ENGINE ---
+# Material consumption and reorder points over every SKU at once. Stock, max and
+# burn inputs live in NumPy arrays indexed by SKU, kept in step with the store
+# through its mutation listener, so nothing walks the inventory list per tick.
+#
+# Consumption:  each unit an order makes draws its product's bill of materials
+#               (units of each SKU per unit made), and every SKU also draws its
+#               own `burnRate` (units per hour at nominal output) scaled by floor
+#               activity. Fractions accumulate until a whole unit is due.
+# Projections:  hourly burn = burnRate * activity + BOM draw (EWMA over
+#               `window_s`), days of cover = stock / daily burn, reorder point =
+#               burn over lead + safety hours. Reorder points are cached until
+#               the burn moves by more than `tolerance`; the sorted projection
+#               table also until stock moves, and is only built when read.
+
+# Units of each material per unit of product; products not listed use '*'
+DEFAULT_BOM = {
+    "Hydraulic Valve": {"Steel Sheets": 0.5, "Lubricant": 0.05},
+    "Piston Ring": {"Steel Sheets": 0.2, "Lubricant": 0.02},
+    "Circuit Board": {"Copper Wire": 0.3, "Microchips": 2},
+    "Sensor Unit": {"Circuit Board": 1, "Copper Wire": 0.1, "Microchips": 1},
+    "Neural Chip": {"Microchips": 4, "Copper Wire": 0.2},
+    "Nano-Fiber Chassis": {"Steel Sheets": 2, "Lubricant": 0.1},
+    "*": {"Steel Sheets": 0.5},
+}
+
+
+class InventoryEngine:
+    def __init__(self, lead_hours=24.0, safety_hours=12.0, window_s=3600.0, tolerance=0.02):
+        self.lead_hours = lead_hours      # time for a restock to arrive
+        self.safety_hours = safety_hours  # extra cover held against demand spikes
+        self.window_s = window_s          # EWMA horizon of the observed BOM draw
+        self.tolerance = tolerance        # relative burn change that invalidates reorder points
+        self.lock = threading.Lock()
+        self.load([])
+
+    # --- LOADING ---
+    def load(self, inventory, bom=None):
+        """Rebuild the SKU arrays from the store's inventory (startup and reset)."""
+        with self.lock:
+            n = len(inventory)
+            self.names = [i['name'] for i in inventory]
+            self.index = {name: k for k, name in enumerate(self.names)}
+            self.stock = np.array([i.get('stock', 0) for i in inventory], dtype=np.float64)
+            self.max = np.array([i.get('max', i.get('stock', 0)) for i in inventory], dtype=np.float64)
+            self.burn_rate = np.array([i.get('burnRate', 0) for i in inventory], dtype=np.float64)
+            self.carry = np.zeros(n)   # fractional units used but not yet deducted
+            self.drawn = np.zeros(n)   # BOM draw per hour (EWMA)
+            self.burn = np.zeros(n)    # units per hour the reorder points were computed with
+            self.reorder = np.zeros(n)
+            self.bom = bom or DEFAULT_BOM
+            self._rows = {}
+            self.version = 0           # bumps on every stock change or burn update
+            self._sorted = None
+
+    def _row(self, product):
+        # BOM of one product as (sku indices, units per unit made); unknown materials are skipped
+        row = self._rows.get(product)
+        if row is None:
+            parts = self.bom.get(product, self.bom.get('*', {}))
+            known = [(self.index[m], q) for m, q in parts.items() if m in self.index]
+            row = self._rows[product] = (np.array([k for k, _ in known], dtype=np.int64),
+                                         np.array([q for _, q in known], dtype=np.float64))
+        return row
+
+    # --- CONSUMPTION ---
+    def consume(self, made=(), activity=0.0, dt=1.0):
+        """Materials for `made` [(product, units), ...] plus `dt` seconds of burn; returns whole units due as {name: -n}.
+
+        dt=0 draws a one-off batch that doesn't count towards the burn rate."""
+        with self.lock:
+            if not self.names: return {}
+            draw = np.zeros(len(self.names))
+            for product, units in made:
+                idx, qty = self._row(product)
+                if units and idx.size: np.add.at(draw, idx, qty * units)
+            self.carry += draw
+            if dt:
+                self.carry += self.burn_rate * (activity * dt / 3600)
+                self.drawn += min(1.0, dt / self.window_s) * (draw * 3600 / dt - self.drawn)
+                burn = self.burn_rate * activity + self.drawn
+                if not np.allclose(burn, self.burn, rtol=self.tolerance, atol=1e-3):
+                    self.burn = burn
+                    self.reorder = np.ceil(burn * (self.lead_hours + self.safety_hours))
+                    self.version += 1
+
+            due = np.floor(self.carry)
+            hit = np.flatnonzero(due)
+            if not hit.size: return {}
+            self.carry[hit] -= due[hit]
+            return {self.names[k]: -int(due[k]) for k in hit.tolist()}
+
+    def on_record(self, rec):
+        # Store listener: mirror stock changes into the arrays
+        op = rec['op']
+        if op == 'stock.adjust': changes = {rec['name']: rec['delta']}
+        elif op == 'stock.consume': changes = rec['deltas']
+        else: return
+        with self.lock:
+            for name, delta in changes.items():
+                k = self.index.get(name)
+                if k is not None: self.stock[k] = max(0.0, self.stock[k] + delta)
+            self.version += 1
+
+    # --- PROJECTIONS ---
+    def _low(self):
+        return (self.burn > 0) & (self.stock <= self.reorder)
+
+    def _cover(self, rows):
+        daily = self.burn[rows] * 24
+        return np.divide(self.stock[rows], daily, out=np.full(daily.shape, np.inf), where=daily > 0)
+
+    def _table(self):
+        # All SKUs sorted by days of cover, rebuilt only when read after a stock or burn change
+        if self._sorted is None or self._sorted[0] != self.version:
+            order = np.argsort(self._cover(slice(None)), kind='stable')
+            self._sorted = (self.version, order, order[self._low()[order]])
+        return self._sorted
+
+    def _items(self, rows):
+        # Rows as dicts, with every column computed in one pass over the selected SKUs
+        cover = self._cover(rows)
+        low = (self.burn[rows] > 0) & (self.stock[rows] <= self.reorder[rows])
+        suggested = np.where(low, np.maximum(self.max[rows], self.reorder[rows]) - self.stock[rows], 0)
+        return [{
+            "name": self.names[k],
+            "stock": int(stock),
+            "burn_per_hour": round(burn, 2),
+            "days_cover": None if math.isinf(c) else round(c, 2),
+            "hours_left": None if math.isinf(c) else round(c * 24, 1),
+            "reorder_point": int(reorder),
+            "restock": flag,
+            "suggested_qty": int(qty),
+        } for k, stock, burn, c, reorder, flag, qty in zip(
+            rows.tolist(), self.stock[rows].tolist(), self.burn[rows].tolist(), cover.tolist(),
+            self.reorder[rows].tolist(), low.tolist(), suggested.tolist())]
+
+    def projections(self, offset=0, limit=100, restock_only=False):
+        """SKUs sorted by days of cover, least first."""
+        with self.lock:
+            _, order, restock = self._table()
+            rows = restock if restock_only else order
+            return {
+                "total": len(self.names),
+                "restock_count": int(restock.size),
+                "lead_hours": self.lead_hours,
+                "safety_hours": self.safety_hours,
+                "items": self._items(rows[offset:offset + limit]),
+            }
+
+    def needed(self, limit=None, names=None):
+        """SKUs at or below their reorder point, least cover first (optionally only `names`)."""
+        with self.lock:
+            rows = np.flatnonzero(self._low())
+            if names is not None: rows = np.array([k for k in rows.tolist() if self.names[k] in names], dtype=np.int64)
+            cover = self._cover(rows)
+            if limit is not None and rows.size > limit:
+                keep = np.argpartition(cover, limit)[:limit]
+                rows, cover = rows[keep], cover[keep]
+            return self._items(rows[np.argsort(cover, kind='stable')][:limit])
+
+    def restock_names(self):
+        # Cheap per-tick check: one comparison over the arrays, no sort
+        with self.lock: return {self.names[k] for k in np.flatnonzero(self._low()).tolist()}
+
+    def total_stock(self):
+        with self.lock: return float(self.stock.sum())
@@ -0,0 +1,91 @@
+import os
+import json
+import threading
+
+# --- APPEND-ONLY MUTATION JOURNAL ---
+# One compact JSON record per line. Every record carries a sequence number `s`
+# so a snapshot can say which prefix of the journal it already contains.
+# sync() fsyncs outside the append lock; callers keep it from racing rotate().
+
+
+class Journal:
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._repair()
+        self._f = open(path, 'a', encoding='utf-8')
+        self.size = self._f.tell() # bytes in the live segment (records are ASCII: one char, one byte)
+
+    def _repair(self):
+        # Drop a torn last line so new appends don't get glued onto it
+        if not os.path.exists(self.path): return
+        with open(self.path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                step = min(4096, pos)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                cut = chunk.rfind(b'\n')
+                if cut >= 0:
+                    pos = pos - step + cut + 1
+                    break
+                pos -= step
+            if pos != end: f.truncate(pos)
+
+    def append(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            self.count += 1
+            self.size += len(line)
+
+    def sync(self):
+        with self._lock:
+            self._f.flush()
+            fd = self._f.fileno()
+        os.fsync(fd)
+
+    def replay(self, after_seq=0):
+        # A rotated segment only survives a crash during compaction; it holds
+        # the records older than the live file.
+        self._f.flush()
+        for path in (self.path + '.1', self.path):
+            if not os.path.exists(path): continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break # torn tail from a crash mid-append
+                    self.count += 1
+                    if record.get('s', 0) > after_seq: yield record
+
+    def rotate(self):
+        with self._lock:
+            self._f.close()
+            if os.path.exists(self.path + '.1'):
+                # Previous compaction never finished; keep its records too
+                with open(self.path + '.1', 'a', encoding='utf-8') as old, open(self.path, 'r', encoding='utf-8') as live:
+                    for line in live: old.write(line)
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.path + '.1')
+            self._f = open(self.path, 'a', encoding='utf-8')
+            self.count = self.size = 0
+
+    def truncate(self):
+        with self._lock:
+            self._f.close()
+            self._f = open(self.path, 'w', encoding='utf-8')
+            self.count = self.size = 0
+
+    def drop_rotated(self):
+        if os.path.exists(self.path + '.1'): os.remove(self.path + '.1')
+
+    def close(self):
+        if not self._f.closed:
+            self.sync()
+            self._f.close()
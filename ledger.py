@@ -0,0 +1,246 @@
+import time
+import bisect
+import threading
+from datetime import datetime
+from storage import thread_connection
+
+# --- FINANCIAL LEDGER ---
+# Append-only double-entry journal of cost and revenue postings, kept in SQLite.
+# Each posting is one entry (amount, order, product, customer, time) with two
+# balancing lines: cost debits production cost and credits cash, revenue debits
+# cash and credits sales. Rollups per dimension (total, product, customer, day,
+# hour) and account balances are updated in the same transaction as the entry
+# and mirrored in memory, so totals are dict reads. The largest TOP_N product and
+# customer buckets per sort are kept ranked as postings arrive, so the top-N
+# breakdowns on the live feed don't sort every bucket. Day and hour keys are
+# kept sorted: a range query bisects to its first bucket and costs one step per
+# bucket returned. Nothing is ever deleted: a reset posts reversing entries.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledger_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    kind TEXT NOT NULL,
+    amount REAL NOT NULL,
+    order_id TEXT,
+    product TEXT,
+    customer TEXT,
+    memo TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ledger_order ON ledger_entries(order_id, id);
+CREATE INDEX IF NOT EXISTS idx_ledger_product ON ledger_entries(product, id);
+CREATE INDEX IF NOT EXISTS idx_ledger_customer ON ledger_entries(customer, id);
+CREATE TABLE IF NOT EXISTS ledger_lines (
+    entry_id INTEGER NOT NULL,
+    account TEXT NOT NULL,
+    debit REAL NOT NULL,
+    credit REAL NOT NULL,
+    PRIMARY KEY (entry_id, account)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ledger_rollups (
+    dim TEXT NOT NULL,
+    key TEXT NOT NULL,
+    revenue REAL NOT NULL,
+    cost REAL NOT NULL,
+    entries INTEGER NOT NULL,
+    PRIMARY KEY (dim, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ledger_accounts (
+    account TEXT PRIMARY KEY,
+    debit REAL NOT NULL,
+    credit REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ledger_resets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    last_entry INTEGER NOT NULL
+);
+"""
+
+# kind -> (debited account, credited account)
+ACCOUNTS = {
+    'cost': ('production_cost', 'cash'),
+    'revenue': ('cash', 'sales'),
+}
+DIMENSIONS = ('total', 'product', 'customer', 'day', 'hour')
+TIME_DIMENSIONS = {'day': "%Y-%m-%d", 'hour': "%Y-%m-%d %H"}
+UNASSIGNED = 'unassigned'
+RANKED = ('product', 'customer')
+TOP_N = 20 # breakdowns up to this many buckets come from the ranked cache
+SORTS = {'revenue': lambda b: b[0], 'cost': lambda b: b[1], 'margin': lambda b: b[0] - b[1], 'entries': lambda b: b[2]}
+
+UPSERT_ROLLUP = """
+INSERT INTO ledger_rollups(dim, key, revenue, cost, entries) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(dim, key) DO UPDATE SET revenue = revenue + excluded.revenue, cost = cost + excluded.cost, entries = entries + excluded.entries
+"""
+UPSERT_ACCOUNT = """
+INSERT INTO ledger_accounts(account, debit, credit) VALUES (?, ?, ?)
+ON CONFLICT(account) DO UPDATE SET debit = debit + excluded.debit, credit = credit + excluded.credit
+"""
+COLUMNS = "id, ts, kind, amount, order_id, product, customer, memo"
+
+
+def _bucket(revenue, cost, entries):
+    return {"revenue": revenue, "cost": cost, "margin": revenue - cost,
+            "margin_pct": round((revenue - cost) / revenue * 100, 2) if revenue else None, "entries": entries}
+
+
+def _entry(row):
+    eid, ts, kind, amount, order_id, product, customer, memo = row
+    debit, credit = ACCOUNTS[kind]
+    return {"id": eid, "timestamp": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"), "kind": kind,
+            "amount": amount, "order": order_id, "product": product, "customer": customer, "memo": memo,
+            "lines": [{"account": debit, "debit": amount, "credit": 0}, {"account": credit, "debit": 0, "credit": amount}]}
+
+
+class Ledger:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.lock = threading.Lock()
+        with self.connection() as db: db.executescript(SCHEMA)
+        self._load()
+
+    def connection(self):
+        return thread_connection(self._local, self.path)
+
+    def _load(self):
+        # Materialized rollups only: startup reads one row per bucket, never the entries
+        db = self.connection()
+        self.rollups = {dim: {} for dim in DIMENSIONS}
+        for dim, key, revenue, cost, n in db.execute("SELECT dim, key, revenue, cost, entries FROM ledger_rollups"):
+            self.rollups.setdefault(dim, {})[key] = [revenue, cost, n]
+        self.accounts = {a: [d, c] for a, d, c in db.execute("SELECT account, debit, credit FROM ledger_accounts")}
+        self._keys = {dim: sorted(self.rollups[dim]) for dim in TIME_DIMENSIONS}
+        self._top = {} # (dim, sort) -> keys of the largest TOP_N buckets, built on first use
+
+    def __len__(self):
+        return self.rollups['total'].get('', [0, 0, 0])[2]
+
+    # --- WRITES ---
+    def post(self, kind, amount, order=None, product=None, customer=None, memo=None, ts=None):
+        """Append one posting and fold it into every rollup; returns the entry id."""
+        if kind not in ACCOUNTS: raise ValueError(f"Unknown posting kind: {kind}")
+        db = self.connection()
+        with self.lock, db: return self._post(db, kind, amount, order, product, customer, memo, time.time() if ts is None else ts)
+
+    def _post(self, db, kind, amount, order, product, customer, memo, ts, count=1):
+        # `count` is what the posting adds to the rollups' entry counts (negative for a reversal)
+        local = datetime.fromtimestamp(ts)
+        keys = {'total': '', 'product': product or UNASSIGNED, 'customer': customer or UNASSIGNED,
+                **{dim: local.strftime(fmt) for dim, fmt in TIME_DIMENSIONS.items()}}
+        revenue, cost = (amount, 0) if kind == 'revenue' else (0, amount)
+        debit, credit = ACCOUNTS[kind]
+        cur = db.execute("INSERT INTO ledger_entries(ts, kind, amount, order_id, product, customer, memo) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (ts, kind, amount, order, product, customer, memo))
+        db.executemany("INSERT INTO ledger_lines(entry_id, account, debit, credit) VALUES (?, ?, ?, ?)",
+                       [(cur.lastrowid, debit, amount, 0), (cur.lastrowid, credit, 0, amount)])
+        db.executemany(UPSERT_ROLLUP, [(dim, key, revenue, cost, count) for dim, key in keys.items()])
+        db.executemany(UPSERT_ACCOUNT, [(debit, amount, 0), (credit, 0, amount)])
+        for dim, key in keys.items():
+            bucket = self.rollups[dim].get(key)
+            if bucket is None:
+                bucket = self.rollups[dim][key] = [0, 0, 0]
+                if dim in self._keys: bisect.insort(self._keys[dim], key)
+            before = list(bucket)
+            bucket[0] += revenue
+            bucket[1] += cost
+            bucket[2] += count
+            if dim in RANKED: self._rerank(dim, key, before, bucket)
+        for account, d, c in ((debit, amount, 0), (credit, 0, amount)):
+            balance = self.accounts.setdefault(account, [0, 0])
+            balance[0] += d
+            balance[1] += c
+        return cur.lastrowid
+
+    def _rerank(self, dim, key, before, bucket):
+        # Only `key` changed. Rising, it can only climb (or enter) the list; falling,
+        # a bucket outside the list may now outrank it, so that list is rebuilt on next use
+        rollup = self.rollups[dim]
+        for sort, value in SORTS.items():
+            top = self._top.get((dim, sort))
+            if top is None: continue
+            if key in top:
+                if value(bucket) < value(before): del self._top[(dim, sort)]
+                else: top.sort(key=lambda k: value(rollup[k]), reverse=True)
+            elif len(top) < TOP_N or value(bucket) > value(rollup[top[-1]]):
+                top.append(key)
+                top.sort(key=lambda k: value(rollup[k]), reverse=True)
+                del top[TOP_N:]
+
+    def reverse_all(self, memo="Reversal"):
+        """Post reversing entries that bring every balance, rollup and entry count back to zero (system reset).
+
+        Everything posted since the last reset is reversed per (kind, product, customer, hour), each
+        reversal dated in the hour it reverses, so day and hour buckets net to zero where they were
+        earned rather than piling up as negatives on the day of the reset."""
+        db = self.connection()
+        with self.lock, db:
+            last = db.execute("SELECT COALESCE(MAX(last_entry), 0) FROM ledger_resets").fetchone()[0]
+            groups = db.execute("SELECT kind, product, customer, MIN(ts), SUM(amount), COUNT(*) FROM ledger_entries WHERE id > ? "
+                                "GROUP BY kind, product, customer, strftime('%Y-%m-%d %H', ts, 'unixepoch', 'localtime')", (last,)).fetchall()
+            for kind, product, customer, ts, amount, n in groups: self._post(db, kind, -amount, None, product, customer, memo, ts, -n)
+            db.execute("INSERT INTO ledger_resets(ts, last_entry) VALUES (?, (SELECT COALESCE(MAX(id), 0) FROM ledger_entries))", (time.time(),))
+        return len(groups)
+
+    # --- READS ---
+    def totals(self):
+        with self.lock: return _bucket(*self.rollups['total'].get('', [0, 0, 0]))
+
+    def get(self, dim, key):
+        with self.lock:
+            bucket = self.rollups[dim].get(key)
+            return _bucket(*bucket) if bucket else None
+
+    def breakdown(self, dim, limit=None, sort='revenue'):
+        """Buckets of a product or customer rollup, largest `sort` (revenue, cost, margin, entries) first."""
+        with self.lock:
+            rollup = self.rollups[dim]
+            if dim in RANKED and limit is not None and limit <= TOP_N:
+                top = self._top.get((dim, sort))
+                if top is None: top = self._top[(dim, sort)] = sorted(rollup, key=lambda k: SORTS[sort](rollup[k]), reverse=True)[:TOP_N]
+                return [dict(_bucket(*rollup[k]), key=k) for k in top[:limit]]
+            rows = [dict(_bucket(*v), key=k) for k, v in rollup.items()]
+        rows.sort(key=lambda r: r[sort], reverse=True)
+        return rows[:limit]
+
+    def range(self, dim, start=None, end=None, limit=None):
+        """Day or hour buckets between `start` and `end` (inclusive key prefixes), oldest first."""
+        if dim not in TIME_DIMENSIONS: raise ValueError(f"Range queries need a time dimension: {', '.join(TIME_DIMENSIONS)}")
+        with self.lock:
+            keys = self._keys[dim]
+            lo = bisect.bisect_left(keys, start) if start else 0
+            hi = bisect.bisect_right(keys, end + '\uffff') if end else len(keys)
+            if limit is not None: hi = min(hi, lo + limit)
+            return [dict(_bucket(*self.rollups[dim][k]), key=k) for k in keys[lo:hi]]
+
+    def balances(self):
+        with self.lock: return {a: {"debit": d, "credit": c, "balance": d - c} for a, (d, c) in sorted(self.accounts.items())}
+
+    def summary(self, limit=5):
+        return {
+            "totals": self.totals(),
+            "products": self.breakdown('product', limit),
+            "customers": self.breakdown('customer', limit),
+            "today": self.get('day', datetime.now().strftime(TIME_DIMENSIONS['day'])),
+        }
+
+    def entries(self, limit=100, before=None, order=None, product=None, customer=None, kind=None):
+        """One page of postings, newest first; returns (entries, cursor for the next page or None)."""
+        sql, args = "FROM ledger_entries WHERE 1", []
+        for col, value in (('order_id', order), ('product', product), ('customer', customer), ('kind', kind)):
+            if value:
+                sql += f" AND {col} = ?"
+                args.append(value)
+        if before is not None:
+            sql += " AND id < ?"
+            args.append(before)
+        rows = self.connection().execute(f"SELECT {COLUMNS} {sql} ORDER BY id DESC LIMIT ?", args + [limit + 1]).fetchall()
+        page = [_entry(r) for r in rows[:limit]]
+        return page, (page[-1]['id'] if len(rows) > limit else None)
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
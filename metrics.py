@@ -0,0 +1,152 @@
+import time
+import bisect
+import threading
+
+# --- METRICS ---
+# Small in-process registry rendered in the Prometheus text format. Counters,
+# gauges and histograms are declared once at import time next to the code they
+# measure; every record call starts with a check of `REGISTRY.enabled`, so a
+# disabled registry costs one attribute lookup per call site.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class _NullTimer:
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('metric', 'labels', 'start')
+
+    def __init__(self, metric, labels):
+        self.metric, self.labels = metric, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metric.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry, name, help, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(l, '')) for l in self.labels)
+
+    def _label_text(self, key, extra=()):
+        pairs = list(zip(self.labels, key)) + list(extra)
+        if not pairs: return ''
+        return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+    def samples(self):
+        with self.lock: return [(f"{self.name}{self._label_text(k)}", v) for k, v in sorted(self.values.items())]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not self.registry.enabled: return
+        key = self._key(labels)
+        with self.lock: self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, registry, name, help, labels=(), fn=None):
+        super().__init__(registry, name, help, labels)
+        self.fn = fn # read at scrape time instead of being set
+
+    def set(self, value, **labels):
+        if not self.registry.enabled: return
+        with self.lock: self.values[self._key(labels)] = value
+
+    def samples(self):
+        if self.fn is not None: return [(self.name, self.fn())]
+        return super().samples()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if not self.registry.enabled: return
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None: series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels):
+        return _Timer(self, labels) if self.registry.enabled else NULL_TIMER
+
+    def samples(self):
+        out = []
+        with self.lock:
+            for key, (counts, total, n) in sorted(self.values.items()):
+                running = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    running += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    out.append((f"{self.name}_bucket{self._label_text(key, [('le', le)])}", running))
+                out.append((f"{self.name}_sum{self._label_text(key)}", total))
+                out.append((f"{self.name}_count{self._label_text(key)}", n))
+        return out
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Registry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.metrics = {}
+
+    def _add(self, metric):
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(self, name, help, labels))
+
+    def gauge(self, name, help, labels=(), fn=None):
+        return self._add(Gauge(self, name, help, labels, fn))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self, name, help, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name} {value}" for name, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
@@ -0,0 +1,72 @@
+import time
+import threading
+
+# --- NOTIFICATION LOG ---
+# Fixed-capacity ring of notifications. Every entry gets a monotonically
+# increasing `seq`; slot `seq % capacity` holds it until it is overwritten, so
+# memory stays bounded and reading "everything after cursor N" starts at the
+# right slot instead of scanning the whole log. Readers that fall more than
+# `capacity` entries behind are told how many they missed. Cluster web workers
+# `replicate` the owner's entries, keeping its sequence numbers.
+
+
+class NotificationLog:
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._cond = threading.Condition()
+        self.last_seq = 0
+
+    @property
+    def first_seq(self):
+        return max(1, self.last_seq - self.capacity + 1)
+
+    def post(self, entry, to=None):
+        """Append a notification for role `to` (None = everyone); returns it with its seq."""
+        with self._cond:
+            self.last_seq += 1
+            entry = dict(entry, seq=self.last_seq, to=to)
+            self._slots[self.last_seq % self.capacity] = entry
+            self._cond.notify_all()
+        return entry
+
+    def replicate(self, entry):
+        """Store an entry posted by another log under its own seq (older or repeated entries are ignored)."""
+        with self._cond:
+            seq = entry['seq']
+            if seq <= self.last_seq: return
+            for skipped in range(max(self.last_seq + 1, seq - self.capacity + 1), seq): self._slots[skipped % self.capacity] = None
+            self._slots[seq % self.capacity] = entry
+            self.last_seq = seq
+            self._cond.notify_all()
+
+    def since(self, cursor=0, to=None, types=None, limit=100):
+        """Entries after `cursor`, oldest first; returns (entries, next_cursor, missed)."""
+        with self._cond:
+            if cursor > self.last_seq: cursor = 0 # cursor from before a restart
+            start = max(cursor + 1, self.first_seq)
+            missed = start - cursor - 1
+            out, seq = [], start
+            while seq <= self.last_seq and len(out) < limit:
+                entry = self._slots[seq % self.capacity]
+                # None: a gap in a replica
+                if entry is not None and (to is None or entry['to'] in (None, to)) and (not types or entry.get('type') in types):
+                    out.append(entry)
+                seq += 1
+            return out, seq - 1, missed
+
+    def poll(self, cursor, to=None, types=None, limit=100, wait=0.0):
+        """since(), but waits up to `wait` seconds for a matching entry when there is none yet."""
+        entries, next_cursor, missed = self.since(cursor, to, types, limit)
+        deadline = time.time() + wait
+        while not entries and time.time() < deadline:
+            # Entries for other recipients also wake us; keep waiting from the advanced cursor
+            if not self.wait(next_cursor, deadline - time.time()): break
+            entries, next_cursor, more = self.since(next_cursor, to, types, limit)
+            missed += more
+        return entries, next_cursor, missed
+
+    def wait(self, cursor, timeout):
+        """Block until something newer than `cursor` is posted (or the timeout passes)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.last_seq != cursor, timeout)
@@ -0,0 +1,37 @@
+# --- BLOCKING CALL OFFLOAD ---
+# Under the gevent server (serve.py) every request and socket is a greenlet on
+# one event loop, so a call that blocks inside C code - SQLite, fsync, scrypt
+# password hashing - stalls every connection at once. `blocking(fn, ...)` runs
+# such a call on a pool of native threads and parks only the calling greenlet
+# until it returns. In threading mode each request already has its own thread
+# and `blocking` is a plain call.
+
+_pool = None
+_loop_ident = None
+_native_ident = None
+
+
+def configure(mode, workers=8):
+    global _pool, _loop_ident, _native_ident
+    if mode != 'gevent': return
+    from gevent import monkey
+    from gevent.threadpool import ThreadPool
+    _native_ident = monkey.get_original('_thread', 'get_ident')
+    _loop_ident = _native_ident()
+    _pool = ThreadPool(workers)
+
+
+def blocking(fn, *args, **kwargs):
+    # Calls made from a pool thread (or any thread but the loop's) just run
+    if _pool is None or _native_ident() != _loop_ident: return fn(*args, **kwargs)
+    return _pool.apply(fn, args, kwargs)
+
+
+def blocking_iter(items):
+    """Iterate `items`, producing each element off the event loop (for generators that read from disk)."""
+    it = iter(items)
+    done = object()
+    while True:
+        item = blocking(next, it, done)
+        if item is done: return
+        yield item
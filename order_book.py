@@ -0,0 +1,81 @@
+import re
+from collections import defaultdict
+
+# --- ORDER BOOK ---
+# Production orders indexed by id, bucketed by status and with a paused set, so
+# lookups, moves and removals are O(1) and the tick only walks the orders that
+# are actually running. Iteration keeps creation order.
+
+IN_PROGRESS = "In Progress"
+
+
+class OrderBook:
+    def __init__(self, orders=(), prefix="#ORD-", next_seq=1):
+        self.prefix = prefix
+        self.by_id = {}
+        self.buckets = defaultdict(dict)
+        self.paused = set()
+        self.next_seq = next_seq
+        self._id_re = re.compile(re.escape(prefix) + r"(\d+)$")
+        for order in orders: self._see(order['id'])
+        # Legacy random ids could collide; renumber the later copies only once
+        # next_seq is past every id in the book
+        for order in orders:
+            if order['id'] in self.by_id: order['id'] = self.next_id()
+            self.add(order)
+
+    def __len__(self): return len(self.by_id)
+
+    def __iter__(self): return iter(self.by_id.values())
+
+    def __contains__(self, order_id): return order_id in self.by_id
+
+    def to_list(self): return list(self.by_id.values())
+
+    def get(self, order_id): return self.by_id.get(order_id)
+
+    def status(self, status): return self.buckets.get(status, {}).values()
+
+    def counts(self): return {status: len(bucket) for status, bucket in self.buckets.items() if bucket}
+
+    def active(self):
+        """In-progress orders that are not paused."""
+        return [o for oid, o in self.buckets.get(IN_PROGRESS, {}).items() if oid not in self.paused]
+
+    # --- MUTATIONS ---
+    def add(self, order):
+        oid = order['id']
+        if oid in self.by_id: raise KeyError(f"Duplicate order id {oid}")
+        self.by_id[oid] = order
+        self.buckets[order.get('status')][oid] = order
+        if order.get('paused'): self.paused.add(oid)
+        self._see(oid)
+
+    def _see(self, order_id):
+        m = self._id_re.match(str(order_id))
+        if m: self.next_seq = max(self.next_seq, int(m.group(1)) + 1)
+
+    def remove(self, order_id):
+        order = self.by_id.pop(order_id, None)
+        if order is None: return None
+        self.buckets[order.get('status')].pop(order_id, None)
+        self.paused.discard(order_id)
+        return order
+
+    def update(self, order_id, fields):
+        order = self.by_id.get(order_id)
+        if order is None: return None
+        if 'status' in fields and fields['status'] != order.get('status'):
+            self.buckets[order.get('status')].pop(order_id, None)
+            self.buckets[fields['status']][order_id] = order
+        if 'paused' in fields:
+            if fields['paused']: self.paused.add(order_id)
+            else: self.paused.discard(order_id)
+        order.update(fields)
+        return order
+
+    def next_id(self):
+        # Monotonic, so ids never collide no matter how many orders exist
+        oid = f"{self.prefix}{self.next_seq:04d}"
+        self.next_seq += 1
+        return oid
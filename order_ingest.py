@@ -0,0 +1,170 @@
+import time
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+
+# --- STOREFRONT ORDER INGESTION ---
+# e-Dukaan orders are checked and given an id on arrival, then queued. A worker
+# drains the queue every `flush_window` seconds (or as soon as `batch_size`
+# orders are waiting), prices and prioritizes the whole batch and hands it to
+# `on_flush` once, so a burst of orders costs one notification per window
+# instead of one per order.
+# Ids are reserved in blocks through `reserve(upto)` (persisted by the caller),
+# so a restart resumes past every id already handed out, at one write per block.
+
+PRIORITY_RANK = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "NORMAL": 3, "LOW": 4}
+
+
+class QueueFull(Exception):
+    pass
+
+
+def parse_order(data, default_deadline=None):
+    """Validate one storefront payload; returns (order, None) or (None, reason).
+
+    Orders without a deadline get `default_deadline` (None = unconstrained)."""
+    if not isinstance(data, dict): return None, "Order must be an object"
+    product = data.get('product')
+    if not product: return None, "Missing product"
+    try:
+        qty = int(data.get('quantity'))
+    except (TypeError, ValueError):
+        return None, "Quantity must be a number"
+    if qty <= 0: return None, "Quantity must be 1 or more"
+    try:
+        total = int(data['total']) if data.get('total') is not None else None
+        unit_price = int(data.get('unit_price') or 0)
+    except (TypeError, ValueError):
+        return None, "Total must be a number"
+    if (total or 0) < 0 or unit_price < 0: return None, "Total cannot be negative"
+    return {
+        "customer": data.get('customer_name'),
+        "product": product,
+        "qty": qty,
+        "total": total,
+        "unit_price": unit_price,
+        "deadline": data.get('deadline') or default_deadline,
+    }, None
+
+
+class OrderIngest:
+    def __init__(self, on_flush, prioritize, flush_window=0.25, batch_size=500, max_depth=100000, prefix="SLS-",
+                 lead_days=7, next_id=10000, reserve=None, reserve_block=1000):
+        self.on_flush = on_flush
+        self.prioritize = prioritize
+        self.flush_window = flush_window
+        self.batch_size = batch_size
+        self.max_depth = max_depth
+        self.prefix = prefix
+        self.lead_days = lead_days # default deadline for orders that don't give one (None = unconstrained)
+        self.reserve = reserve
+        self.reserve_block = reserve_block
+        self._next_id = next_id
+        self.reserved = next_id    # ids below this are recorded as used
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._flushes = deque(maxlen=240) # (time, orders) of recent flushes
+        self.accepted = 0
+        self.rejected = 0
+        self.flushed = 0
+        self.last_batch = 0
+        self.last_flush_ms = 0.0
+
+    # --- INTAKE ---
+    def submit(self, payloads):
+        """Queue a list of payloads; returns ([(index, order_id)], [(index, reason)])."""
+        accepted, rejected, parsed = [], [], []
+        now = datetime.now()
+        deadline = None if self.lead_days is None else (now + timedelta(days=self.lead_days)).strftime("%Y-%m-%d")
+        now = now.strftime("%Y-%m-%d %H:%M:%S")
+        for i, data in enumerate(payloads):
+            order, reason = parse_order(data, deadline)
+            if order is None:
+                rejected.append((i, reason))
+                continue
+            parsed.append((i, order))
+        with self._lock:
+            if len(self._queue) + len(parsed) > self.max_depth:
+                raise QueueFull(f"Ingestion queue full ({len(self._queue)} waiting)")
+            if self.reserve is not None and self._next_id + len(parsed) > self.reserved:
+                self.reserved = self._next_id + len(parsed) + self.reserve_block
+                self.reserve(self.reserved)
+            for i, order in parsed:
+                order['id'] = f"{self.prefix}{self._next_id}"
+                self._next_id += 1
+                order['timestamp'] = now
+                self._queue.append(order)
+                accepted.append((i, order['id']))
+            self.accepted += len(accepted)
+            self.rejected += len(rejected)
+            if len(self._queue) >= self.batch_size: self._wake.set()
+        return accepted, rejected
+
+    # --- BATCH PROCESSING ---
+    def _drain(self):
+        with self._lock:
+            n = min(len(self._queue), self.batch_size)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _process(self, batch):
+        entries = []
+        for order in batch:
+            amt = order['total'] if order['total'] is not None else order['qty'] * order['unit_price']
+            p_label, p_color = self.prioritize(order['deadline'])
+            entries.append({
+                "id": order['id'],
+                "customer": order['customer'],
+                "product": order['product'],
+                "qty": order['qty'],
+                "amt": amt,
+                "deadline": order['deadline'],
+                "priority": p_label,
+                "priority_color": p_color,
+                "status": "New",
+                "timestamp": order['timestamp']
+            })
+        entries.sort(key=lambda e: PRIORITY_RANK.get(e['priority'], len(PRIORITY_RANK)))
+        return entries
+
+    def flush(self):
+        total = 0
+        while True:
+            batch = self._drain()
+            if not batch: return total
+            start = time.perf_counter()
+            self.on_flush(self._process(batch))
+            self.last_flush_ms = (time.perf_counter() - start) * 1000
+            self.last_batch = len(batch)
+            self.flushed += len(batch)
+            self._flushes.append((time.time(), len(batch)))
+            total += len(batch)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_window)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"ORDER INGEST: flush failed ({e})")
+
+    def start(self):
+        if self._thread is not None: return
+        self._thread = threading.Thread(target=self._run, name='order-ingest', daemon=True)
+        self._thread.start()
+
+    # --- STATS ---
+    def stats(self, window=60):
+        cutoff = time.time() - window
+        recent = sum(n for t, n in self._flushes if t >= cutoff)
+        return {
+            "queue_depth": len(self._queue),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "flushed": self.flushed,
+            "throughput_per_sec": round(recent / window, 2),
+            "last_batch": self.last_batch,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+        }
@@ -0,0 +1,106 @@
+import math
+import threading
+import numpy as np
+from sim_engine import REPAIR_THRESHOLD
+
+# --- PREDICTIVE MAINTENANCE ---
+# Streaming model updated once per tick in O(1) per machine (one batched
+# NumPy pass over the floor; material forecasts live in inventory.py):
+#   MaintenanceModel - EWMA mean / variance of temperature and rpm, an anomaly
+#                      score (how many standard deviations the latest reading
+#                      is from its EWMA), and an exponentially weighted linear
+#                      regression of health over time since the last repair.
+#                      The fitted decay rate gives a time-to-failure forecast:
+#                      seconds until health reaches the auto-repair threshold.
+
+EPS = 1e-9
+
+
+class MaintenanceModel:
+    def __init__(self, machines, alpha=0.05, decay=0.995, threshold=REPAIR_THRESHOLD, warmup=10):
+        self.size = int(machines)
+        self.alpha = alpha        # EWMA weight of the newest reading
+        self.decay = decay        # regression weight kept per tick (~1 / (1 - decay) ticks of memory)
+        self.threshold = threshold
+        self.warmup = warmup      # samples in a segment before its slope is trusted
+        self.lock = threading.Lock()
+        n = self.size
+        self.temp_mean, self.temp_var = np.zeros(n), np.zeros(n)
+        self.rpm_mean, self.rpm_var = np.zeros(n), np.zeros(n)
+        self.anomaly = np.zeros(n)
+        # Weighted sums for health = a + b * t, with t measured backwards from now
+        self.sw, self.st, self.sh, self.stt, self.sth = (np.zeros(n) for _ in range(5))
+        self.samples = np.zeros(n, dtype=np.int64)
+        self.slope = np.zeros(n)  # health per second (negative while decaying)
+        self.ttf = np.full(n, np.inf)
+        self.last_health = None
+        self.ticks = 0
+
+    def _ewma(self, x, mean, var):
+        d = x - mean
+        mean += self.alpha * d
+        var *= 1 - self.alpha
+        var += (1 - self.alpha) * self.alpha * d * d
+
+    def update(self, rpm, temp, health, dt=1.0):
+        with self.lock:
+            if self.last_health is None:
+                self.temp_mean[:], self.rpm_mean[:] = temp, rpm
+                self.last_health = np.array(health, dtype=np.float64)
+            else:
+                # Score the reading against the model before it learns from it
+                z_temp = np.abs(temp - self.temp_mean) / np.sqrt(self.temp_var + EPS)
+                z_rpm = np.abs(rpm - self.rpm_mean) / np.sqrt(self.rpm_var + EPS)
+                self.anomaly = np.where(self.ticks >= self.warmup, np.maximum(z_temp, z_rpm), 0.0)
+            self._ewma(temp, self.temp_mean, self.temp_var)
+            self._ewma(rpm, self.rpm_mean, self.rpm_var)
+
+            # A jump up in health is a repair: start a new decay segment
+            repaired = health > self.last_health + EPS
+            if repaired.any():
+                for s in (self.sw, self.st, self.sh, self.stt, self.sth): s[repaired] = 0
+                self.samples[repaired] = 0
+            # Age the existing points by dt, forget a little, add the new one at t = 0
+            self.stt += -2 * dt * self.st + dt * dt * self.sw
+            self.st -= dt * self.sw
+            self.sth -= dt * self.sh
+            for s in (self.sw, self.st, self.sh, self.stt, self.sth): s *= self.decay
+            self.sw += 1
+            self.sh += health
+            self.samples += 1
+
+            denom = self.sw * self.stt - self.st * self.st
+            fitted = (self.samples >= self.warmup) & (denom > EPS)
+            self.slope = np.where(fitted, (self.sw * self.sth - self.st * self.sh) / np.where(fitted, denom, 1), 0.0)
+            decaying = self.slope < -EPS
+            self.ttf = np.where(decaying, np.maximum(0, health - self.threshold) / np.where(decaying, -self.slope, 1), np.inf)
+            self.last_health = np.array(health, dtype=np.float64)
+            self.ticks += 1
+
+    def machine(self, idx):
+        with self.lock:
+            return {
+                "machine": int(idx),
+                "ttf_s": None if math.isinf(self.ttf[idx]) else int(self.ttf[idx]),
+                "health_per_min": round(float(self.slope[idx]) * 60, 3),
+                "anomaly": round(float(self.anomaly[idx]), 2),
+                "temp_ewma": round(float(self.temp_mean[idx]), 1),
+                "temp_std": round(float(np.sqrt(self.temp_var[idx])), 2),
+                "rpm_ewma": int(self.rpm_mean[idx]),
+                "rpm_std": round(float(np.sqrt(self.rpm_var[idx])), 1),
+            }
+
+    def soonest(self, limit=10):
+        """Machines closest to failure, soonest first (only those with a forecast)."""
+        with self.lock:
+            finite = np.flatnonzero(np.isfinite(self.ttf))
+            if finite.size > limit: finite = finite[np.argpartition(self.ttf[finite], limit)[:limit]]
+            order = finite[np.argsort(self.ttf[finite], kind='stable')]
+        return [self.machine(i) for i in order.tolist()]
+
+    def at_risk(self, within):
+        with self.lock: return self.ttf <= within
+
+    def anomalous(self, score):
+        with self.lock: return self.anomaly >= score
+
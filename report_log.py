@@ -0,0 +1,133 @@
+import re
+import json
+import threading
+from storage import thread_connection
+
+# --- REPORT LOG ---
+# Every report ever filed, kept on disk in SQLite. Content words go into an
+# inverted index (term -> report ids) and type / author / timestamp are indexed,
+# so filtered queries touch only matching rows. Pages are keyset-paginated on
+# the report id (newest first): pass the `next` cursor of one page as `before`
+# to get the following one.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS report_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    type TEXT,
+    author TEXT,
+    content TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_report_log_timestamp ON report_log(timestamp);
+CREATE INDEX IF NOT EXISTS idx_report_log_type ON report_log(type, id);
+CREATE INDEX IF NOT EXISTS idx_report_log_author ON report_log(author, id);
+CREATE TABLE IF NOT EXISTS report_terms (
+    term TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY (term, id)
+) WITHOUT ROWID;
+"""
+
+COLUMNS = "r.id, r.timestamp, r.type, r.author, r.content"
+FILTERS = ('q', 'type', 'author', 'start', 'end')
+
+
+def filters(args):
+    """Query filters from request args (?q=&type=A,B&author=&start=&end=)."""
+    out = {k: args[k] for k in FILTERS if args.get(k)}
+    if 'type' in out: out['type'] = out['type'].upper().split(',')
+    return out
+
+
+def terms(text):
+    return sorted(set(re.findall(r"\w+", (text or "").lower())))
+
+
+def _row(row):
+    rid, timestamp, type, author, content = row
+    return {"id": rid, "timestamp": timestamp, "type": type, "author": author, "content": content}
+
+
+class ReportLog:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self.connection() as db: db.executescript(SCHEMA)
+
+    def connection(self):
+        return thread_connection(self._local, self.path)
+
+    def __len__(self):
+        return self.connection().execute("SELECT COUNT(*) FROM report_log").fetchone()[0]
+
+    # --- WRITES ---
+    def append(self, *entries):
+        """Store reports (oldest first); returns them with their ids."""
+        db = self.connection()
+        out = []
+        with self._write_lock, db:
+            for entry in entries:
+                cur = db.execute("INSERT INTO report_log(timestamp, type, author, content) VALUES (?, ?, ?, ?)",
+                                 (entry['timestamp'], entry.get('type'), entry.get('author'), entry.get('content')))
+                db.executemany("INSERT OR IGNORE INTO report_terms(term, id) VALUES (?, ?)",
+                               [(t, cur.lastrowid) for t in terms(entry.get('content'))])
+                out.append(dict(entry, id=cur.lastrowid))
+        return out
+
+    # --- QUERIES ---
+    def _where(self, q=None, type=None, author=None, start=None, end=None, before=None, after=None):
+        words = terms(q)
+        if words:
+            # The first term drives the scan through its (term, id) range; the others are point lookups
+            sql = "FROM report_terms t JOIN report_log r ON r.id = t.id WHERE t.term = ?"
+            args = [words[0]]
+            id_col = "t.id"
+        else:
+            sql, args, id_col = "FROM report_log r WHERE 1", [], "r.id"
+        for word in words[1:]:
+            sql += " AND EXISTS (SELECT 1 FROM report_terms x WHERE x.term = ? AND x.id = r.id)"
+            args.append(word)
+        if type:
+            types = type if isinstance(type, (list, tuple, set)) else [type]
+            sql += f" AND r.type IN ({', '.join('?' * len(types))})"
+            args.extend(types)
+        if author:
+            sql += " AND r.author = ?"
+            args.append(author)
+        if start:
+            sql += " AND r.timestamp >= ?"
+            args.append(start)
+        if end:
+            sql += " AND r.timestamp <= ?"
+            args.append(end + " 23:59:59" if len(end) == 10 else end)
+        if before is not None:
+            sql += f" AND {id_col} < ?"
+            args.append(before)
+        if after is not None:
+            sql += f" AND {id_col} > ?"
+            args.append(after)
+        return sql, args, id_col
+
+    def query(self, limit=100, **filters):
+        """One page, newest first; returns (reports, cursor for the next page or None)."""
+        sql, args, id_col = self._where(**filters)
+        rows = self.connection().execute(f"SELECT {COLUMNS} {sql} ORDER BY {id_col} DESC LIMIT ?", args + [limit + 1]).fetchall()
+        page = [_row(r) for r in rows[:limit]]
+        return page, (page[-1]['id'] if len(rows) > limit else None)
+
+    def export(self, chunk=1000, **filters):
+        """Yield matching reports oldest first as NDJSON lines, reading `chunk` rows at a time."""
+        after = filters.pop('after', None)
+        while True:
+            sql, args, id_col = self._where(after=after, **filters)
+            rows = self.connection().execute(f"SELECT {COLUMNS} {sql} ORDER BY {id_col} ASC LIMIT ?", args + [chunk]).fetchall()
+            for r in rows: yield json.dumps(_row(r)) + "\n"
+            if len(rows) < chunk: return
+            after = rows[-1][0]
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
@@ -0,0 +1,18 @@
+# --- SOCKET ROOMS ---
+# Each socket joins one room per topic its role may receive ("Manager/reports");
+# emitters publish a topic to the rooms of the roles that should see it, and
+# pages can narrow their topics further with a 'subscribe' message. Shared by
+# the app and the cluster web workers (worker.py).
+ROLE_TOPICS = {
+    'Operator': {'system', 'orders', 'notifications', 'maintenance'},
+    'Manager': {'system', 'orders', 'client_orders', 'reports', 'notifications', 'maintenance'},
+    'Analyst': {'system', 'orders', 'reports', 'maintenance'},
+    'public': set(),
+}
+
+
+def topic_room(role, topic): return f"{role}/{topic}"
+
+
+def rooms_for(topic, roles=None):
+    return [topic_room(r, topic) for r in (roles or ROLE_TOPICS) if topic in ROLE_TOPICS.get(r, ())]
@@ -0,0 +1,162 @@
+import time
+import bisect
+import threading
+from functools import lru_cache
+from datetime import datetime
+import numpy as np
+
+# --- DEADLINE SCHEDULER ---
+# Earliest-deadline-first plan over everything the floor still has to make.
+# Running orders progress in parallel at the current rate (percent per second,
+# from the same rpm / temperature model the tick uses); queued orders wait in
+# EDF order and run one after another on `lanes` lines. Every order takes the
+# same time at a given rate, so a queued order's projected completion follows
+# from its position alone: adding, pausing or finishing an order is a binary
+# search plus one list insert/delete in the sorted queue (O(n), a memmove), not a
+# re-plan.
+
+NO_DEADLINE = float('inf')
+
+
+@lru_cache(maxsize=4096)
+def deadline_ts(deadline):
+    """'YYYY-MM-DD' -> end of that day as a unix timestamp (inf when missing)."""
+    if not deadline: return NO_DEADLINE
+    try:
+        return datetime.strptime(deadline, "%Y-%m-%d").replace(hour=23, minute=59, second=59).timestamp()
+    except (TypeError, ValueError):
+        return NO_DEADLINE
+
+
+class DeadlineScheduler:
+    def __init__(self, lanes=1, clock=time.time):
+        self.lanes = lanes
+        self.clock = clock
+        self.rate = 0.0
+        self.lock = threading.Lock()
+        self._seq = 0
+        self._entries = {}
+        self._queue = []     # (deadline, seq, key), EDF order
+        self._running = {}
+        self._paused = {}
+        self._deadlines = None # cached queue deadlines as an array
+
+    # --- INCREMENTAL UPDATES ---
+    def track(self, key, deadline, state='queued', progress=0, kind='production'):
+        with self.lock:
+            entry = self._entries.get(key)
+            due = deadline_ts(deadline)
+            if entry is not None and (entry['state'] != state or entry['due'] != due): self._drop(key)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._seq += 1
+                entry = self._entries[key] = {'key': key, 'kind': kind, 'deadline': deadline, 'due': due,
+                                              'seq': self._seq, 'state': state, 'progress': progress}
+                if state == 'queued':
+                    bisect.insort(self._queue, (due, entry['seq'], key))
+                    self._deadlines = None
+                elif state == 'running': self._running[key] = entry
+                else: self._paused[key] = entry
+            entry['progress'] = progress
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None: return
+        if entry['state'] == 'queued':
+            item = (entry['due'], entry['seq'], key)
+            i = bisect.bisect_left(self._queue, item)
+            if i < len(self._queue) and self._queue[i] == item: del self._queue[i]
+            self._deadlines = None
+        self._running.pop(key, None)
+        self._paused.pop(key, None)
+
+    def remove(self, key):
+        with self.lock: self._drop(key)
+
+    def track_order(self, order):
+        """Track a production order from its row; finished orders leave the plan."""
+        status = order.get('status')
+        if status in ('Completed', 'QA Check'):
+            self.remove(order['id'])
+            return
+        state = 'paused' if order.get('paused') else 'running' if status == 'In Progress' else 'queued'
+        self.track(order['id'], order.get('deadline'), state, order.get('progress', 0))
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+            self._queue.clear()
+            self._running.clear()
+            self._paused.clear()
+            self._deadlines = None
+
+    def set_rate(self, percent_per_second):
+        self.rate = max(0.0, float(percent_per_second))
+
+    # --- PROJECTIONS ---
+    def _order_time(self):
+        return 100.0 / self.rate if self.rate > 0 else NO_DEADLINE
+
+    def _running_eta(self, entry, now):
+        return now + (100 - entry['progress']) / self.rate if self.rate > 0 else NO_DEADLINE
+
+    def _queued_eta(self, positions, now):
+        return now + (np.asarray(positions) // self.lanes + 1) * self._order_time()
+
+    def _queue_deadlines(self):
+        if self._deadlines is None:
+            self._deadlines = np.fromiter((d for d, _, _ in self._queue), dtype=np.float64, count=len(self._queue))
+        return self._deadlines
+
+    def _row(self, entry, position, eta, now):
+        late = eta > entry['due'] or (entry['state'] == 'paused' and entry['due'] <= now)
+        return {
+            "id": entry['key'],
+            "kind": entry['kind'],
+            "state": entry['state'],
+            "deadline": entry['deadline'],
+            "position": position,
+            "progress": entry['progress'],
+            "projected_completion": None if eta == NO_DEADLINE else datetime.fromtimestamp(eta).strftime("%Y-%m-%d %H:%M:%S"),
+            "slack_s": None if NO_DEADLINE in (eta, entry['due']) else int(entry['due'] - eta),
+            "at_risk": bool(late),
+        }
+
+    def plan(self, offset=0, limit=100, at_risk_only=False):
+        """One page of the plan: running orders, then the EDF queue, then paused orders."""
+        with self.lock:
+            now = self.clock()
+            by_due = lambda e: (e['due'], e['seq'])
+            running = [self._row(e, None, self._running_eta(e, now), now) for e in sorted(self._running.values(), key=by_due)]
+            paused = [self._row(e, None, NO_DEADLINE, now) for e in sorted(self._paused.values(), key=by_due)]
+            if at_risk_only:
+                running = [r for r in running if r['at_risk']]
+                paused = [r for r in paused if r['at_risk']]
+                positions = np.flatnonzero(self._queued_eta(np.arange(len(self._queue)), now) > self._queue_deadlines())
+            else:
+                positions = np.arange(len(self._queue))
+
+            page = running[offset:offset + limit]
+            offset, limit = max(0, offset - len(running)), limit - len(page)
+            picked = positions[offset:offset + limit]
+            for pos, eta in zip(picked.tolist(), self._queued_eta(picked, now).tolist()):
+                page.append(self._row(self._entries[self._queue[pos][2]], pos, eta, now))
+            offset, limit = max(0, offset - len(positions)), limit - len(picked)
+            page.extend(paused[offset:offset + limit])
+            return page
+
+    def summary(self):
+        with self.lock:
+            now = self.clock()
+            at_risk = sum(1 for e in self._running.values() if self._running_eta(e, now) > e['due'])
+            at_risk += sum(1 for e in self._paused.values() if e['due'] <= now)
+            if self._queue:
+                at_risk += int((self._queued_eta(np.arange(len(self._queue)), now) > self._queue_deadlines()).sum())
+            return {
+                "running": len(self._running),
+                "queued": len(self._queue),
+                "paused": len(self._paused),
+                "at_risk": at_risk,
+                "rate": round(self.rate, 2),
+                "order_minutes": None if self.rate <= 0 else round(self._order_time() / 60, 2),
+            }
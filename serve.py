@@ -0,0 +1,46 @@
+import os
+import socket
+import importlib
+
+# --- PRODUCTION SERVER ---
+# Cooperative gevent server: every HTTP request and Socket.IO connection is a
+# greenlet instead of an OS thread, so thousands of idle dashboards cost a few
+# KB each. The standard library is patched before anything else is imported;
+# calls that still block in C code go through offload.blocking().
+#   python serve.py                 (FACTORY_HOST / FACTORY_PORT, default 0.0.0.0:5000)
+# FACTORY_ROLE=owner / worker run the two halves of a cluster (cluster.py);
+# FACTORY_REUSE_PORT=1 lets several workers listen on the same port.
+
+ASYNC_MODE = os.environ.setdefault('FACTORY_ASYNC_MODE', 'gevent')
+if ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+ROLE = os.environ.get('FACTORY_ROLE', 'standalone')
+REUSE_PORT = os.environ.get('FACTORY_REUSE_PORT', '0') == '1'
+factory = importlib.import_module('worker' if ROLE == 'worker' else 'app')
+
+def shared_listener(host, port):
+    # The kernel spreads new connections over every process bound with SO_REUSEPORT
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    return sock
+
+if __name__ == '__main__':
+    host = os.environ.get('FACTORY_HOST', '0.0.0.0')
+    port = int(os.environ.get('FACTORY_PORT', 5000))
+    factory.start_engine()
+    print(f"SYSTEM ONLINE ({ASYNC_MODE}, {ROLE}, pid {os.getpid()}): http://{host}:{port}/login.html")
+    if REUSE_PORT:
+        if ASYNC_MODE != 'gevent': raise SystemExit("FACTORY_REUSE_PORT needs FACTORY_ASYNC_MODE=gevent")
+        from gevent import pywsgi
+        try:
+            from geventwebsocket.handler import WebSocketHandler as handler # native websockets when installed
+        except ImportError:
+            handler = pywsgi.WSGIHandler
+        pywsgi.WSGIServer(shared_listener(host, port), factory.app, log=None, handler_class=handler).serve_forever()
+    else:
+        factory.socketio.run(factory.app, host=host, port=port, log_output=False, allow_unsafe_werkzeug=ASYNC_MODE == 'threading')
@@ -0,0 +1,185 @@
+import numpy as np
+
+# --- VECTORIZED FLOOR SIMULATION ---
+# Same physics as the original single-machine loop (RPM ramp, thermal model,
+# efficiency loss, stress/health decay, auto-repair), applied to every machine
+# on the floor in one batched NumPy step. Machine 0 is the HUD's primary machine.
+# A one-machine floor takes a scalar path with the same arithmetic, because
+# NumPy's per-call overhead dominates at that size; random draws come from the
+# seeded generator in blocks, so both paths see the same numbers.
+
+NOMINAL_RPM = 1200
+REPAIR_THRESHOLD = 80
+DRAW_BLOCK = 4096 # random values drawn per refill, across all machines
+
+
+def progress_rate(rpm, temp, running=True):
+    """Percent an in-progress order advances per tick on a machine in this state."""
+    if not running: return 0.0
+    rate = (rpm / 1200) * 8
+    if temp > 90: rate *= 0.5
+    return rate
+
+
+class FloorSimulation:
+    def __init__(self, machines=1, seed=None, target_rpm=1200, current_rpm=1200, temp=65.0,
+                 health=100.0, efficiency=95.0, yield_count=0):
+        n = self.size = int(machines)
+        self.rng = np.random.default_rng(seed)
+        self.target_rpm = np.full(n, target_rpm, dtype=np.float64)
+        self.current_rpm = np.full(n, current_rpm, dtype=np.float64)
+        self.temp = np.full(n, temp, dtype=np.float64)
+        self.temp_offset = np.zeros(n, dtype=np.float64)
+        self.health = np.full(n, health, dtype=np.float64)
+        self.efficiency = np.full(n, efficiency, dtype=np.float64)
+        self.yield_count = np.full(n, yield_count, dtype=np.int64)
+        self.running = np.ones(n, dtype=bool)
+        self.repairs = 0
+        self._draws, self._draw_pos = None, 0
+
+    def _next_draws(self):
+        """(rpm ramp, rpm jitter, thermal noise, units made) for this tick, one value per machine."""
+        if self._draws is None or self._draw_pos >= len(self._draws[0]):
+            rng, n, k = self.rng, self.size, max(1, DRAW_BLOCK // self.size)
+            self._draws = (rng.integers(20, 51, (k, n)), rng.integers(-5, 6, (k, n)),
+                           rng.uniform(-0.5, 0.5, (k, n)), rng.integers(1, 4, (k, n)))
+            if n == 1: self._draws = tuple(d[:, 0].tolist() for d in self._draws)
+            self._draw_pos = 0
+        i = self._draw_pos
+        self._draw_pos += 1
+        return tuple(d[i] for d in self._draws)
+
+    # --- PHYSICS ---
+    def step(self):
+        """Advance every machine by one tick; returns indices auto-repaired this tick."""
+        if self.size == 1: return self._step_one()
+        run = self.running
+        stop = ~run
+
+        # Stopped machines spin down and cool
+        if stop.any():
+            self.target_rpm[stop] = 0
+            cur = self.current_rpm[stop]
+            cur = np.where(cur > 0, cur - np.maximum(10, cur * 0.15), cur)
+            cur[cur < 1] = 0
+            self.current_rpm[stop] = cur
+            self.temp[stop] = np.maximum(0, self.temp[stop] - 2.0)
+            self.efficiency[stop] = 0
+
+        if not run.any(): return np.empty(0, dtype=np.int64)
+
+        # RPM ramp towards target plus jitter
+        ramp, jitter, noise, units = self._next_draws()
+        cur = self.current_rpm
+        delta = np.where(cur < self.target_rpm, ramp, np.where(cur > self.target_rpm, -ramp, 0))
+        new_rpm = np.maximum(0, cur + delta + jitter)
+        self.current_rpm = np.where(run, new_rpm, cur)
+        cur = self.current_rpm
+
+        # Thermal model
+        deviation = np.abs(cur - NOMINAL_RPM)
+        spinning = run & (cur > 100)
+        hot = np.rint((60 + deviation / 30 + self.temp_offset + noise) * 10) / 10
+        idle = run & ~spinning & (self.temp > 20)
+        self.temp = np.where(spinning, hot, np.where(idle, self.temp - 0.5, self.temp))
+
+        # Efficiency and yield
+        eff_loss = np.where(deviation > 100, 5, 0) + np.where(self.temp > 80, 10, 0)
+        eff = np.maximum(50, 100 - eff_loss - (100 - self.health) * 0.2)
+        self.efficiency = np.where(run, eff, self.efficiency)
+        produced = run & (self.efficiency > 80)
+        self.yield_count += np.where(produced, units, 0)
+
+        # Stress and health decay
+        stress = np.where(cur > 1800, 0.2, 0) + np.where(self.temp > 85, 0.3, 0) + np.where(cur > 0, 0.05, 0)
+        self.health = np.where(run, np.maximum(0, self.health - stress), self.health)
+
+        # AI auto-repair
+        repaired = np.flatnonzero(run & (self.health < REPAIR_THRESHOLD))
+        if repaired.size:
+            self.health[repaired] = 100.0
+            self.temp_offset[repaired] = 0.0
+            self.target_rpm[repaired] = NOMINAL_RPM
+            self.repairs += repaired.size
+        return repaired
+
+    def _step_one(self):
+        # Scalar twin of the batched step above for a single machine
+        cur, temp, health = float(self.current_rpm[0]), float(self.temp[0]), float(self.health[0])
+        if not self.running[0]:
+            self.target_rpm[0] = 0
+            if cur > 0: cur -= max(10, cur * 0.15)
+            self.current_rpm[0] = 0 if cur < 1 else cur
+            self.temp[0] = max(0, temp - 2.0)
+            self.efficiency[0] = 0
+            return np.empty(0, dtype=np.int64)
+
+        ramp, jitter, noise, units = self._next_draws()
+        target = float(self.target_rpm[0])
+        delta = ramp if cur < target else (-ramp if cur > target else 0)
+        cur = max(0, cur + delta + jitter)
+
+        deviation = abs(cur - NOMINAL_RPM)
+        if cur > 100: temp = round((60 + deviation / 30 + float(self.temp_offset[0]) + noise) * 10) / 10
+        elif temp > 20: temp -= 0.5
+
+        eff_loss = (5 if deviation > 100 else 0) + (10 if temp > 80 else 0)
+        eff = max(50, 100 - eff_loss - (100 - health) * 0.2)
+        if eff > 80: self.yield_count[0] += units
+
+        stress = (0.2 if cur > 1800 else 0) + (0.3 if temp > 85 else 0) + (0.05 if cur > 0 else 0)
+        health = max(0, health - stress)
+        self.current_rpm[0], self.temp[0], self.efficiency[0], self.health[0] = cur, temp, eff, health
+
+        if health < REPAIR_THRESHOLD:
+            self.health[0] = 100.0
+            self.temp_offset[0] = 0.0
+            self.target_rpm[0] = NOMINAL_RPM
+            self.repairs += 1
+            return np.zeros(1, dtype=np.int64)
+        return np.empty(0, dtype=np.int64)
+
+    # --- CONTROL ---
+    def select(self, machine=None):
+        if machine is None or machine == 'all': return slice(None)
+        idx = int(machine)
+        if not 0 <= idx < self.size: raise IndexError(f"Machine {idx} does not exist")
+        return idx
+
+    def command(self, cmd, machine=None):
+        sel = self.select(machine)
+        if "start" in cmd: self.running[sel] = True
+        if "stop" in cmd: self.running[sel] = False
+        if "repair" in cmd or "stabilize" in cmd:
+            self.health[sel] = 100
+            self.temp_offset[sel] = 0
+        if "increase speed" in cmd: self.target_rpm[sel] += 100
+        if "decrease speed" in cmd: self.target_rpm[sel] -= 100
+        if "increase temp" in cmd: self.temp_offset[sel] += 5
+        if "decrease temp" in cmd: self.temp_offset[sel] -= 5
+
+    # --- TELEMETRY ---
+    def machine(self, idx=0):
+        return {
+            "target_rpm": float(self.target_rpm[idx]),
+            "current_rpm": float(self.current_rpm[idx]),
+            "temp": float(self.temp[idx]),
+            "temp_offset": float(self.temp_offset[idx]),
+            "health": float(self.health[idx]),
+            "efficiency": float(self.efficiency[idx]),
+            "yield_count": int(self.yield_count[idx]),
+            "status": "RUNNING" if self.running[idx] else "STOPPED",
+        }
+
+    def aggregate(self):
+        return {
+            'machines': self.size,
+            'running': int(self.running.sum()),
+            'avg_rpm': int(self.current_rpm.mean()),
+            'avg_temp': round(float(self.temp.mean()), 1),
+            'max_temp': round(float(self.temp.max()), 1),
+            'min_health': int(self.health.min()),
+            'avg_efficiency': int(self.efficiency.mean()),
+            'total_yield': int(self.yield_count.sum()),
+            'repairs': self.repairs,
+        }
@@ -0,0 +1,143 @@
+import copy
+import threading
+from collections import deque
+
+# --- VERSIONED STATE FEED ---
+# Turns a full state dict into a stream of versioned deltas. Scalars are sent
+# when they change; collections (lists of dicts keyed by `keys[name]`) are sent
+# as upserted / removed entries, plus the new key order when membership or
+# ordering changed. `patch` records changes to known rows only (O(changed)),
+# and leaves the order implied: new rows last, removed rows dropped. Clients receive one snapshot on connect and apply deltas
+# whose `base` matches their version; on a gap they ask to resync and get the
+# missed deltas from a short history, or a fresh snapshot. In cluster mode web
+# workers keep replicas: `load` a snapshot from the owner, then `apply` its
+# deltas.
+
+
+class StateFeed:
+    def __init__(self, name, keys=None, history=64):
+        self.name = name
+        self.keys = keys or {}
+        self.version = 0
+        self.lock = threading.Lock()
+        self._scalars = {}
+        self._rows = {coll: {} for coll in self.keys}
+        self._order = {coll: [] for coll in self.keys}
+        self._history = deque(maxlen=history)
+
+    def _split(self, state):
+        scalars = {k: v for k, v in state.items() if k not in self.keys}
+        return scalars, {coll: state.get(coll) or [] for coll in self.keys}
+
+    def snapshot(self):
+        with self.lock:
+            full = dict(self._scalars)
+            for coll, key in self.keys.items():
+                full[coll] = [self._rows[coll][k] for k in self._order[coll]]
+            return {'feed': self.name, 'v': self.version, 'keys': self.keys, 'state': full}
+
+    def update(self, state):
+        """Record a new state; returns the delta, or None when nothing changed."""
+        with self.lock: return self._diff(state)
+
+    def _diff(self, state):
+        scalars, colls = self._split(state)
+        changed = {k: copy.deepcopy(v) for k, v in scalars.items() if k not in self._scalars or self._scalars[k] != v}
+        dropped = [k for k in self._scalars if k not in scalars]
+        upsert, remove, order = {}, {}, {}
+        for coll, rows in colls.items():
+            key = self.keys[coll]
+            known = self._rows[coll]
+            seen = {}
+            for row in rows:
+                k = row[key]
+                seen[k] = row
+                if known.get(k) != row:
+                    upsert.setdefault(coll, []).append(dict(row))
+            gone = [k for k in known if k not in seen]
+            if gone: remove[coll] = gone
+            keys_now = list(seen)
+            if keys_now != self._order[coll]: order[coll] = keys_now
+            for row in upsert.get(coll, []): known[row[key]] = row
+            for k in gone: del known[k]
+            self._order[coll] = keys_now
+        if not (changed or dropped or upsert or remove or order): return None
+
+        self._scalars.update(changed)
+        for k in dropped: del self._scalars[k]
+        self.version += 1
+        delta = {'feed': self.name, 'v': self.version, 'base': self.version - 1}
+        if changed: delta['set'] = changed
+        if dropped: delta['unset'] = dropped
+        if upsert: delta['upsert'] = upsert
+        if remove: delta['remove'] = remove
+        if order: delta['order'] = order
+        self._history.append(delta)
+        return delta
+
+    def patch(self, coll, changed=(), removed=()):
+        """Record changes to some rows of one collection, without diffing the rest; returns the delta or None.
+
+        Rows not seen before go last; the delta carries no key order, so
+        receivers append new rows and drop removed ones from theirs."""
+        with self.lock:
+            key, known, order = self.keys[coll], self._rows[coll], self._order[coll]
+            upsert = []
+            for row in changed:
+                k = row[key]
+                if known.get(k) == row: continue
+                if k not in known: order.append(k)
+                known[k] = dict(row)
+                upsert.append(known[k])
+            gone = [k for k in dict.fromkeys(removed) if k in known]
+            if gone:
+                for k in gone: del known[k]
+                self._order[coll] = [k for k in order if k in known]
+            if not (upsert or gone): return None
+            self.version += 1
+            delta = {'feed': self.name, 'v': self.version, 'base': self.version - 1}
+            if upsert: delta['upsert'] = {coll: upsert}
+            if gone: delta['remove'] = {coll: gone}
+            self._history.append(delta)
+            return delta
+
+    def since(self, version):
+        """Deltas after `version`, or None if they are no longer in history."""
+        with self.lock:
+            if version == self.version: return []
+            if not self._history or version is None or version < self._history[0]['base'] or version > self.version:
+                return None
+            return [d for d in self._history if d['v'] > version]
+
+    # --- REPLICAS ---
+    def load(self, snapshot):
+        """Replace the state with a snapshot of another feed (resets history)."""
+        with self.lock:
+            state = snapshot['state']
+            self._scalars, colls = self._split(state)
+            for coll, key in self.keys.items():
+                self._rows[coll] = {row[key]: row for row in colls[coll]}
+                self._order[coll] = [row[key] for row in colls[coll]]
+            self.version = snapshot['v']
+            self._history.clear()
+
+    def apply(self, delta):
+        """Apply a delta of another feed; False when it doesn't follow on (load a snapshot)."""
+        with self.lock:
+            if delta['v'] <= self.version: return True # already have it
+            if delta['base'] != self.version: return False
+            self._scalars.update(delta.get('set', {}))
+            for k in delta.get('unset', ()): self._scalars.pop(k, None)
+            order = delta.get('order', {})
+            for coll, rows in delta.get('upsert', {}).items():
+                key, known = self.keys[coll], self._rows[coll]
+                for row in rows:
+                    if row[key] not in known and coll not in order: self._order[coll].append(row[key])
+                    known[row[key]] = row
+            for coll, gone in delta.get('remove', {}).items():
+                for k in gone: self._rows[coll].pop(k, None)
+                if coll not in order: self._order[coll] = [k for k in self._order[coll] if k in self._rows[coll]]
+            for coll, keys in order.items(): self._order[coll] = keys
+            self.version = delta['v']
+            self._history.append(delta)
+            return True
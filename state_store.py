@@ -0,0 +1,206 @@
+import time
+import atexit
+import threading
+from order_book import OrderBook
+from metrics import REGISTRY
+
+# --- IN-MEMORY STATE STORE ---
+# Owns users, inventory, financials, orders and reports. Reads are served from
+# memory. Every mutation is a small record applied through `_apply` and handed
+# to a storage backend (storage.py), which persists it in the background: a
+# flusher thread calls `backend.flush` every `flush_interval` seconds, or early
+# when the backend asks for it.
+
+REPORT_LIMIT = 50
+
+LOAD_SECONDS = REGISTRY.histogram('factory_store_load_seconds', 'Time to load state from the storage backend', ('backend',))
+FLUSH_SECONDS = REGISTRY.histogram('factory_store_flush_seconds', 'Time spent in flushes that wrote state', ('backend',))
+MUTATIONS = REGISTRY.counter('factory_store_mutations_total', 'Committed state mutations', ('op',))
+
+
+class StateStore:
+    def __init__(self, backend, flush_interval=2.0, offload=None):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.offload = offload or (lambda fn, *args: fn(*args)) # runs backend writes (off the event loop under gevent)
+        self.lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self.version = 0 # bumps on every committed mutation and reset
+        with LOAD_SECONDS.time(backend=backend.kind):
+            self._load(backend.load())
+            for record in backend.replay(): self._apply(record)
+            backend.open(self)
+
+    # --- LOADING ---
+    def _load(self, doc):
+        hub = doc.setdefault('production_hub', {})
+        hub.setdefault('orders', [])
+        hub.setdefault('reports', [])
+        doc.setdefault('inventory', [])
+        doc.setdefault('financials', {'revenue': 0, 'cost': 0})
+        doc.setdefault('users', [])
+        self.doc = doc
+        self.book = OrderBook(hub['orders'], next_seq=hub.get('order_seq', 1))
+        self._users_by_email = {u['email']: u for u in doc['users']}
+        self._stock_by_name = {i['name']: i for i in doc['inventory']}
+
+    # --- READS ---
+    @property
+    def orders(self): return self.book.to_list()
+
+    @property
+    def reports(self): return self.doc['production_hub']['reports']
+
+    @property
+    def inventory(self): return self.doc['inventory']
+
+    @property
+    def financials(self): return self.doc['financials']
+
+    @property
+    def users(self): return self.doc['users']
+
+    def get(self, key, default=None):
+        return self.doc.get(key, default)
+
+    def find_user(self, email):
+        return self._users_by_email.get(email)
+
+    def find_order(self, order_id):
+        return self.book.get(order_id)
+
+    def next_order_id(self):
+        with self.lock: return self.book.next_id()
+
+    def find_stock(self, name):
+        return self._stock_by_name.get(name)
+
+    def snapshot(self):
+        """Point-in-time copy of the document (call with the lock held).
+
+        Mutations only ever change rows one level deep, so copying those is enough
+        to encode the result after the lock is released."""
+        doc = dict(self.doc)
+        hub = doc['production_hub'] = dict(self.doc['production_hub'])
+        hub['orders'] = [dict(o) for o in self.book]
+        hub['order_seq'] = self.book.next_seq
+        hub['reports'] = list(hub['reports'])
+        doc['inventory'] = [dict(i) for i in self.doc['inventory']]
+        doc['financials'] = dict(self.doc['financials'])
+        doc['users'] = list(self.doc['users'])
+        return doc
+
+    # --- MUTATIONS ---
+    def _apply(self, rec):
+        op = rec['op']
+        if op == 'user.add':
+            self.users.append(rec['user'])
+            self._users_by_email[rec['user']['email']] = rec['user']
+        elif op == 'order.add':
+            self.book.add(rec['order'])
+        elif op == 'order.update':
+            self.book.update(rec['id'], rec['fields'])
+        elif op == 'order.progress':
+            for oid, progress in rec['progress'].items(): self.book.update(oid, {'progress': progress})
+        elif op == 'order.remove':
+            self.book.remove(rec['id'])
+        elif op == 'fin.post':
+            self.financials[rec['kind']] = self.financials.get(rec['kind'], 0) + rec['amount']
+        elif op == 'stock.adjust':
+            item = self.find_stock(rec['name'])
+            if item is not None: item['stock'] = max(0, item['stock'] + rec['delta'])
+        elif op == 'stock.consume':
+            for name, delta in rec['deltas'].items():
+                item = self.find_stock(name)
+                if item is not None: item['stock'] = max(0, item['stock'] + delta)
+        elif op == 'ingest.reserve':
+            hub = self.doc['production_hub']
+            hub['client_order_seq'] = max(hub.get('client_order_seq', 0), rec['upto'])
+        elif op == 'report.add':
+            self.reports.insert(0, rec['entry'])
+            if len(self.reports) > REPORT_LIMIT: self.reports.pop()
+
+    def subscribe(self, fn):
+        # fn(record) runs after every committed mutation, under the store lock
+        self._listeners.append(fn)
+
+    def _commit(self, rec):
+        with self.lock:
+            self._apply(rec)
+            self.version += 1
+            for fn in self._listeners: fn(rec)
+            if self.backend.append(rec): self._wake.set()
+        MUTATIONS.inc(op=rec['op'])
+
+    def add_user(self, user):
+        self._commit({'op': 'user.add', 'user': user})
+
+    def add_order(self, order):
+        self._commit({'op': 'order.add', 'order': order})
+
+    def remove_order(self, order):
+        self._commit({'op': 'order.remove', 'id': order['id']})
+
+    def update_order(self, order, **fields):
+        self._commit({'op': 'order.update', 'id': order['id'], 'fields': fields})
+
+    def progress_orders(self, progress):
+        # A tick's progress for every running order as one record ({id: progress})
+        if progress: self._commit({'op': 'order.progress', 'progress': progress})
+
+    def post(self, kind, amount):
+        self._commit({'op': 'fin.post', 'kind': kind, 'amount': amount})
+
+    def adjust_stock(self, name, delta):
+        self._commit({'op': 'stock.adjust', 'name': name, 'delta': delta})
+        return self.find_stock(name)
+
+    def consume_stock(self, deltas):
+        # Several stock changes as one record ({name: delta})
+        if deltas: self._commit({'op': 'stock.consume', 'deltas': deltas})
+
+    def reserve_client_ids(self, upto):
+        # Storefront order numbers below `upto` are taken (order_ingest.py)
+        self._commit({'op': 'ingest.reserve', 'upto': upto})
+
+    def add_report(self, entry):
+        self._commit({'op': 'report.add', 'entry': entry})
+
+    def reset(self, doc):
+        # Replaces the whole state; the backend persists it right away
+        with self.lock:
+            self._load(doc)
+            self.version += 1
+        self.backend.reset(self)
+
+    # --- PERSISTENCE ---
+    def flush(self):
+        start = time.perf_counter()
+        wrote = self.backend.flush(self)
+        if wrote: FLUSH_SECONDS.observe(time.perf_counter() - start, backend=self.backend.kind)
+        return wrote
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.offload(self.flush)
+            except Exception as e:
+                print(f"STATE STORE: flush failed ({e})")
+                time.sleep(self.flush_interval)
+
+    def start(self):
+        if self._thread is not None: return
+        self._thread = threading.Thread(target=self._run, name='state-store-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None: self._thread.join(timeout=5)
+        self.backend.close(self)
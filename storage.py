@@ -0,0 +1,384 @@
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import threading
+from journal import Journal
+
+# --- STORAGE BACKENDS ---
+# StateStore keeps the factory state in memory and hands every committed
+# mutation record to one of these backends:
+#   SnapshotStorage - rewrites the JSON document when something changed
+#   JournalStorage  - appends records to a journal, compacts into the document
+#                     once the journal outgrows a fraction of it
+#   SqliteStorage   - a table per collection in a WAL-mode SQLite database,
+#                     keyed by the lookups the store makes (email, order id, name)
+# Backend API: load() -> doc, replay() -> records to re-apply, open(store),
+# append(rec) -> True when an early flush is wanted, flush(store), reset(store),
+# close(store).
+
+
+def atomic_write(path, payload):
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.json', dir=folder)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+
+
+def encode(doc):
+    # Compact: snapshots are rewritten whole, so every byte costs on each flush
+    return json.dumps(doc, separators=(',', ':'))
+
+
+def read_json(path):
+    if not os.path.exists(path): return {}
+    with open(path, 'r') as f: return json.load(f)
+
+
+class SnapshotStorage:
+    kind = 'snapshot'
+
+    def __init__(self, path, batch_size=50):
+        self.path = path
+        self.batch_size = batch_size
+        self._write_lock = threading.Lock()
+        self._pending = 0
+
+    def load(self): return read_json(self.path)
+
+    def replay(self): return ()
+
+    def open(self, store): pass
+
+    def append(self, rec):
+        self._pending += 1
+        return self._pending >= self.batch_size
+
+    def flush(self, store):
+        with self._write_lock:
+            with store.lock:
+                if not self._pending: return False
+                doc = store.snapshot()
+                pending, self._pending = self._pending, 0
+            try:
+                atomic_write(self.path, encode(doc))
+            except OSError:
+                with store.lock: self._pending += pending
+                raise
+            return True
+
+    def reset(self, store):
+        with store.lock: self._pending += 1
+        self.flush(store)
+
+    def close(self, store): self.flush(store)
+
+
+class JournalStorage:
+    kind = 'journal'
+
+    def __init__(self, path, compact_ratio=1.0, min_compact_bytes=256 * 1024):
+        # Compacting once the journal outgrows `compact_ratio` x the last snapshot makes each
+        # compaction's cost (one snapshot) proportional to the records it folds: the
+        # amortized cost per mutation stays flat however large the document grows
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+        self._write_lock = threading.Lock()
+        self.seq = 0
+        self.journal = None
+        self._compact_at = min_compact_bytes
+
+    def _snapshot_written(self, size):
+        self._compact_at = max(self.min_compact_bytes, int(size * self.compact_ratio))
+
+    def _due(self):
+        return self.journal.size >= self._compact_at
+
+    def load(self):
+        doc = read_json(self.path)
+        self._snapshot_written(os.path.getsize(self.path) if os.path.exists(self.path) else 0)
+        self.seq = doc.get('journal_seq', 0)
+        self.journal = Journal(self.path + '.journal')
+        return doc
+
+    def replay(self):
+        for record in self.journal.replay(after_seq=self.seq):
+            self.seq = record['s']
+            yield record
+
+    def open(self, store):
+        if os.path.exists(self.journal.path + '.1'):
+            # Interrupted compaction: fold both segments before appending again
+            self._write_snapshot(store)
+            self.journal.drop_rotated()
+            self.journal.truncate()
+
+    def append(self, rec):
+        self.seq += 1
+        rec['s'] = self.seq
+        self.journal.append(rec)
+        return self._due()
+
+    def _write_snapshot(self, store, rotate=False):
+        with self._write_lock:
+            with store.lock:
+                doc = store.snapshot()
+                doc['journal_seq'] = self.seq
+                if rotate: self.journal.rotate()
+            payload = encode(doc)
+            atomic_write(self.path, payload)
+            self._snapshot_written(len(payload))
+
+    def compact(self, store):
+        # Fold the journal into a fresh snapshot. The journal is rotated in the
+        # same critical section that copies the document, so mutations keep
+        # appending to a new segment while the copy is encoded and written. Records are
+        # stamped with `s`; anything already in the snapshot is skipped on replay.
+        self._write_snapshot(store, rotate=True)
+        self.journal.drop_rotated()
+
+    def flush(self, store):
+        if self._due():
+            self.compact(store)
+        else:
+            # Not under the store lock: appends go on while the disk catches up
+            with self._write_lock: self.journal.sync()
+        return True
+
+    def reset(self, store): self.compact(store)
+
+    def close(self, store):
+        if self.journal.count: self.compact(store)
+        self.journal.close()
+
+
+# --- SQLITE ---
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    email TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    role TEXT
+);
+CREATE TABLE IF NOT EXISTS orders (
+    pos INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+DROP INDEX IF EXISTS idx_orders_status;
+DROP INDEX IF EXISTS idx_orders_deadline;
+CREATE TABLE IF NOT EXISTS inventory (
+    pos INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS financials (
+    kind TEXT PRIMARY KEY,
+    amount REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    type TEXT,
+    author TEXT,
+    content TEXT
+);
+DROP INDEX IF EXISTS idx_reports_timestamp;
+DROP INDEX IF EXISTS idx_reports_type;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def thread_connection(local, path):
+    # One connection per thread; the threading async mode serves each request on its own thread
+    db = getattr(local, 'db', None)
+    if db is None:
+        db = sqlite3.connect(path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        local.db = db
+    return db
+
+
+# Order columns of older databases. Nothing queries orders by them (the store
+# loads every row and answers from OrderBook and the scheduler), so they go.
+LEGACY_ORDER_COLUMNS = ('status', 'deadline', 'paused')
+
+# Top-level document keys that get their own tables; everything else goes to meta
+TABLE_KEYS = ('users', 'inventory', 'financials')
+HUB_TABLE_KEYS = ('orders', 'reports')
+
+
+class SqliteStorage:
+    kind = 'sqlite'
+
+    def __init__(self, path, batch_size=50, report_window=50):
+        self.path = path
+        self.batch_size = batch_size
+        self.report_window = report_window
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._clear_pending()
+        with self.connection() as db:
+            db.executescript(SCHEMA)
+            columns = {row[1] for row in db.execute("PRAGMA table_info(orders)")}
+            for column in LEGACY_ORDER_COLUMNS:
+                if column in columns: db.execute(f"ALTER TABLE orders DROP COLUMN {column}")
+
+    def connection(self):
+        return thread_connection(self._local, self.path)
+
+    def _clear_pending(self):
+        self._users, self._orders, self._removed = set(), set(), set()
+        self._stock, self._kinds, self._reports = set(), set(), []
+        self._meta = False
+        self._pending = 0
+
+    # --- LOADING ---
+    def load(self):
+        db = self.connection()
+        doc = {key: json.loads(value) for key, value in db.execute("SELECT key, value FROM meta")}
+        hub = doc.setdefault('production_hub', {})
+        doc['users'] = [{'email': e, 'password': p, 'role': r} for e, p, r in db.execute("SELECT email, password, role FROM users")]
+        doc['inventory'] = [json.loads(d) for (d,) in db.execute("SELECT data FROM inventory ORDER BY pos")]
+        doc['financials'] = {k: (int(a) if a == int(a) else a) for k, a in db.execute("SELECT kind, amount FROM financials")}
+        hub['orders'] = [json.loads(d) for (d,) in db.execute("SELECT data FROM orders ORDER BY pos")]
+        hub['reports'] = [{'timestamp': t, 'type': ty, 'content': c, 'author': a} for t, ty, a, c in
+                          db.execute("SELECT timestamp, type, author, content FROM reports ORDER BY id DESC LIMIT ?", (self.report_window,))]
+        return doc
+
+    def replay(self): return ()
+
+    def open(self, store): pass
+
+    def is_empty(self):
+        return self.connection().execute("SELECT NOT EXISTS (SELECT 1 FROM meta UNION ALL SELECT 1 FROM users)").fetchone()[0] == 1
+
+    # --- WRITES ---
+    def append(self, rec):
+        op = rec['op']
+        if op == 'user.add': self._users.add(rec['user']['email'])
+        elif op == 'order.add' or op == 'order.update':
+            oid = rec['order']['id'] if op == 'order.add' else rec['id']
+            self._orders.add(oid)
+            self._removed.discard(oid)
+        elif op == 'order.progress': self._orders.update(rec['progress'])
+        elif op == 'order.remove':
+            self._orders.discard(rec['id'])
+            self._removed.add(rec['id'])
+        elif op == 'stock.adjust': self._stock.add(rec['name'])
+        elif op == 'stock.consume': self._stock.update(rec['deltas'])
+        elif op == 'fin.post': self._kinds.add(rec['kind'])
+        elif op == 'report.add': self._reports.append(dict(rec['entry']))
+        self._meta = self._meta or op in ('order.add', 'ingest.reserve') # order_seq / client_order_seq moved
+        self._pending += 1
+        return self._pending >= self.batch_size
+
+    def _collect(self, store):
+        # Materialize the current rows for everything touched since the last flush (under the store lock)
+        users = [store.find_user(e) for e in self._users]
+        orders = [store.find_order(oid) for oid in self._orders]
+        stock = [store.find_stock(n) for n in self._stock]
+        batch = {
+            'users': [(u['email'], u['password'], u.get('role')) for u in users if u],
+            'orders': [(o['id'], json.dumps(o)) for o in orders if o],
+            'removed': [(oid,) for oid in self._removed],
+            'inventory': [(i['name'], json.dumps(i)) for i in stock if i],
+            'financials': [(k, store.financials.get(k, 0)) for k in self._kinds],
+            'reports': [(r['timestamp'], r.get('type'), r.get('author'), r.get('content')) for r in self._reports],
+            'meta': meta_rows(store.doc, store.book.next_seq) if self._meta else [],
+        }
+        self._clear_pending()
+        return batch
+
+    def _write(self, batch, replace=False):
+        db = self.connection()
+        with db:
+            if replace:
+                for table in ('users', 'orders', 'inventory', 'financials', 'reports', 'meta'): db.execute(f"DELETE FROM {table}")
+            db.executemany("INSERT INTO users(email, password, role) VALUES (?, ?, ?) "
+                           "ON CONFLICT(email) DO UPDATE SET password=excluded.password, role=excluded.role", batch['users'])
+            db.executemany("DELETE FROM orders WHERE id = ?", batch['removed'])
+            db.executemany("INSERT INTO orders(id, data) VALUES (?, ?) "
+                           "ON CONFLICT(id) DO UPDATE SET data=excluded.data", batch['orders'])
+            db.executemany("INSERT INTO inventory(name, data) VALUES (?, ?) "
+                           "ON CONFLICT(name) DO UPDATE SET data=excluded.data", batch['inventory'])
+            db.executemany("INSERT INTO financials(kind, amount) VALUES (?, ?) "
+                           "ON CONFLICT(kind) DO UPDATE SET amount=excluded.amount", batch['financials'])
+            db.executemany("INSERT INTO reports(timestamp, type, author, content) VALUES (?, ?, ?, ?)", batch['reports'])
+            if batch['reports']: # the same window the store keeps; full history lives in the report log
+                db.execute("DELETE FROM reports WHERE id <= (SELECT id FROM reports ORDER BY id DESC LIMIT 1 OFFSET ?)", (self.report_window,))
+            db.executemany("INSERT INTO meta(key, value) VALUES (?, ?) "
+                           "ON CONFLICT(key) DO UPDATE SET value=excluded.value", batch['meta'])
+
+    def flush(self, store):
+        with self._write_lock:
+            with store.lock:
+                if not self._pending: return False
+                batch = self._collect(store)
+            self._write(batch)
+            return True
+
+    def reset(self, store):
+        with self._write_lock:
+            with store.lock:
+                self._clear_pending()
+                batch = full_batch(store.doc, store.book.next_seq)
+            self._write(batch, replace=True)
+
+    def close(self, store):
+        self.flush(store)
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+def meta_rows(doc, order_seq=None):
+    rows = []
+    for key, value in doc.items():
+        if key in TABLE_KEYS: continue
+        if key == 'production_hub':
+            value = {k: v for k, v in value.items() if k not in HUB_TABLE_KEYS}
+            if order_seq is not None: value['order_seq'] = order_seq
+        rows.append((key, json.dumps(value)))
+    return rows
+
+
+def full_batch(doc, order_seq=None):
+    hub = doc.get('production_hub', {})
+    return {
+        'users': [(u['email'], u['password'], u.get('role')) for u in doc.get('users', [])],
+        'orders': [(o['id'], json.dumps(o)) for o in hub.get('orders', [])],
+        'removed': [],
+        'inventory': [(i['name'], json.dumps(i)) for i in doc.get('inventory', [])],
+        'financials': list(doc.get('financials', {}).items()),
+        'reports': [(r['timestamp'], r.get('type'), r.get('author'), r.get('content')) for r in reversed(hub.get('reports', []))],
+        'meta': meta_rows(doc, order_seq),
+    }
+
+
+def migrate_json_to_sqlite(json_path, db_path):
+    """One-shot import of the JSON document into a (replaced) SQLite database."""
+    storage = SqliteStorage(db_path)
+    storage._write(full_batch(read_json(json_path)), replace=True)
+    counts = {t: storage.connection().execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ('users', 'orders', 'inventory', 'reports')}
+    storage.connection().close()
+    return counts
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4 or sys.argv[1] != 'migrate':
+        print("usage: python storage.py migrate <master_manufacturing_data.json> <factory.db>")
+        sys.exit(2)
+    print(f"MIGRATED: {migrate_json_to_sqlite(sys.argv[2], sys.argv[3])}")
@@ -0,0 +1,137 @@
+import threading
+import numpy as np
+
+# --- TELEMETRY HISTORY ---
+# Fixed-size, array-backed time series. Raw samples go into a ring that evicts
+# the oldest entries once full; per-minute and per-hour rollups keep min / max /
+# mean per field for much longer. For cumulative counters (yield) they also sum
+# each sample's increase over the one before it, a drop (reset) counting as 0,
+# so a bucket's increase is what was actually made in it; raw samples keep
+# their own increase next to the value. Range queries
+# binary-search the (time-ordered) ring segments, so their cost follows the
+# number of points returned rather than the amount of history kept.
+
+FIELDS = ("rpm", "temp", "health", "efficiency", "yield", "stock")
+COUNTERS = ("yield",) # cumulative fields
+RESOLUTIONS = {"raw": 1, "minute": 60, "hour": 3600}
+
+
+class _Ring:
+    def __init__(self, capacity, width):
+        self.capacity = capacity
+        self.t = np.zeros(capacity, dtype=np.float64)
+        self.v = np.zeros((capacity, width), dtype=np.float64)
+        self.head = 0
+        self.count = 0
+
+    def append(self, t, row):
+        self.t[self.head] = t
+        self.v[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _segments(self):
+        if self.count < self.capacity: return [(0, self.count)]
+        return [(self.head, self.capacity), (0, self.head)]
+
+    def window(self, start, end, limit=None):
+        picks = []
+        for lo, hi in self._segments():
+            t = self.t[lo:hi]
+            a = lo + int(np.searchsorted(t, start, 'left'))
+            b = lo + int(np.searchsorted(t, end, 'right'))
+            if b > a: picks.append([a, b])
+        if limit is not None:
+            # keep the newest `limit` points
+            excess = sum(b - a for a, b in picks) - limit
+            while excess > 0 and picks:
+                a, b = picks[0]
+                if b - a <= excess:
+                    excess -= b - a
+                    picks.pop(0)
+                else:
+                    picks[0][0] += excess
+                    excess = 0
+        if not picks: return np.empty(0), np.empty((0, self.v.shape[1]))
+        return (np.concatenate([self.t[a:b] for a, b in picks]),
+                np.concatenate([self.v[a:b] for a, b in picks]))
+
+
+class _Rollup:
+    def __init__(self, seconds, capacity, width, counters):
+        self.seconds = seconds
+        self.width = width
+        self.ring = _Ring(capacity, 3 * width + counters)
+        self.bucket = None
+
+    def add(self, t, row, increase):
+        bucket = t - t % self.seconds
+        if self.bucket is not None and bucket != self.bucket: self._close()
+        if self.bucket is None:
+            self.bucket = bucket
+            self.min, self.max, self.sum, self.n = row.copy(), row.copy(), row.copy(), 1
+            self.increase = increase.copy()
+        else:
+            np.minimum(self.min, row, out=self.min)
+            np.maximum(self.max, row, out=self.max)
+            self.sum += row
+            self.n += 1
+            self.increase += increase
+
+    def _open_row(self):
+        return np.concatenate([self.min, self.max, self.sum / self.n, self.increase])
+
+    def _close(self):
+        self.ring.append(self.bucket, self._open_row())
+        self.bucket = None
+
+    def window(self, start, end, limit=None):
+        t, v = self.ring.window(start, end, limit)
+        if self.bucket is not None and start <= self.bucket <= end:
+            t = np.append(t, self.bucket)
+            v = np.vstack([v, self._open_row()])
+            if limit is not None and len(t) > limit: t, v = t[-limit:], v[-limit:]
+        return t, v
+
+
+class TelemetryHistory:
+    def __init__(self, fields=FIELDS, counters=COUNTERS, raw_capacity=6 * 3600, minute_capacity=7 * 24 * 60, hour_capacity=365 * 24):
+        self.fields = tuple(fields)
+        self.counters = [f for f in self.fields if f in counters]
+        self._counter_cols = [self.fields.index(f) for f in self.counters]
+        self._last = None # previous sample's counter values
+        self.lock = threading.Lock()
+        width, n = len(self.fields), len(self.counters)
+        self.raw = _Ring(raw_capacity, width + n) # values, then counter increases
+        self.rollups = {"minute": _Rollup(60, minute_capacity, width, n), "hour": _Rollup(3600, hour_capacity, width, n)}
+
+    def record(self, t, values):
+        row = np.array([values[f] for f in self.fields], dtype=np.float64)
+        counts = row[self._counter_cols]
+        with self.lock:
+            increase = np.zeros_like(counts) if self._last is None else np.maximum(counts - self._last, 0)
+            self._last = counts
+            self.raw.append(t, np.concatenate([row, increase]))
+            for rollup in self.rollups.values(): rollup.add(t, row, increase)
+
+    def query(self, resolution="raw", start=None, end=None, fields=None, limit=None):
+        if resolution not in RESOLUTIONS: raise ValueError(f"Unknown resolution: {resolution}")
+        fields = list(fields or self.fields)
+        unknown = [f for f in fields if f not in self.fields]
+        if unknown: raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        cols = [self.fields.index(f) for f in fields]
+        with self.lock:
+            source = self.raw if resolution == "raw" else self.rollups[resolution]
+            t, v = source.window(start, end, limit)
+        width = len(self.fields)
+        if resolution == "raw":
+            return {"resolution": resolution, "t": t.tolist(),
+                    "series": {f: v[:, c].tolist() for f, c in zip(fields, cols)},
+                    "increase": {f: v[:, width + k].tolist() for k, f in enumerate(self.counters) if f in fields}}
+        series = {f: {"min": v[:, c].tolist(), "max": v[:, width + c].tolist(), "mean": v[:, 2 * width + c].tolist()}
+                  for f, c in zip(fields, cols)}
+        for k, f in enumerate(self.counters):
+            if f in series: series[f]["increase"] = v[:, 3 * width + k].tolist()
+        return {"resolution": resolution, "t": t.tolist(), "series": series}
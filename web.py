@@ -0,0 +1,168 @@
+import os
+from functools import wraps
+from flask import Response, abort, jsonify, redirect, request, send_from_directory, session, stream_with_context, url_for
+from flask_socketio import emit, join_room, leave_room
+from assets import PUBLIC
+from report_log import FILTERS as REPORT_FILTERS, filters as report_filters
+from rooms import ROLE_TOPICS, topic_room
+from metrics import REGISTRY
+from offload import blocking, blocking_iter
+
+# --- SHARED WEB FRONT ---
+# Socket.IO handlers and the HTTP routes that only read feeds, logs, the
+# schedule and files. Both entry points register the same code: the single
+# process (app.py) over its live state, and cluster web workers (worker.py)
+# over their replicas. So replica reads never reach the owner, and the two
+# copies can't drift apart.
+
+
+def login_required(role=None):
+    def wrapper(fn):
+        @wraps(fn)
+        def decorated_view(*args, **kwargs):
+            if 'user_id' not in session:
+                return redirect(url_for('login'))
+            if role and session.get('role') != role:
+                return "Access Denied: You do not have permission to view this page.", 403
+            return fn(*args, **kwargs)
+        return decorated_view
+    return wrapper
+
+
+class WebFront:
+    def __init__(self, app, socketio, feeds, notifications, report_log, reports, scheduler, assets,
+                 metrics_allow=(), on_connect=None):
+        self.feeds = feeds                 # name -> StateFeed
+        self.notifications = notifications
+        self.report_log = report_log
+        self.reports = reports             # () -> latest reports, as the live feed shows them
+        self.scheduler = scheduler
+        self.assets = assets
+        self.metrics_allow = set(metrics_allow)
+        self.on_connect = on_connect       # runs after a socket joins its rooms, before its initial state
+        self.subscriptions = {}            # sid -> (role, topics)
+        REGISTRY.gauge('factory_sockets_connected', 'Connected Socket.IO clients', fn=lambda: len(self.subscriptions))
+
+        # --- ROUTES ---
+        for rule, endpoint, view in (
+            ('/', 'home', self.home),
+            ('/login.html', 'login', self.login),
+            ('/logout', 'logout', self.logout),
+            ('/operator', 'operator', login_required(role='Operator')(self.operator)),
+            ('/analyst', 'analyst', login_required(role='Analyst')(self.analyst)),
+            ('/metrics', 'metrics_endpoint', self.metrics_endpoint),
+            ('/api/get_notifications', 'get_notifs', self.get_notifs),
+            ('/api/reports', 'get_reports', self.get_reports),
+            ('/api/reports/export', 'export_reports', self.export_reports),
+            ('/api/schedule', 'get_schedule', self.get_schedule),
+            ('/<path:filename>', 'serve_static', self.serve_static),
+        ):
+            app.add_url_rule(rule, endpoint, view, methods=['GET'])
+
+        # --- SOCKETS ---
+        for event, handler in (('connect', self.connect), ('subscribe', self.subscribe),
+                               ('disconnect', self.disconnect), ('resync', self.resync)):
+            socketio.on_event(event, handler)
+
+    # --- PAGES ---
+    # Pages and static files come compressed from memory with ETags (assets.py)
+    def home(self): return self.assets.respond(self.assets.page('index.html'))
+
+    def login(self): return self.assets.respond(self.assets.page('login.html'))
+
+    def logout(self):
+        session.clear()
+        return redirect(url_for('login'))
+
+    def operator(self): return self.assets.respond(self.assets.page('dashboard.html', private=True))
+
+    def analyst(self): return self.assets.respond(self.assets.page('analyst.html', private=True))
+
+    def serve_static(self, filename):
+        # Pages and assets only: the app directory also holds the state, databases and source
+        if os.path.splitext(filename)[1].lower() not in PUBLIC: abort(404)
+        asset = self.assets.file(filename)
+        if asset is None: return send_from_directory(self.assets.root, filename)
+        return self.assets.respond(asset)
+
+    def metrics_endpoint(self):
+        if not REGISTRY.enabled: return jsonify({"status": "error", "message": "Metrics are disabled"}), 404
+        if request.remote_addr not in self.metrics_allow: return jsonify({"status": "error", "message": "Forbidden"}), 403
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+    # --- READS ---
+    def get_notifs(self):
+        # ?since=<seq> returns only newer entries; ?wait=<s> long-polls until one arrives
+        to = request.args.get('to')
+        types = set(filter(None, request.args.get('type', '').split(','))) or None
+        limit = min(1000, max(1, request.args.get('limit', 100, type=int)))
+        if 'since' not in request.args:
+            entries, _, _ = self.notifications.since(0, to, types, limit=self.notifications.capacity)
+            return jsonify(entries)
+        cursor = max(0, request.args.get('since', 0, type=int))
+        wait = min(30.0, max(0.0, request.args.get('wait', 0, type=float)))
+        entries, next_cursor, missed = self.notifications.poll(cursor, to, types, limit, wait)
+        return jsonify({"notifications": entries, "cursor": next_cursor, "missed": missed})
+
+    def get_reports(self):
+        # Plain call: the latest reports, as the live feed shows them. With filters or
+        # paging params: a page of the full history plus the cursor for the next one.
+        if not set(request.args) & {*REPORT_FILTERS, 'before', 'limit'}: return jsonify(self.reports())
+        limit = min(1000, max(1, request.args.get('limit', 100, type=int)))
+        page, next_cursor = blocking(self.report_log.query, limit, before=request.args.get('before', type=int), **report_filters(request.args))
+        return jsonify({"reports": page, "next": next_cursor})
+
+    def export_reports(self):
+        # Oldest first, one JSON object per line, streamed in chunks
+        lines = blocking_iter(self.report_log.export(after=request.args.get('after', type=int), **report_filters(request.args)))
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson',
+                        headers={'Content-Disposition': 'attachment; filename=reports.ndjson'})
+
+    def get_schedule(self):
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = min(1000, max(1, request.args.get('limit', 100, type=int)))
+        at_risk = request.args.get('at_risk', '').lower() in ('1', 'true', 'yes')
+        return jsonify({
+            "summary": self.scheduler.summary(),
+            "plan": self.scheduler.plan(offset, limit, at_risk_only=at_risk)
+        })
+
+    # --- SOCKET HANDLERS ---
+    def connect(self):
+        role = session.get('role') if session.get('role') in ROLE_TOPICS else 'public'
+        self.set_topics(role, ROLE_TOPICS[role])
+        if self.on_connect is not None: self.on_connect()
+        self.send_initial_state(ROLE_TOPICS[role])
+
+    def set_topics(self, role, topics):
+        _, current = self.subscriptions.get(request.sid, (role, set()))
+        for topic in current - topics: leave_room(topic_room(role, topic))
+        for topic in topics - current: join_room(topic_room(role, topic))
+        self.subscriptions[request.sid] = (role, set(topics))
+
+    def send_initial_state(self, topics):
+        for name, feed in self.feeds.items():
+            if name in topics: emit('feed_snapshot', feed.snapshot())
+        if 'reports' in topics: emit('report_update', self.reports())
+
+    def subscribe(self, data):
+        role, current = self.subscriptions.get(request.sid, ('public', set()))
+        requested = set((data or {}).get('topics') or [])
+        topics = requested & ROLE_TOPICS[role]
+        self.set_topics(role, topics)
+        self.send_initial_state(topics - current)
+        emit('subscribed', {'role': role, 'topics': sorted(topics), 'denied': sorted(requested - topics)})
+
+    def disconnect(self, *args):
+        self.subscriptions.pop(request.sid, None)
+
+    def resync(self, data):
+        feed = self.feeds.get((data or {}).get('feed'))
+        if feed is None: return
+        _, topics = self.subscriptions.get(request.sid, ('public', set()))
+        if feed.name not in topics: return
+        missed = feed.since(data.get('v'))
+        if missed is None:
+            emit('feed_snapshot', feed.snapshot())
+            return
+        for delta in missed: emit('feed_delta', delta)
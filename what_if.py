@@ -0,0 +1,153 @@
+import sys
+import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sim_engine import FloorSimulation, progress_rate
+from scheduler import deadline_ts
+
+# --- WHAT-IF RUNS ---
+# Headless, seeded runs of the floor physics on a simulated clock: one tick is
+# one simulated second and ticks run back to back, so a 12-hour shift takes a
+# fraction of a second. A scenario gives the starting machine state, a script of
+# ai_command-style actions and the orders to work through; the result is the
+# telemetry time series and when each order started and reached 100%.
+#
+# scenario = {
+#     "name": "rush", "seed": 1, "duration": 43200, "sample_every": 60,
+#     "machines": 1, "start_time": 1767225600,          # optional, unix seconds
+#     "start": {"target_rpm": 1800, "current_rpm": 1200, "temp": 65, "health": 100, ...},
+#     "actions": [{"at": 3600, "cmd": "increase speed", "machine": 0}, ...],
+#     "orders": [{"id": "#ORD-0001", "deadline": "2026-01-25", "progress": 0, "status": "Pending"}, ...],
+#     "lanes": 1,                                       # orders run at once; Pending ones start in EDF order
+# }
+
+MAX_DURATION = 30 * 24 * 3600
+MAX_MACHINES = 1000 # per scenario; ~5,000x real time at this size (10,000x+ up to ~100 machines)
+MAX_SCENARIOS = 64  # per request
+START_FIELDS = ("target_rpm", "current_rpm", "temp", "health", "efficiency", "yield_count")
+SERIES_FIELDS = ("rpm", "temp", "health", "efficiency", "yield")
+
+
+def _floor(scenario):
+    start = scenario.get('start') or {}
+    floor = FloorSimulation(scenario.get('machines', 1), seed=scenario.get('seed', 0),
+                            **{k: start[k] for k in START_FIELDS if k in start})
+    if 'temp_offset' in start: floor.temp_offset[:] = start['temp_offset']
+    if start.get('status') == 'STOPPED': floor.running[:] = False
+    return floor
+
+
+def _orders(scenario):
+    orders = []
+    for i, o in enumerate(scenario.get('orders') or []):
+        if o.get('status') in ('Completed', 'QA Check'): continue
+        running = o.get('status') == 'In Progress' and not o.get('paused')
+        orders.append({"id": o.get('id', f"order-{i}"), "deadline": o.get('deadline'), "due": deadline_ts(o.get('deadline')),
+                       "seq": i, "progress": int(o.get('progress', 0)), "paused": bool(o.get('paused')),
+                       "running": running, "started_at": 0 if running else None, "completed_at": None})
+    return orders
+
+
+def validate(scenario):
+    """Raise ValueError when a scenario is outside the run limits; returns its duration."""
+    duration = int(scenario.get('duration', 3600))
+    if not 0 < duration <= MAX_DURATION: raise ValueError(f"duration must be between 1 and {MAX_DURATION} seconds")
+    machines = int(scenario.get('machines', 1))
+    if not 0 < machines <= MAX_MACHINES: raise ValueError(f"machines must be between 1 and {MAX_MACHINES}")
+    return duration
+
+
+def run_scenario(scenario):
+    """Run one scenario to completion and return its time series and order timeline."""
+    duration = validate(scenario)
+    every = max(1, int(scenario.get('sample_every', 60)))
+    lanes = max(1, int(scenario.get('lanes', 1)))
+    start_time = scenario.get('start_time')
+    wall = time.perf_counter()
+
+    floor = _floor(scenario)
+    actions = sorted(scenario.get('actions') or [], key=lambda a: a.get('at', 0))
+    orders = _orders(scenario)
+    waiting = sorted((o for o in orders if not o['running'] and not o['paused']), key=lambda o: (o['due'], o['seq']))
+    active = [o for o in orders if o['running'] and o['progress'] < 100]
+
+    samples = duration // every + 1
+    t_out = np.zeros(samples)
+    series = np.zeros((samples, len(SERIES_FIELDS)))
+    repairs, next_action, row = [], 0, 0
+
+    for t in range(duration + 1):
+        while next_action < len(actions) and actions[next_action].get('at', 0) <= t:
+            action = actions[next_action]
+            floor.command(action.get('cmd', '').lower(), action.get('machine'))
+            next_action += 1
+        if t:
+            if floor.step().size: repairs.append(t)
+            rate = progress_rate(floor.current_rpm[0], floor.temp[0], floor.running[0])
+            for order in active:
+                order['progress'] = min(100, int(order['progress'] + rate))
+                if order['progress'] >= 100: order['completed_at'] = t
+            if any(o['completed_at'] == t for o in active):
+                active = [o for o in active if o['completed_at'] is None]
+        while waiting and len(active) < lanes:
+            order = waiting.pop(0)
+            order['started_at'] = t
+            active.append(order)
+        if t % every == 0:
+            t_out[row] = t
+            series[row] = (floor.current_rpm.mean(), floor.temp.mean(), floor.health.mean(),
+                           floor.efficiency.mean(), floor.yield_count.sum())
+            row += 1
+
+    elapsed = time.perf_counter() - wall
+    timeline = []
+    for o in sorted(orders, key=lambda o: (o['completed_at'] is None, o['completed_at'] or 0, o['seq'])):
+        entry = {"id": o['id'], "deadline": o['deadline'], "progress": o['progress'],
+                 "started_at": o['started_at'], "completed_at": o['completed_at']}
+        if start_time is not None and o['due'] != float('inf'):
+            finish = start_time + o['completed_at'] if o['completed_at'] is not None else float('inf')
+            entry["late"] = finish > o['due']
+        timeline.append(entry)
+    return {
+        "name": scenario.get('name'),
+        "seed": scenario.get('seed', 0),
+        "duration": duration,
+        "start_time": start_time,
+        "elapsed_s": round(elapsed, 4),
+        "speedup": round(duration / elapsed) if elapsed else None,
+        "series": {"t": t_out[:row].tolist(), **{f: series[:row, i].round(3).tolist() for i, f in enumerate(SERIES_FIELDS)}},
+        "orders": timeline,
+        "repairs": repairs,
+        "final": {**floor.aggregate(), "primary": floor.machine(0)},
+    }
+
+
+def run_many(scenarios, workers=None, pool=None):
+    """Run scenarios in parallel worker processes; results come back in input order."""
+    if pool is not None: return list(pool.map(run_scenario, scenarios))
+    if len(scenarios) == 1: return [run_scenario(scenarios[0])]
+    with make_pool(workers) as own: return list(own.map(run_scenario, scenarios))
+
+
+def make_pool(workers=None):
+    # fork where available: spawn would re-run the main script (app.py and its
+    # store, threads and sockets) in every worker. Workers only call
+    # run_scenario on plain dicts, so they never touch the parent's locks.
+    method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("usage: python what_if.py <scenarios.json>  (one scenario object or a list of them)")
+        sys.exit(2)
+    with open(sys.argv[1]) as f: spec = json.load(f)
+    results = run_many(spec if isinstance(spec, list) else [spec])
+    for r in results:
+        late = sum(1 for o in r['orders'] if o.get('late'))
+        done = sum(1 for o in r['orders'] if o['completed_at'] is not None)
+        print(f"{r['name'] or '-'}: {r['duration']}s simulated in {r['elapsed_s']}s ({r['speedup']}x), "
+              f"final health {r['final']['min_health']}, yield {r['final']['total_yield']}, "
+              f"orders done {done}/{len(r['orders'])} (late {late}), repairs {len(r['repairs'])}")
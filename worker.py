@@ -0,0 +1,165 @@
+import os
+import time
+import base64
+from threading import Lock
+from flask import Flask, Response, jsonify, request
+from flask_socketio import SocketIO, emit
+from state_feed import StateFeed
+from notification_log import NotificationLog
+from report_log import ReportLog
+from rooms import rooms_for
+from scheduler import DeadlineScheduler
+from bus import Bus, BusError
+from metrics import REGISTRY
+from assets import AssetCache
+from web import WebFront
+import offload
+
+# --- CLUSTER WEB WORKER ---
+# Serves HTTP and Socket.IO clients for a cluster whose state lives in one owner
+# process (app.py with FACTORY_ROLE=owner). The worker keeps replicas of the
+# owner's state feeds, notification log, latest reports and deadline schedule,
+# fed from the bus 'emit' channel, and serves them with the owner's own handlers
+# (web.py): socket snapshots, deltas, resyncs, notification polls, reports and
+# the schedule never reach the owner; report history and exports come straight
+# from the shared report database. Everything else (mutations, reads of live
+# state, the manager dashboard) is forwarded to the owner over the bus. Run any
+# number of them (cluster.py):
+#   FACTORY_ROLE=worker python serve.py
+
+current_dir = os.path.abspath(os.path.dirname(__file__))
+app = Flask(__name__, template_folder=current_dir, static_folder=current_dir)
+app.config['SECRET_KEY'] = os.environ.get('FACTORY_SECRET_KEY', 'hackathon_super_secret')
+
+ASYNC_MODE = os.environ.get('FACTORY_ASYNC_MODE', 'threading')
+BUS_ADDRESS = os.environ.get('FACTORY_BUS', '127.0.0.1:5600')
+FORWARD_TIMEOUT = float(os.environ.get('FACTORY_FORWARD_TIMEOUT', 30)) # seconds to wait for the owner's answer
+REPORT_DB = os.environ.get('FACTORY_REPORT_DB', os.path.join(current_dir, 'reports.db'))
+NOTIFY_CAPACITY = int(os.environ.get('FACTORY_NOTIFY_CAPACITY', 1000))
+STATIC_MAX_AGE = int(os.environ.get('FACTORY_STATIC_MAX_AGE', 300))
+METRICS_ALLOW = set(os.environ.get('FACTORY_METRICS_ALLOW', '127.0.0.1,::1').split(','))
+
+REGISTRY.enabled = os.environ.get('FACTORY_METRICS', '1') != '0'
+offload.configure(ASYNC_MODE, int(os.environ.get('FACTORY_BLOCKING_WORKERS', 8)))
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE)
+report_log = ReportLog(REPORT_DB)
+assets = AssetCache(current_dir, max_age=STATIC_MAX_AGE)
+assets.warm()
+
+# --- REPLICAS ---
+system_feed = StateFeed('system', keys={'client_orders': 'id', 'inventory': 'name'})
+order_feed = StateFeed('orders', keys={'orders': 'id'})
+FEEDS = {feed.name: feed for feed in (system_feed, order_feed)}
+notifications = NotificationLog(NOTIFY_CAPACITY)
+latest = {'reports': []} # last 'report_update' payload, for sockets that subscribe later
+scheduler = DeadlineScheduler() # rebuilt from the feeds: order rows, storefront orders and the owner's rate
+replica_lock = Lock() # a feed and the schedule built from it change together
+bus = None
+sync_lock = Lock()
+syncing = False
+
+# --- METRICS ---
+FORWARD_SECONDS = REGISTRY.histogram('factory_worker_forward_seconds', 'Requests forwarded to the owner, round trip', ('method', 'status'))
+RESYNCS = REGISTRY.counter('factory_worker_resyncs_total', 'Replica reloads after a gap in the owner\'s deltas')
+
+def mirror_schedule(state):
+    # The owner's schedule summary carries its progress rate (rounded to 0.01 %/s)
+    if 'schedule' in state: scheduler.set_rate(state['schedule']['rate'])
+
+def load_replicas(timeout=FORWARD_TIMEOUT):
+    state = bus.request('owner.state', None, timeout=timeout)
+    with replica_lock:
+        for name, snapshot in state['feeds'].items(): FEEDS[name].load(snapshot)
+        scheduler.clear()
+        for order in state['feeds']['orders']['state']['orders']: scheduler.track_order(order)
+        system = state['feeds']['system']['state']
+        for entry in system.get('client_orders', []): scheduler.track(entry['id'], entry.get('deadline'), kind='client')
+        mirror_schedule(system)
+    for entry in state['notifications']: notifications.replicate(entry)
+    latest['reports'] = state['reports']
+
+def apply_delta(delta):
+    # Feed delta -> replica feed and schedule; False on a gap
+    with replica_lock:
+        feed = FEEDS[delta['feed']]
+        if delta['v'] <= feed.version: return True # already have it
+        if not feed.apply(delta): return False
+        upsert, remove = delta.get('upsert', {}), delta.get('remove', {})
+        for order in upsert.get('orders', ()): scheduler.track_order(order)
+        for entry in upsert.get('client_orders', ()): scheduler.track(entry['id'], entry.get('deadline'), kind='client')
+        for key in [*remove.get('orders', ()), *remove.get('client_orders', ())]: scheduler.remove(key)
+        mirror_schedule(delta.get('set', {}))
+        return True
+
+def resync_replicas():
+    global syncing
+    try:
+        RESYNCS.inc()
+        load_replicas()
+    except BusError as e:
+        print(f"WORKER: replica resync failed ({e})")
+    finally:
+        with sync_lock: syncing = False
+
+def on_emit(msg):
+    # Runs on the bus reader, in the owner's publish order
+    global syncing
+    event, payload = msg['event'], msg['payload']
+    if event == 'feed_delta' and not apply_delta(payload):
+        with sync_lock:
+            start, syncing = not syncing, True
+        if start: socketio.start_background_task(resync_replicas)
+    elif event == 'new_notification': notifications.replicate(payload)
+    elif event == 'report_update': latest['reports'] = payload
+    rooms = rooms_for(msg['topic'], msg['roles'])
+    if rooms: socketio.emit(event, payload, to=rooms)
+
+def start_engine():
+    # Connects to the bus and loads the replicas, waiting for the broker and owner to come up
+    global bus
+    while bus is None:
+        try:
+            bus = Bus(BUS_ADDRESS)
+        except OSError:
+            print(f"WORKER: waiting for the bus at {BUS_ADDRESS}")
+            time.sleep(1)
+    bus.subscribe('emit', on_emit)
+    while True:
+        try:
+            return load_replicas(timeout=2)
+        except BusError:
+            print("WORKER: waiting for the owner")
+
+# --- FORWARDING ---
+FORWARD_HEADERS = ('Content-Type', 'Cookie', 'Accept', 'Accept-Encoding', 'If-None-Match', 'User-Agent', 'X-Requested-With')
+
+def forward():
+    start = time.perf_counter()
+    req = {'method': request.method, 'path': request.path, 'query': request.query_string.decode(),
+           'headers': {h: request.headers[h] for h in FORWARD_HEADERS if h in request.headers},
+           'body': base64.b64encode(request.get_data()).decode(), 'remote_addr': request.remote_addr}
+    try:
+        reply = bus.request('owner.http', req, timeout=FORWARD_TIMEOUT)
+    except BusError as e:
+        FORWARD_SECONDS.observe(time.perf_counter() - start, method=request.method, status=503)
+        return jsonify({"status": "error", "message": f"Factory owner unavailable: {e}"}), 503
+    FORWARD_SECONDS.observe(time.perf_counter() - start, method=request.method, status=reply['status'])
+    return Response(base64.b64decode(reply['body']), status=reply['status'], headers=reply['headers'])
+
+METHODS = ['GET', 'POST', 'PUT', 'PATCH', 'DELETE']
+for rule in ('/api/<path:rest>', '/manager-dashboard'):
+    app.add_url_rule(rule, f"forward:{rule}", lambda **_: forward(), methods=METHODS)
+
+# --- SHARED WEB FRONT ---
+# Pages, static files, replica reads and the socket handlers: the same code as the owner (web.py)
+web = WebFront(app, socketio, FEEDS, notifications, report_log, lambda: latest['reports'], scheduler, assets,
+               metrics_allow=METRICS_ALLOW)
+
+# --- SOCKET COMMANDS ---
+@socketio.on('ai_command')
+def handle_ai(data):
+    try:
+        ack = bus.request('owner.command', data or {}, timeout=FORWARD_TIMEOUT)
+    except BusError as e:
+        ack = {'response': f"ERROR: owner unavailable ({e})", 'cmd': (data or {}).get('cmd', '')}
+    if ack: emit('ai_ack', ack)